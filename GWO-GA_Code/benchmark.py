@@ -0,0 +1,67 @@
+import time
+import numpy as np
+from swarm_core import select_leaders
+from plot_results import update_population, DIM, AREA_SIZE, MUTATION_RATE
+
+# ==========================================
+# BENCHMARK VÒNG LẶP run_hybrid_GWO_GA (WSN)
+# ==========================================
+
+ITERS = 5
+
+
+def loop_update_population(population, fitness, alpha_pos, beta_pos, delta_pos, a):
+    """Cập nhật quần thể theo cách cũ: sắp xếp lại trong vòng lặp từng con sói, RNG vô hướng theo từng gen"""
+    num_wolves = len(population)
+    half_pop = num_wolves // 2
+    for i in range(half_pop):
+        sorted_idx = np.argsort(fitness)
+        population = population[sorted_idx]
+        fitness = fitness[sorted_idx]
+        for d in range(DIM):
+            X = 0.0
+            for leader in (alpha_pos, beta_pos, delta_pos):
+                r1 = np.random.rand()
+                r2 = np.random.rand()
+                A = 2*a*r1 - a
+                C = 2*r2
+                D = abs(C * leader[d] - population[i, d])
+                X += leader[d] - A * D
+            population[i, d] = X / 3.0
+    for i in range(half_pop, num_wolves):
+        for d in range(DIM):
+            w_cross = np.random.rand()
+            child_gene = w_cross * alpha_pos[d] + (1.0 - w_cross) * beta_pos[d]
+            if np.random.rand() < MUTATION_RATE:
+                child_gene = np.random.uniform(0, AREA_SIZE)
+            population[i, d] = child_gene
+    return np.clip(population, 0, AREA_SIZE)
+
+
+def loop_select_leaders(fitness):
+    return np.argsort(fitness)[:3]
+
+
+def time_per_iteration(update_func, select_func, num_wolves):
+    """Thời gian trung bình (giây) cập nhật quần thể + chọn Alpha/Beta/Delta mỗi vòng lặp (không tính fitness)"""
+    population = np.random.uniform(0, AREA_SIZE, (num_wolves, DIM))
+    fitness = np.random.rand(num_wolves)
+    alpha_pos, beta_pos, delta_pos = np.random.uniform(0, AREA_SIZE, (3, DIM))
+    start = time.perf_counter()
+    for t in range(ITERS):
+        population = update_func(population, fitness, alpha_pos, beta_pos, delta_pos, 1.0)
+        select_func(fitness)
+    return (time.perf_counter() - start) / ITERS
+
+
+def bench_update(wolf_counts=(20, 200, 2000)):
+    print(f"{'wolves':>7} {'loop (ms)':>12} {'batched (ms)':>13} {'speedup':>9}")
+    for num_wolves in wolf_counts:
+        t_loop = time_per_iteration(loop_update_population, loop_select_leaders, num_wolves)
+        t_vec = time_per_iteration(update_population, lambda f: select_leaders(f, 3, maximize=False), num_wolves)
+        print(f"{num_wolves:>7} {t_loop * 1e3:>12.2f} {t_vec * 1e3:>13.3f} {t_loop / t_vec:>8.1f}x")
+
+
+if __name__ == "__main__":
+    print(f"Benchmark vòng lặp Hybrid GWO-GA cho WSN (dim={DIM})")
+    bench_update()
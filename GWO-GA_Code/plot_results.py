@@ -1,6 +1,14 @@
 import numpy as np
-import matplotlib.pyplot as plt
 import math
+import os
+import sys
+import json
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from wsn_fitness import WSNFitness
+from wsn_data import load_nodes_any, nodes_fingerprint
+from swarm_core import gwo_update, ga_offspring, select_leaders, split_best, as_generator, evaluate_population, ParallelEvaluator
+from swarm_core import save_checkpoint, load_checkpoint
 
 # ==========================================
 # 1. CẤU HÌNH HỆ THỐNG
@@ -12,19 +20,27 @@ NUM_WOLVES = 20         # Số lượng sói
 AREA_SIZE = 100.0       # Kích thước vùng mạng (100x100)
 MUTATION_RATE = 0.1     # Tỉ lệ đột biến
 DIM = NUM_CLUSTERS * 2  # Số chiều (5 cụm * 2 tọa độ x,y)
+NUM_WORKERS = 0         # > 0: đánh giá quần thể song song trên NUM_WORKERS process
+NODES_FILE = None       # Tập nút có sẵn (.npy dạng cột - mở memmap, hoặc .txt); None = sinh ngẫu nhiên
+PLOT_MAX_NODES = 5000   # Số nút tối đa vẽ trên biểu đồ (tập lớn hơn được lấy mẫu đều)
+CHECKPOINT_EVERY = 10   # Số vòng lặp giữa hai lần ghi checkpoint (khi có --checkpoint)
+SEED = 42               # Seed gốc: tách thành 2 luồng độc lập cho sinh nút và cho thuật toán
+OUTPUT = 'Hybrid_GWO_GA_WSN_Result' # Tiền tố file kết quả (.npz, .json) và ảnh (.png)
 
 # ==========================================
 # 2. HÀM HỖ TRỢ VÀ FITNESS FUNCTION
 # ==========================================
 
-def init_nodes():
-    """Khởi tạo tọa độ ngẫu nhiên cho các nút cảm biến"""
+def init_nodes(rng=None):
+    """Khởi tạo tọa độ ngẫu nhiên cho các nút cảm biến (rng: seed hoặc np.random.Generator)"""
     # Tạo ma trận (NUM_NODES, 2) với giá trị từ 0 đến AREA_SIZE
-    return np.random.uniform(0, AREA_SIZE, (NUM_NODES, 2))
+    return as_generator(rng).uniform(0, AREA_SIZE, (NUM_NODES, 2))
 
 def calculate_fitness(position, nodes):
     """
     Tính tổng khoảng cách từ các nút về CH gần nhất.
+    (Bản tham chiếu cho mạng nhỏ; khi chạy tối ưu dùng WSNFitness trong wsn_fitness.py -
+    cùng kết quả nhưng đánh giá cả quần thể một lần, theo khối, bộ nhớ không phụ thuộc số nút)
     position: Vector (DIM,) chứa tọa độ của các CH
     nodes: Ma trận (NUM_NODES, 2) chứa tọa độ các nút
     """
@@ -51,105 +67,114 @@ def calculate_fitness(position, nodes):
     
     return total_dist
 
+# ==========================================
+# 2b. ĐÁNH GIÁ QUẦN THỂ (TUẦN TỰ / SONG SONG)
+# ==========================================
+
+def make_fitness(nodes):
+    """
+    Hàm fitness WSN (WSNFitness) cho tập nút; nodes cũng có thể là đường dẫn file (NODES_FILE):
+    khi dùng làm fitness_factory, mỗi worker tự mở memmap thay vì nhận bản sao dữ liệu qua pickle
+    """
+    if isinstance(nodes, str):
+        nodes = load_nodes_any(nodes)
+    return WSNFitness(nodes, NUM_CLUSTERS, AREA_SIZE)
+
+def make_executor(nodes, max_workers=None, kind='process'):
+    """
+    Tạo bộ đánh giá song song cho run_hybrid_GWO_GA (swarm_core.ParallelEvaluator): mỗi worker dựng
+    WSNFitness đúng một lần khi khởi động, quần thể được chia khối theo số worker.
+    nodes: ma trận tọa độ hoặc đường dẫn file (NODES_FILE) cho tập dữ liệu lớn.
+    kind: 'process' (nhiều lõi) hoặc 'thread'
+    """
+    return ParallelEvaluator(kind, max_workers, fitness_factory=make_fitness, factory_args=(nodes,))
+
 # ==========================================
 # 3. THUẬT TOÁN CHÍNH: HYBRID GWO-GA
 # ==========================================
 
-def run_hybrid_GWO_GA(nodes):
-    print(">>> Bắt đầu chạy Hybrid GWO-GA (Python version)...")
-    
-    # 1. Khởi tạo quần thể sói
-    # Ma trận (NUM_WOLVES, DIM)
-    population = np.random.uniform(0, AREA_SIZE, (NUM_WOLVES, DIM))
+def update_population(population, fitness, alpha_pos, beta_pos, delta_pos, a, rng=None):
+    """
+    Một vòng cập nhật quần thể Hybrid GWO-GA, vector hóa trên toàn quần thể.
+    Code C gốc qsort quần thể rồi cập nhật nửa đầu bằng GWO; ở đây chỉ cần tách nửa tốt / nửa yếu
+    bằng một lần argpartition. rng: np.random.Generator dùng cho cả hai giai đoạn.
+    Trả về quần thể mới đã ràng buộc biên.
+    """
+    half_pop = len(population) // 2
+    population = population[split_best(fitness, half_pop, maximize=False)]
     
-    # Tính fitness ban đầu
-    fitness = np.array([calculate_fitness(ind, nodes) for ind in population])
+    # --- GIAI ĐOẠN 1: GWO (Top 50% sói tốt nhất) ---
+    # Cập nhật vị trí dựa trên Alpha, Beta, Delta
+    population[:half_pop] = gwo_update(population[:half_pop], alpha_pos, beta_pos, delta_pos, a, rng)
     
-    # Sắp xếp tìm Alpha, Beta, Delta
-    sorted_indices = np.argsort(fitness)
-    alpha_pos = population[sorted_indices[0]].copy()
-    alpha_score = fitness[sorted_indices[0]]
+    # --- GIAI ĐOẠN 2: GA (Bottom 50% sói yếu hơn) ---
+    # Lai ghép Alpha-Beta (mỗi gen một trọng số như code C) và đột biến, rút số ngẫu nhiên theo khối
+    children, _, _ = ga_offspring(alpha_pos, beta_pos, len(population) - half_pop, 0, AREA_SIZE,
+                                  MUTATION_RATE, gene_weights=True, rng=rng)
+    population[half_pop:] = children
     
-    beta_pos = population[sorted_indices[1]].copy()
-    delta_pos = population[sorted_indices[2]].copy()
+    # Ràng buộc biên (Boundary Check) cho toàn bộ quần thể
+    return np.clip(population, 0, AREA_SIZE)
+
+def run_hybrid_GWO_GA(nodes, executor=None, seed=None, checkpoint=None, checkpoint_every=0, resume=False,
+                      checkpoint_meta=None):
+    """
+    checkpoint: file checkpoint, ghi nguyên tử cứ checkpoint_every vòng lặp (0 = tắt, xem swarm_core.save_checkpoint)
+    resume=True: chạy tiếp từ file checkpoint nếu đã có - kết quả trùng bit với lần chạy không bị ngắt
+    checkpoint_meta: dict mô tả bài toán (seed, tập nút...) ghi cùng cấu hình, phải trùng khi chạy tiếp
+    """
+    fitness_func = make_fitness(nodes)
+    # Mọi số ngẫu nhiên rút ở tiến trình chính từ một Generator: cùng seed -> cùng kết quả dù có executor hay không
+    rng = as_generator(seed)
+    # Cấu hình phải trùng khi chạy tiếp
+    config = dict(num_nodes=len(nodes), num_clusters=NUM_CLUSTERS, num_wolves=NUM_WOLVES, max_iter=MAX_ITER,
+                  area_size=AREA_SIZE, mutation_rate=MUTATION_RATE, **(checkpoint_meta or {}))
     
-    history = [] # Lưu lịch sử hội tụ
+    if resume and checkpoint is not None and os.path.exists(checkpoint):
+        # Khôi phục quần thể, lãnh đạo, lịch sử và trạng thái rng sau vòng lặp start_iter - 1
+        state = load_checkpoint(checkpoint, rng, config)
+        population, fitness, history = state['population'], state['fitness'], list(state['history'])
+        alpha_pos, alpha_score = state['alpha_pos'], state['alpha_score'][()]
+        beta_pos, delta_pos = state['beta_pos'], state['delta_pos']
+        start_iter = int(state['next_iter'])
+        print(f">>> Chạy tiếp Hybrid GWO-GA từ vòng lặp {start_iter} ({checkpoint})...")
+    else:
+        print(">>> Bắt đầu chạy Hybrid GWO-GA (Python version)...")
+        # 1. Khởi tạo quần thể sói
+        # Ma trận (NUM_WOLVES, DIM)
+        population = rng.uniform(0, AREA_SIZE, (NUM_WOLVES, DIM))
+        
+        # Tính fitness ban đầu
+        fitness = evaluate_population(fitness_func, population, executor)
+        
+        # Tìm Alpha, Beta, Delta (Fitness là khoảng cách: càng nhỏ càng tốt)
+        sorted_indices = select_leaders(fitness, 3, maximize=False)
+        alpha_pos = population[sorted_indices[0]].copy()
+        alpha_score = fitness[sorted_indices[0]]
+        
+        beta_pos = population[sorted_indices[1]].copy()
+        delta_pos = population[sorted_indices[2]].copy()
+        
+        history = [] # Lưu lịch sử hội tụ
+        start_iter = 0
     
     # 2. Vòng lặp chính
-    for t in range(MAX_ITER):
+    for t in range(start_iter, MAX_ITER):
         history.append(alpha_score)
         
         if (t + 1) % 10 == 0:
             print(f"Vòng lặp {t+1}: Best Fitness = {alpha_score:.4f}")
             
         a = 2.0 - t * (2.0 / MAX_ITER) # Tham số a giảm dần từ 2 xuống 0
-        half_pop = NUM_WOLVES // 2
         
-        # --- GIAI ĐOẠN 1: GWO (Top 50% sói tốt nhất) ---
-        # Cập nhật vị trí dựa trên Alpha, Beta, Delta
-        for i in range(half_pop):
-            # Lấy vị trí sói hiện tại (theo index đã sort hoặc không, ở đây dùng index gốc của pop)
-            # Lưu ý: Code C không sort lại mảng population mà chỉ tìm alpha/beta/delta.
-            # Nhưng để khớp logic "Top 50%", ta nên sort population trước.
-            # Tuy nhiên, code C gốc duyệt i từ 0->half_pop trên mảng population đã qsort.
-            # Nên ta sẽ sort population theo fitness trước khi vào vòng lặp update.
-            
-            # Sort population và fitness
-            sorted_idx = np.argsort(fitness)
-            population = population[sorted_idx]
-            fitness = fitness[sorted_idx]
-            
-            # Thực hiện update cho nửa đầu (Top 50%)
-            for d in range(DIM):
-                r1 = np.random.rand()
-                r2 = np.random.rand()
-                
-                # Alpha
-                A1 = 2*a*r1 - a
-                C1 = 2*r2
-                D_alpha = abs(C1 * alpha_pos[d] - population[i, d])
-                X1 = alpha_pos[d] - A1 * D_alpha
-                
-                # Beta
-                r1 = np.random.rand()
-                r2 = np.random.rand()
-                A2 = 2*a*r1 - a
-                C2 = 2*r2
-                D_beta = abs(C2 * beta_pos[d] - population[i, d])
-                X2 = beta_pos[d] - A2 * D_beta
-                
-                # Delta
-                r1 = np.random.rand()
-                r2 = np.random.rand()
-                A3 = 2*a*r1 - a
-                C3 = 2*r2
-                D_delta = abs(C3 * delta_pos[d] - population[i, d])
-                X3 = delta_pos[d] - A3 * D_delta
-                
-                # Cập nhật vị trí
-                population[i, d] = (X1 + X2 + X3) / 3.0
-        
-        # --- GIAI ĐOẠN 2: GA (Bottom 50% sói yếu hơn) ---
-        for i in range(half_pop, NUM_WOLVES):
-            for d in range(DIM):
-                # Lai ghép (Crossover) giữa Alpha và Beta
-                w_cross = np.random.rand()
-                child_gene = w_cross * alpha_pos[d] + (1.0 - w_cross) * beta_pos[d]
-                
-                # Đột biến (Mutation)
-                if np.random.rand() < MUTATION_RATE:
-                    child_gene = np.random.uniform(0, AREA_SIZE)
-                
-                population[i, d] = child_gene
-
-        # Ràng buộc biên (Boundary Check) cho toàn bộ quần thể
-        population = np.clip(population, 0, AREA_SIZE)
+        # GWO cho 50% sói tốt nhất, GA cho 50% sói yếu hơn, ràng buộc biên
+        population = update_population(population, fitness, alpha_pos, beta_pos, delta_pos, a, rng)
         
         # Cập nhật lại Fitness và Lãnh đạo
-        fitness = np.array([calculate_fitness(ind, nodes) for ind in population])
+        fitness = evaluate_population(fitness_func, population, executor)
         
-        # Tìm Alpha, Beta, Delta mới
-        sorted_indices = np.argsort(fitness)
+        # Tìm Alpha, Beta, Delta mới (một lần argpartition)
+        sorted_indices = select_leaders(fitness, 3, maximize=False)
         
         # Cập nhật global best nếu tìm thấy tốt hơn
         if fitness[sorted_indices[0]] < alpha_score:
@@ -160,6 +185,11 @@ def run_hybrid_GWO_GA(nodes):
         beta_pos = population[sorted_indices[1]].copy()
         delta_pos = population[sorted_indices[2]].copy()
         
+        if checkpoint is not None and checkpoint_every > 0 and (t + 1) % checkpoint_every == 0:
+            save_checkpoint(checkpoint, rng, config, population=population, fitness=fitness, alpha_pos=alpha_pos,
+                            alpha_score=alpha_score, beta_pos=beta_pos, delta_pos=delta_pos,
+                            history=np.asarray(history, dtype=float), next_iter=t + 1)
+        
     return alpha_pos, history
 
 # ... (Các phần trên giữ nguyên) ...
@@ -168,11 +198,45 @@ def run_hybrid_GWO_GA(nodes):
 # 4. VẼ BIỂU ĐỒ & LƯU ẢNH
 # ==========================================
 
-def plot_results(nodes, best_pos, history):
+def plot_nodes(nodes):
+    """Lấy mẫu đều tối đa PLOT_MAX_NODES nút để vẽ (đọc vào RAM)"""
+    if len(nodes) > PLOT_MAX_NODES:
+        nodes = nodes[::-(-len(nodes) // PLOT_MAX_NODES)]
+    return np.asarray(nodes)
+
+def save_results(prefix, nodes, best_pos, history, **info):
+    """
+    Ghi kết quả (không vẽ): <prefix>.npz chứa best_pos, history và các nút dùng để vẽ (đã lấy mẫu),
+    <prefix>.json chứa cấu hình và fitness. Vẽ lại sau bằng render(prefix).
+    """
+    np.savez(prefix + '.npz', best_pos=best_pos, history=np.asarray(history, dtype=float), nodes=plot_nodes(nodes))
+    meta = dict(num_nodes=len(nodes), num_clusters=NUM_CLUSTERS, num_wolves=NUM_WOLVES, max_iter=MAX_ITER,
+                area_size=AREA_SIZE, fitness=float(history[-1]) if len(history) else None, **info)
+    with open(prefix + '.json', 'w') as f:
+        json.dump(meta, f, indent=2, default=float)
+    return prefix
+
+def render(prefix, show=False):
+    """Vẽ ảnh <prefix>.png từ kết quả đã lưu bởi save_results"""
+    prefix = os.path.splitext(prefix)[0] if prefix.endswith(('.json', '.npz')) else prefix
+    with open(prefix + '.json') as f:
+        meta = json.load(f)
+    with np.load(prefix + '.npz') as data:
+        return plot_results(data['nodes'], data['best_pos'], data['history'], prefix + '.png', show,
+                            meta['num_wolves'], meta['area_size'])
+
+def plot_results(nodes, best_pos, history, output_filename=OUTPUT + '.png', show=True,
+                 num_wolves=NUM_WOLVES, area_size=AREA_SIZE):
     print("Đang xử lý và vẽ biểu đồ...")
+    # Chỉ import matplotlib khi thực sự vẽ; không hiển thị cửa sổ thì dùng backend Agg (không cần màn hình)
+    import matplotlib
+    if not show:
+        matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    nodes = plot_nodes(nodes)
     
     # 1. Tách tọa độ CH từ best_pos
-    chs = best_pos.reshape(NUM_CLUSTERS, 2)
+    chs = best_pos.reshape(-1, 2)
     
     # 2. Phân cụm (Gán nhãn cho nút về CH gần nhất)
     diff = nodes[:, np.newaxis, :] - chs[np.newaxis, :, :]
@@ -185,7 +249,7 @@ def plot_results(nodes, best_pos, history):
     # --- BIỂU ĐỒ 1: KẾT QUẢ PHÂN CỤM WSN ---
     colors = ['red', 'green', 'blue', 'orange', 'purple', 'cyan', 'magenta']
     
-    for k in range(NUM_CLUSTERS):
+    for k in range(len(chs)):
         cluster_nodes = nodes[labels == k]
         c = colors[k % len(colors)]
         
@@ -199,15 +263,15 @@ def plot_results(nodes, best_pos, history):
     # Vẽ các Trưởng cụm (Cluster Heads)
     ax1.scatter(chs[:, 0], chs[:, 1], c='black', marker='*', s=300, edgecolors='yellow', linewidth=1.5, label='Cluster Heads')
     
-    ax1.set_title(f'WSN Clustering Result (Pop={NUM_WOLVES}, Iter={MAX_ITER})')
+    ax1.set_title(f'WSN Clustering Result (Pop={num_wolves}, Iter={len(history)})')
     ax1.set_xlabel('X Coordinate (m)')
     ax1.set_ylabel('Y Coordinate (m)')
-    ax1.set_xlim(0, AREA_SIZE)
-    ax1.set_ylim(0, AREA_SIZE)
+    ax1.set_xlim(0, area_size)
+    ax1.set_ylim(0, area_size)
     ax1.grid(True, linestyle='--', alpha=0.5)
     
     # --- BIỂU ĐỒ 2: TỐC ĐỘ HỘI TỤ ---
-    ax2.plot(range(1, MAX_ITER + 1), history, 'r-o', linewidth=2, markersize=4)
+    ax2.plot(range(1, len(history) + 1), history, 'r-o', linewidth=2, markersize=4)
     ax2.set_title('Convergence Curve (Hybrid GWO-GA)')
     ax2.set_xlabel('Iteration')
     ax2.set_ylabel('Total Distance (Fitness)')
@@ -215,22 +279,68 @@ def plot_results(nodes, best_pos, history):
     
     # 4. Lưu ảnh
     plt.tight_layout()
-    output_filename = 'Hybrid_GWO_GA_WSN_Result.png'
     plt.savefig(output_filename, dpi=300, bbox_inches='tight')
     print(f">>> Đã lưu ảnh kết quả tại: {output_filename}")
-    plt.show()
+    if show:
+        plt.show()
+    plt.close(fig)
+    return output_filename
 
 # ==========================================
 # 5. MAIN
 # ==========================================
-if __name__ == "__main__":
-    np.random.seed(42) # Giữ cố định seed để bài báo cáo nhất quán
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Hybrid GWO-GA phân cụm WSN: chạy tối ưu và ghi kết quả, "
+                                                 "vẽ ảnh riêng bằng --render")
+    parser.add_argument('--nodes-file', default=NODES_FILE, help="Tập nút .npy (memmap) hoặc .txt; mặc định sinh ngẫu nhiên")
+    parser.add_argument('--workers', type=int, default=NUM_WORKERS, help="> 0: đánh giá song song")
+    parser.add_argument('--seed', type=int, default=SEED)
+    parser.add_argument('--out', default=OUTPUT, help="Tiền tố file kết quả")
+    parser.add_argument('--checkpoint', default=None, help="File checkpoint (ghi nguyên tử mỗi --checkpoint-every vòng lặp)")
+    parser.add_argument('--checkpoint-every', type=int, default=CHECKPOINT_EVERY)
+    parser.add_argument('--resume', action='store_true', help="Chạy tiếp từ --checkpoint nếu file đã có")
+    parser.add_argument('--plot', action='store_true', help="Vẽ ảnh sau khi chạy")
+    parser.add_argument('--show', action='store_true', help="Vẽ và hiển thị cửa sổ")
+    parser.add_argument('--render', nargs='+', metavar='PREFIX', help="Chỉ vẽ ảnh từ các kết quả đã lưu (song song)")
+    args = parser.parse_args(argv)
+
+    if args.render:
+        # Hậu xử lý: mỗi kết quả vẽ trong một process riêng
+        if len(args.render) > 1 and not args.show:
+            with ProcessPoolExecutor(min(len(args.render), os.cpu_count() or 1)) as executor:
+                list(executor.map(render, args.render))
+        else:
+            for prefix in args.render:
+                render(prefix, args.show)
+        return 0
+    
+    # Giữ cố định seed để bài báo cáo nhất quán
+    node_seed, run_seed = np.random.SeedSequence(args.seed).spawn(2)
     
     # 1. Khởi tạo
-    nodes = init_nodes()
+    nodes = load_nodes_any(args.nodes_file) if args.nodes_file else init_nodes(node_seed)
     
     # 2. Chạy tối ưu
-    best_solution, convergence_history = run_hybrid_GWO_GA(nodes)
+    if args.resume and not args.checkpoint:
+        parser.error("--resume cần --checkpoint")
+    checkpointing = dict(checkpoint=args.checkpoint, checkpoint_every=args.checkpoint_every, resume=args.resume)
+    if args.checkpoint:
+        # Chạy tiếp với seed hoặc tập nút khác (kể cả cùng số nút) sẽ bị từ chối
+        checkpointing['checkpoint_meta'] = dict(seed=args.seed, nodes_file=args.nodes_file,
+                                                nodes_sha1=nodes_fingerprint(nodes))
+    if args.workers > 0:
+        with make_executor(args.nodes_file or nodes, args.workers) as executor:
+            best_solution, convergence_history = run_hybrid_GWO_GA(nodes, executor, run_seed, **checkpointing)
+    else:
+        best_solution, convergence_history = run_hybrid_GWO_GA(nodes, seed=run_seed, **checkpointing)
     
-    # 3. Vẽ và Lưu
-    plot_results(nodes, best_solution, convergence_history)
\ No newline at end of file
+    # 3. Lưu kết quả (và vẽ nếu được yêu cầu)
+    prefix = save_results(args.out, nodes, best_solution, convergence_history, seed=args.seed,
+                          nodes_file=args.nodes_file)
+    print(f">>> Đã lưu kết quả: {prefix}.npz, {prefix}.json")
+    if args.plot or args.show:
+        render(prefix, args.show)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,325 @@
+import os
+import json
+import numpy as np
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+
+# ==========================================
+# BỘ SINH SỐ NGẪU NHIÊN (RNG)
+# ==========================================
+# Mọi optimizer nhận seed= (None, số nguyên, SeedSequence hoặc np.random.Generator) và rút số ngẫu nhiên
+# từ Generator riêng thay vì trạng thái toàn cục np.random, nên cùng seed cho cùng kết quả
+# dù chạy tuần tự, song song hay nhiều lần trong cùng một tiến trình.
+
+def as_generator(seed=None):
+    """Chuẩn hóa tham số seed= thành np.random.Generator (Generator truyền vào được dùng lại nguyên vẹn)"""
+    return np.random.default_rng(seed)
+
+
+def spawn_seeds(seed, count):
+    """
+    Tách count luồng ngẫu nhiên độc lập (SeedSequence con) từ một seed gốc,
+    dùng cho các đảo, worker hoặc các lần chạy lặp lại. seed có thể là None, số nguyên,
+    SeedSequence hoặc Generator (khi đó tách từ SeedSequence của chính Generator đó).
+    """
+    if isinstance(seed, np.random.Generator):
+        return seed.bit_generator.seed_seq.spawn(count)
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    return seed.spawn(count)
+
+
+def gwo_update(positions, alpha_pos, beta_pos, delta_pos, a, rng=None):
+    """
+    Cập nhật vị trí bầy sói (Bao vây con mồi) cho toàn bộ quần thể cùng lúc.
+    positions: Ma trận (pop, dim) vị trí hiện tại
+    alpha_pos, beta_pos, delta_pos: Vector (dim,) của 3 con đầu đàn
+    a: Hệ số giảm dần từ 2 xuống 0
+    rng: np.random.Generator (None = Generator mới, không cố định seed)
+    Trả về ma trận (pop, dim) vị trí mới, cùng kiểu dữ liệu với positions (float32 hoặc float64).
+    """
+    rng = as_generator(rng)
+    pop, dim = positions.shape
+
+    # Gộp 3 con đầu đàn thành ma trận (dim, 3) để broadcast với (pop, dim, 3)
+    leaders = np.stack((alpha_pos, beta_pos, delta_pos), axis=-1).astype(positions.dtype, copy=False)
+
+    # Rút toàn bộ r1, r2 trong một khối thay vì 6 lần gọi RNG cho mỗi ô
+    r1, r2 = rng.random((2, pop, dim, 3), dtype=positions.dtype)
+    A = 2 * a * r1 - a
+    C = 2 * r2
+
+    # D = |C * X_leader - X|, X_k = X_leader - A * D (k = 1, 2, 3)
+    D = np.abs(C * leaders - positions[:, :, np.newaxis])
+    X = leaders - A * D
+
+    # Vị trí mới: trung bình cộng X1, X2, X3
+    return X.sum(axis=2) / 3.0
+
+
+def ga_offspring(alpha_pos, beta_pos, num_children, lower_bound, upper_bound, mutation_rate, gene_weights=False,
+                 rng=None, dtype=np.float64):
+    """
+    Sinh num_children con lai GA cùng lúc: lai ghép số học Alpha-Beta rồi đột biến đều từng gen.
+    gene_weights: False - mỗi con một trọng số lai ghép; True - mỗi gen một trọng số (như bản C gốc)
+    Toàn bộ số ngẫu nhiên được rút theo khối (trọng số lai ghép, mặt nạ đột biến, giá trị đột biến).
+    rng: np.random.Generator (None = Generator mới, không cố định seed)
+    dtype: Kiểu dữ liệu của con lai (float32 / float64)
+    Trả về (children (n, dim), w_cross (n, 1) hoặc (n, dim), mask (n, dim) - True tại gen bị đột biến).
+    """
+    rng = as_generator(rng)
+    dim = len(alpha_pos)
+    w_cross = rng.random((num_children, dim if gene_weights else 1), dtype=dtype)
+    children = w_cross * alpha_pos + (1.0 - w_cross) * beta_pos
+    mask = rng.random((num_children, dim)) < mutation_rate
+    children[mask] = rng.uniform(lower_bound, upper_bound, np.count_nonzero(mask))
+    return children, w_cross, mask
+
+
+# ==========================================
+# CHẾ ĐỘ PHA LƯỢNG TỬ HÓA b-BIT (mã nguyên uint8)
+# ==========================================
+# Mỗi gen là chỉ số pha c trong [0, 2^b) của bộ dịch pha b-bit (pha = 2*pi*c / 2^b), quần thể lưu dạng uint8.
+# Pha tuần hoàn nên khoảng cách giữa hai mã được lấy theo vòng (trong [-2^b/2, 2^b/2)).
+
+def phase_levels(bits):
+    """Số mức pha 2^bits của bộ dịch pha bits-bit (1 <= bits <= 8 để mã vừa uint8)"""
+    if not 1 <= bits <= 8:
+        raise ValueError(f"phase_bits phải trong [1, 8], nhận được {bits!r}")
+    return 2 ** bits
+
+
+def random_codes(rng, shape, levels):
+    """Quần thể mã pha ngẫu nhiên đều (uint8)"""
+    return rng.integers(0, levels, shape, dtype=np.uint8)
+
+
+def gwo_update_codes(codes, alpha_pos, beta_pos, delta_pos, a, levels, rng=None):
+    """
+    gwo_update cho quần thể mã pha (pop, N) uint8: mỗi con đầu đàn được "mở vòng" về phía vị trí hiện tại
+    (leader' = X + khoảng cách vòng), áp dụng công thức GWO như với số thực, rồi làm tròn và lấy modulo levels.
+    Cùng số lần rút ngẫu nhiên với gwo_update.
+    """
+    rng = as_generator(rng)
+    pop, dim = codes.shape
+    x = codes.astype(float)[:, :, np.newaxis]
+    leaders = np.stack((alpha_pos, beta_pos, delta_pos), axis=-1).astype(float)
+    half = levels / 2
+    leaders = x + (np.mod(leaders - x + half, levels) - half)
+
+    r1, r2 = rng.random((2, pop, dim, 3))
+    A = 2 * a * r1 - a
+    C = 2 * r2
+    X = leaders - A * np.abs(C * leaders - x)
+    return np.mod(np.rint(X.sum(axis=2) / 3.0), levels).astype(np.uint8)
+
+
+def ga_offspring_codes(alpha_pos, beta_pos, num_children, levels, mutation_rate, rng=None):
+    """
+    ga_offspring cho mã pha: lai ghép đồng nhất (mỗi gen lấy từ Alpha với xác suất w_cross của con đó,
+    ngược lại từ Beta) và đột biến thành một mã ngẫu nhiên trong [0, levels).
+    Trả về (children (n, N) uint8, mask (n, N) - True tại gen bị đột biến).
+    """
+    rng = as_generator(rng)
+    dim = len(alpha_pos)
+    w_cross = rng.random((num_children, 1))
+    children = np.where(rng.random((num_children, dim)) < w_cross, alpha_pos, beta_pos).astype(np.uint8)
+    mask = rng.random((num_children, dim)) < mutation_rate
+    children[mask] = rng.integers(0, levels, np.count_nonzero(mask), dtype=np.uint8)
+    return children, mask
+
+
+def select_leaders(fitness, k=3, maximize=True):
+    """Chỉ số k cá thể tốt nhất theo thứ tự (Alpha, Beta, Delta...) bằng một lần argpartition, O(pop)"""
+    key = -np.asarray(fitness) if maximize else np.asarray(fitness)
+    top = np.argpartition(key, k - 1)[:k]
+    return top[np.argsort(key[top], kind='stable')]
+
+
+def split_best(fitness, num_best, maximize=True):
+    """
+    Hoán vị chỉ số đưa num_best cá thể tốt nhất lên đầu (không sắp xếp bên trong từng nhóm),
+    dùng khi chỉ cần chia quần thể thành nửa tốt / nửa yếu.
+    """
+    key = -np.asarray(fitness) if maximize else np.asarray(fitness)
+    if num_best <= 0 or num_best >= len(key):
+        return np.arange(len(key))
+    return np.argpartition(key, num_best - 1)
+
+
+# Độ dài bước ban đầu của gradient_polish, tương đối theo ||p||
+POLISH_STEP = 0.05
+
+
+def gradient_polish(fitness_func, positions, scores, steps, lower_bound, upper_bound, step_size=POLISH_STEP):
+    """
+    Tinh chỉnh cục bộ (giai đoạn memetic) k vị trí tốt nhất bằng vài bước leo gradient, vector hóa trên cả k.
+    Cần fitness_func.surrogate_grad(P) -> (giá trị, gradient (k, dim)) của một hàm mục tiêu trơn
+    (ví dụ JCASObjective: max_SLL thay bằng log-sum-exp). Mỗi bước thử vị trí mới cho cả k cùng lúc theo
+    hướng gradient (độ dài bước tương đối theo ||p||) và đánh giá bằng fitness thật: vị trí nào tốt lên
+    (tìm max) thì nhận và gấp đôi bước, không thì giữ nguyên và giảm nửa bước.
+    Trả về (positions, scores, số lần đánh giá fitness).
+    """
+    positions = np.array(positions, dtype=float, ndmin=2)
+    scores = np.array(scores, dtype=float, ndmin=1)
+    eta = np.full((len(positions), 1), step_size)
+    for _ in range(steps):
+        _, grad = fitness_func.surrogate_grad(positions)
+        scale = eta * np.linalg.norm(positions, axis=1, keepdims=True) / (np.linalg.norm(grad, axis=1, keepdims=True) + 1e-300)
+        trial = np.clip(positions + scale * grad, lower_bound, upper_bound)
+        trial_scores = evaluate_population(fitness_func, trial)
+        better = trial_scores > scores
+        positions[better] = trial[better]
+        scores[better] = trial_scores[better]
+        eta = np.where(better[:, np.newaxis], eta * 2, eta * 0.5)
+    return positions, scores, steps * len(positions)
+
+
+def evaluate_population(fitness_func, positions, executor=None):
+    """
+    Đánh giá fitness cho toàn bộ quần thể.
+    Nếu hàm mục tiêu có phiên bản batch (thuộc tính fitness_func.batch nhận ma trận (pop, dim)
+    và trả về vector điểm), ưu tiên dùng nó: cả quần thể chỉ tốn một phép nhân ma trận.
+    Ngược lại đánh giá lần lượt từng con sói.
+    executor: ParallelEvaluator hoặc concurrent.futures.Executor để chia quần thể cho nhiều worker.
+    """
+    if executor is not None:
+        return as_evaluator(executor).evaluate(fitness_func, positions)
+    batch_func = getattr(fitness_func, 'batch', None)
+    if batch_func is not None:
+        return np.asarray(batch_func(positions), dtype=float)
+    return np.array([fitness_func(positions[i]) for i in range(len(positions))], dtype=float)
+
+
+# ==========================================
+# ĐÁNH GIÁ SONG SONG (Process / Thread pool)
+# ==========================================
+
+# Hàm fitness được dựng sẵn trong mỗi worker process (xem ParallelEvaluator.fitness_factory)
+_worker_fitness = None
+
+
+def _init_worker(fitness_factory, factory_args):
+    """Chạy một lần khi worker khởi động: dựng hàm fitness (và JCAS_System bên trong) tại chỗ"""
+    global _worker_fitness
+    _worker_fitness = fitness_factory(*factory_args)
+
+
+def _evaluate_chunk(fitness_func, chunk):
+    """Đánh giá một khối sói trong worker; fitness_func = None nghĩa là dùng hàm dựng sẵn của worker"""
+    if fitness_func is None:
+        fitness_func = _worker_fitness
+    return evaluate_population(fitness_func, chunk)
+
+
+class ParallelEvaluator:
+    """
+    Đánh giá quần thể trên nhiều lõi bằng process pool hoặc thread pool.
+    
+    * Quần thể được chia thành các khối liên tiếp (chunks_per_worker khối mỗi worker) để giảm
+      chi phí IPC: mỗi khối chỉ tốn một lần gửi/nhận, và trong worker vẫn dùng fitness batch nếu có.
+    * fitness_factory(*factory_args): nếu có, hàm fitness được dựng một lần trong mỗi worker
+      (JCAS_System, ma trận lái... không phải pickle lại ở mỗi vòng lặp). Khi đó tham số
+      fitness_func truyền vào evaluate() bị bỏ qua.
+    * Kết quả được ghép theo đúng thứ tự khối, mọi số ngẫu nhiên vẫn được rút ở tiến trình chính,
+      nên với cùng seed kết quả trùng khớp với chế độ tuần tự.
+    """
+    def __init__(self, kind='process', max_workers=None, fitness_factory=None, factory_args=(),
+                 chunks_per_worker=1, executor=None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.chunks_per_worker = chunks_per_worker
+        self._owns_executor = executor is None
+        self._local_fitness = None
+        self._worker_side = False
+        
+        if executor is not None:
+            # Dùng lại pool có sẵn do người gọi quản lý
+            self.executor = executor
+            self.max_workers = getattr(executor, '_max_workers', self.max_workers)
+        elif kind == 'process':
+            if fitness_factory is not None:
+                self.executor = ProcessPoolExecutor(self.max_workers, initializer=_init_worker,
+                                                    initargs=(fitness_factory, factory_args))
+                self._worker_side = True
+            else:
+                self.executor = ProcessPoolExecutor(self.max_workers)
+        elif kind == 'thread':
+            # Các thread dùng chung bộ nhớ: chỉ cần dựng hàm fitness một lần
+            self.executor = ThreadPoolExecutor(self.max_workers)
+            if fitness_factory is not None:
+                self._local_fitness = fitness_factory(*factory_args)
+        else:
+            raise ValueError(f"kind phải là 'process' hoặc 'thread', nhận được {kind!r}")
+
+    def evaluate(self, fitness_func, positions):
+        """Đánh giá ma trận quần thể (pop, dim), trả về vector điểm (pop,) theo đúng thứ tự"""
+        if self._local_fitness is not None:
+            fitness_func = self._local_fitness
+        n_chunks = max(1, min(len(positions), self.max_workers * self.chunks_per_worker))
+        chunks = np.array_split(positions, n_chunks)
+        func = None if self._worker_side else fitness_func
+        results = self.executor.map(_evaluate_chunk, [func] * n_chunks, chunks)
+        return np.concatenate(list(results))
+
+    def shutdown(self):
+        if self._owns_executor:
+            self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+
+def as_evaluator(executor):
+    """Chuẩn hóa tham số executor= của các optimizer: None, ParallelEvaluator hoặc Executor"""
+    if executor is None or isinstance(executor, ParallelEvaluator):
+        return executor
+    if isinstance(executor, Executor):
+        return ParallelEvaluator(executor=executor)
+    raise TypeError(f"executor không hợp lệ: {executor!r}")
+
+
+# ==========================================
+# CHECKPOINT / CHẠY TIẾP (RESUME)
+# ==========================================
+# Trạng thái bộ tối ưu (quần thể, fitness, lãnh đạo, lịch sử, vòng lặp kế tiếp...) ghi thành một file .npz
+# nhị phân không nén, không pickle. Ghi nguyên tử: <path>.tmp -> fsync -> os.replace, nên tiến trình bị dừng
+# (preempt) giữa lúc ghi vẫn để lại checkpoint trước đó nguyên vẹn. Trạng thái RNG (PCG64 dùng số nguyên
+# 128-bit) và cấu hình được lưu dạng chuỗi JSON.
+
+def save_checkpoint(path, rng, config=None, **arrays):
+    """
+    Ghi checkpoint nguyên tử ra path (giữ nguyên tên file, không tự thêm đuôi .npz), trả về path.
+    rng: np.random.Generator của bộ tối ưu; config: dict cấu hình (kiểm tra lại khi chạy tiếp);
+    arrays: các mảng / số trạng thái.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        np.savez(f, rng_state=np.array(json.dumps(rng.bit_generator.state)),
+                 config=np.array(json.dumps(config or {}, sort_keys=True)), **arrays)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return path
+
+
+def load_checkpoint(path, rng=None, config=None):
+    """
+    Đọc checkpoint do save_checkpoint ghi, trả về dict các mảng trạng thái.
+    rng: Generator được khôi phục trạng thái tại chỗ (cùng loại bit generator);
+    config: nếu có, phải khớp cấu hình đã lưu, ngược lại ValueError.
+    """
+    with np.load(path, allow_pickle=False) as data:
+        state = {key: data[key] for key in data.files}
+    saved = json.loads(str(state.pop('config')))
+    if config is not None and saved != json.loads(json.dumps(config, sort_keys=True)):
+        raise ValueError(f"Checkpoint {path} không khớp cấu hình: đã lưu {saved}, hiện tại {config}")
+    rng_state = json.loads(str(state.pop('rng_state')))
+    if rng is not None:
+        rng.bit_generator.state = rng_state
+    return state
@@ -0,0 +1,85 @@
+import hashlib
+import numpy as np
+
+# ==========================================
+# ĐỌC / GHI TẬP DỮ LIỆU NÚT CẢM BIẾN
+# ==========================================
+# Định dạng nhị phân theo cột: file .npy chứa mảng float64 (2, NUM_NODES) - hàng 0 là x, hàng 1 là y.
+# Mở bằng memory-map nên tập dữ liệu lớn hơn RAM vẫn dùng được; mỗi khối nút của WSNFitness
+# chỉ đọc 2 đoạn liên tục trên đĩa.
+
+# Số nút ghi mỗi lần khi sinh / chuyển đổi dữ liệu (2 * 1M * 8 byte = 16 MB)
+WRITE_CHUNK = 1 << 20
+
+
+def load_nodes(path, mmap=True):
+    """
+    Đọc tập nút từ file .npy dạng cột, trả về ma trận (NUM_NODES, 2) - là view của memmap
+    (không đọc dữ liệu vào RAM) khi mmap=True.
+    """
+    columns = np.load(path, mmap_mode='r' if mmap else None)
+    if columns.ndim != 2 or columns.shape[0] != 2:
+        raise ValueError(f"{path}: cần mảng (2, NUM_NODES), nhận được shape {columns.shape}")
+    return columns.T
+
+
+def save_nodes(path, nodes):
+    """Ghi ma trận nút (NUM_NODES, 2) (kể cả memmap) ra file .npy dạng cột, theo từng khối"""
+    columns = np.lib.format.open_memmap(path, mode='w+', dtype=np.float64, shape=(2, len(nodes)))
+    for start in range(0, len(nodes), WRITE_CHUNK):
+        columns[:, start:start + WRITE_CHUNK] = np.asarray(nodes[start:start + WRITE_CHUNK], dtype=float).T
+    columns.flush()
+    del columns
+    return load_nodes(path)
+
+
+def generate_nodes(path, num_nodes, area_size, seed=None):
+    """Sinh num_nodes nút ngẫu nhiên trong vùng area_size x area_size thẳng vào file, không giữ cả tập trong RAM"""
+    rng = np.random.default_rng(seed)
+    columns = np.lib.format.open_memmap(path, mode='w+', dtype=np.float64, shape=(2, num_nodes))
+    for start in range(0, num_nodes, WRITE_CHUNK):
+        stop = min(start + WRITE_CHUNK, num_nodes)
+        columns[:, start:stop] = rng.uniform(0, area_size, (2, stop - start))
+    columns.flush()
+    del columns
+    return load_nodes(path)
+
+
+def load_text(path):
+    """
+    Đọc file text cách nhau bởi khoảng trắng (data_nodes.txt, data_chs.txt, data_history.txt)
+    bằng bộ đọc C của np.loadtxt - phân tích cả file một lần, không có vòng lặp Python theo dòng.
+    Trả về ma trận (số dòng, số cột).
+    """
+    return np.loadtxt(path, dtype=float, ndmin=2)
+
+
+def save_text(path, data, fmt='%.4f'):
+    """Ghi ma trận ra file text cùng định dạng với các file data_*.txt"""
+    np.savetxt(path, data, fmt=fmt)
+
+
+def text_to_nodes(text_path, npy_path):
+    """Chuyển file nút dạng text (x y mỗi dòng) sang định dạng nhị phân theo cột"""
+    nodes = load_text(text_path)
+    if nodes.shape[1] != 2:
+        raise ValueError(f"{text_path}: cần 2 cột (x y), nhận được {nodes.shape[1]}")
+    return save_nodes(npy_path, nodes)
+
+
+def load_nodes_any(path):
+    """Đọc tập nút từ .npy (memmap) hoặc file text"""
+    if path.endswith('.npy'):
+        return load_nodes(path)
+    return load_text(path)
+
+
+def nodes_fingerprint(nodes):
+    """
+    Mã băm sha1 của tọa độ nút (NUM_NODES, 2), đọc theo từng khối (memmap không bị nạp hết vào RAM):
+    dùng để nhận ra tập nút khác khi chạy tiếp từ checkpoint
+    """
+    digest = hashlib.sha1()
+    for start in range(0, len(nodes), WRITE_CHUNK):
+        digest.update(np.ascontiguousarray(nodes[start:start + WRITE_CHUNK], dtype=np.float64).tobytes())
+    return digest.hexdigest()
@@ -0,0 +1,128 @@
+import numpy as np
+
+# ==========================================
+# HÀM FITNESS WSN QUY MÔ LỚN
+# ==========================================
+# Fitness = tổng khoảng cách từ mỗi nút về CH gần nhất (giống calculate_fitness trong plot_results.py),
+# nhưng không dựng tensor (NUM_NODES, NUM_CLUSTERS, 2) cho cả mạng:
+#   - So sánh bằng bình phương khoảng cách, chỉ lấy sqrt cho khoảng cách nhỏ nhất của mỗi nút
+#   - Duyệt nút theo từng khối (chunk) để bộ nhớ tạm bị chặn bởi max_elements, không phụ thuộc số nút
+#   - Nhiều CH: chỉ mục lưới (grid index) trên các CH, mỗi nút chỉ so với CH trong 3x3 ô lân cận
+
+# Số phần tử tối đa của mảng khoảng cách tạm trong một khối (float64: 64K phần tử = 512 KB, vừa cache L2;
+# khối lớn hơn chậm hơn vì bị giới hạn băng thông bộ nhớ)
+MAX_ELEMENTS = 1 << 16
+# Từ số CH này trở lên, 'auto' dùng chỉ mục lưới thay vì so với mọi CH
+GRID_MIN_CLUSTERS = 32
+# Số CH mỗi ô dùng để ước lượng độ rộng bảng ứng viên (9 ô) khi chọn kích thước khối nút ở chế độ 'grid'
+GRID_CELL_CAPACITY = 4
+
+
+class WSNFitness:
+    """
+    Hàm fitness phân cụm WSN cho mạng lớn (10^5 - 10^6 nút, hàng trăm CH).
+    Gọi như hàm: fitness(position) -> float; cả quần thể: fitness.batch(positions (pop, 2K)) -> (pop,)
+    (evaluate_population tự nhận ra .batch giống JCASObjective bên jcas_GWO).
+
+    nodes: Ma trận (n, 2) bất kỳ hỗ trợ cắt lát, kể cả memmap từ wsn_data.load_nodes - không sao chép,
+           mỗi lần batch chỉ đọc tuần tự từng khối nút một lượt cho cả quần thể, nên dữ liệu lớn hơn RAM
+           vẫn đánh giá được.
+    method: 'brute' - so mỗi nút với mọi CH (tốt khi K nhỏ)
+            'grid'  - chỉ mục lưới trên CH cho từng con sói (tốt khi K lớn)
+            'auto'  - chọn theo số CH (GRID_MIN_CLUSTERS)
+    cell_occupancy: Số CH trung bình mỗi ô lưới
+    """
+    def __init__(self, nodes, num_clusters, area_size, method='auto', max_elements=MAX_ELEMENTS,
+                 cell_occupancy=1.0):
+        if method == 'auto':
+            method = 'grid' if num_clusters >= GRID_MIN_CLUSTERS else 'brute'
+        if method not in ('brute', 'grid'):
+            raise ValueError(f"method phải là 'auto', 'brute' hoặc 'grid', nhận được {method!r}")
+        self.nodes = nodes
+        self.K = num_clusters
+        self.area_size = area_size
+        self.method = method
+        self.max_elements = max_elements
+        self.num_nodes = len(nodes)
+        if method == 'grid':
+            # Lưới G x G cố định theo K
+            self.G = max(1, int(np.sqrt(num_clusters / cell_occupancy)))
+            self.cell = area_size / self.G
+
+    def __call__(self, position):
+        return float(self.batch(np.reshape(position, (1, -1)))[0])
+
+    def batch(self, positions):
+        chs = np.reshape(positions, (-1, self.K, 2))
+        pop = len(chs)
+        if self.method == 'grid':
+            tables = [self._candidate_coords(c) for c in chs]
+            # Bảng ứng viên rộng khoảng 9 ô x vài CH mỗi ô
+            chunk = self.max_elements // (9 * GRID_CELL_CAPACITY)
+        else:
+            chunk = self.max_elements // self.K
+        # Kích thước khối chỉ phụ thuộc K, không phụ thuộc số con sói, và mỗi con sói được cộng dồn
+        # riêng theo đúng thứ tự các nút, nên điểm của một con sói không đổi dù đánh giá một mình,
+        # cùng cả quần thể hay chia cho nhiều worker.
+        chunk = max(1, chunk)
+
+        total = np.zeros(pop)
+        for start in range(0, self.num_nodes, chunk):
+            block = np.asarray(self.nodes[start:start + chunk], dtype=float)
+            x = block[:, 0, np.newaxis]
+            y = block[:, 1, np.newaxis]
+            if self.method == 'grid':
+                cells, margin_sq = self._node_cells(x[:, 0], y[:, 0])
+                for p in range(pop):
+                    total[p] += self._grid_block(x, y, cells, margin_sq, *tables[p])
+            else:
+                for p in range(pop):
+                    d2 = (x - chs[p, :, 0])**2 + (y - chs[p, :, 1])**2
+                    total[p] += np.sqrt(d2.min(axis=1)).sum()
+        return total
+
+    def _node_cells(self, x, y):
+        """
+        Ô lưới của từng nút và bình phương khoảng cách từ nút tới biên khối 3x3 ô quanh nó:
+        mọi CH ngoài khối đều xa hơn mức này, nên nếu CH ứng viên gần nhất nằm trong bán kính này
+        thì kết quả là chính xác.
+        """
+        ix = np.clip((x // self.cell).astype(np.intp), 0, self.G - 1)
+        iy = np.clip((y // self.cell).astype(np.intp), 0, self.G - 1)
+        edge = np.minimum(np.minimum(x - ix * self.cell, (ix + 1) * self.cell - x),
+                          np.minimum(y - iy * self.cell, (iy + 1) * self.cell - y))
+        return ix * self.G + iy, (self.cell + np.maximum(edge, 0.0))**2
+
+    def _candidate_coords(self, chs):
+        """
+        Tọa độ CH ứng viên theo ô: bảng (G*G, 9*maxc) các CH nằm trong 3x3 ô quanh mỗi ô,
+        chỗ trống là CH giả ở vô cực. Trả về (cand_x, cand_y, cx, cy).
+        """
+        G = self.G
+        ix = np.clip((chs[:, 0] // self.cell).astype(np.intp), 0, G - 1)
+        iy = np.clip((chs[:, 1] // self.cell).astype(np.intp), 0, G - 1)
+        cell = ix * G + iy
+        order = np.argsort(cell, kind='stable')
+        counts = np.bincount(cell, minlength=G * G)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        rank = np.arange(self.K) - starts[cell[order]]
+
+        # Bảng theo ô, viền thêm 1 ô rỗng mỗi phía để lấy lân cận không cần kiểm tra biên
+        table = np.full((G + 2, G + 2, counts.max()), self.K, dtype=np.intp)
+        table[ix[order] + 1, iy[order] + 1, rank] = order
+        neighbours = [table[1 + di:G + 1 + di, 1 + dj:G + 1 + dj] for di in (-1, 0, 1) for dj in (-1, 0, 1)]
+        candidates = np.concatenate(neighbours, axis=2).reshape(G * G, -1)
+
+        cx = np.append(chs[:, 0], np.inf)
+        cy = np.append(chs[:, 1], np.inf)
+        return cx[candidates], cy[candidates], cx[:-1], cy[:-1]
+
+    def _grid_block(self, x, y, cells, margin_sq, cand_x, cand_y, cx, cy):
+        """Tổng khoảng cách tới CH gần nhất cho một khối nút (x, y: (c, 1)) của một con sói"""
+        min_d2 = ((x - cand_x[cells])**2 + (y - cand_y[cells])**2).min(axis=1)
+
+        # Nút có CH ứng viên gần nhất xa hơn biên khối 3x3: so lại với mọi CH (hiếm khi xảy ra)
+        far = np.flatnonzero(min_d2 > margin_sq)
+        if len(far):
+            min_d2[far] = ((x[far] - cx)**2 + (y[far] - cy)**2).min(axis=1)
+        return np.sqrt(min_d2).sum()
@@ -0,0 +1,151 @@
+import os
+import json
+import time
+import numpy as np
+from jcas_model import JCAS_System
+from ils_optimizer import ILS_Optimizer
+
+
+def uniform_grid(angles):
+    """Kiểm tra lưới góc cách đều, trả về (start, step, count) để tra cứu O(1)"""
+    angles = np.asarray(angles, dtype=float)
+    if angles.ndim != 1 or len(angles) == 0:
+        raise ValueError("Lưới góc phải là mảng 1 chiều, không rỗng")
+    if len(angles) == 1:
+        return float(angles[0]), 1.0, 1
+    steps = np.diff(angles)
+    if steps[0] <= 0 or not np.allclose(steps, steps[0]):
+        raise ValueError("Lưới góc phải tăng dần và cách đều")
+    return float(angles[0]), float(steps[0]), len(angles)
+
+
+def ils_solver(jcas, max_iter=50, seed=None):
+    """Bộ giải mặc định khi dựng codebook: ILS cho từng cặp (user, target), cùng seed -> cùng codebook"""
+    rng = np.random.default_rng(seed)
+
+    def solve(user_angle, target_angle):
+        w, _ = ILS_Optimizer(jcas, user_angle, target_angle, jcas.N, seed=rng).optimize(max_iter=max_iter)
+        return w
+    return solve
+
+
+class BeamCodebook:
+    """
+    Codebook trọng số beamforming tính trước trên lưới (user, target) lượng tử hóa.
+
+    Lưu trên đĩa thành 2 file:
+      <path>.npy  : mảng complex64 (số góc user, số góc target, N) - mở bằng memory-map,
+                    mỗi lần tra cứu chỉ đọc đúng một hàng N phần tử
+      <path>.json : thông tin lưới (start, step, count) và tham số mảng ăng-ten
+    Tra cứu O(1): chỉ số = round((góc - start) / step), không tìm kiếm.
+
+    Dựng codebook (offline) bằng BeamCodebook.build(path, jcas, user_angles, target_angles, solver),
+    solver(user_angle, target_angle) -> w có thể là ILS (mặc định) hoặc Hybrid GWO-GA, ví dụ:
+        def solver(u, t):
+            f = JCASObjective(N, u, t)
+            pos, _ = Hybrid_GWO_GA_Optimizer(f, 2*N, 30, 100, -1, 1, verbose=False).optimize()
+            return pos[:N] + 1j * pos[N:]
+    """
+    def __init__(self, path, jcas=None):
+        self.path = path
+        with open(path + '.json') as f:
+            self.meta = json.load(f)
+        self.N = self.meta['num_antennas']
+        self.user_start, self.user_step, self.num_user = self.meta['user_grid']
+        self.target_start, self.target_step, self.num_target = self.meta['target_grid']
+        self._jcas = jcas
+        self._weights = None # Chỉ mở memory-map ở lần tra cứu đầu tiên
+
+    @classmethod
+    def build(cls, path, jcas, user_angles, target_angles, solver=None, verbose=True):
+        """
+        Quét toàn bộ lưới (user_angles x target_angles), giải từng cặp bằng solver và ghi thẳng
+        vào file .npy qua memory-map (không giữ toàn bộ codebook trong RAM).
+        """
+        user_grid = uniform_grid(user_angles)
+        target_grid = uniform_grid(target_angles)
+        if solver is None:
+            solver = ils_solver(jcas)
+        user_angles = user_grid[0] + user_grid[1] * np.arange(user_grid[2])
+        target_angles = target_grid[0] + target_grid[1] * np.arange(target_grid[2])
+
+        weights = np.lib.format.open_memmap(path + '.npy', mode='w+', dtype=np.complex64,
+                                            shape=(len(user_angles), len(target_angles), jcas.N))
+        start = time.perf_counter()
+        for i, user_angle in enumerate(user_angles):
+            for j, target_angle in enumerate(target_angles):
+                w = np.reshape(solver(user_angle, target_angle), -1)
+                weights[i, j] = w / np.linalg.norm(w)
+            if verbose:
+                print(f"User = {user_angle:.1f}: {len(target_angles)} cặp góc, "
+                      f"{time.perf_counter() - start:.1f} s")
+        weights.flush()
+        del weights
+
+        meta = {
+            'num_antennas': jcas.N, 'frequency': jcas.fc, 'spacing_ratio': jcas.d / jcas.lam,
+            'user_grid': list(user_grid), 'target_grid': list(target_grid),
+        }
+        with open(path + '.json', 'w') as f:
+            json.dump(meta, f, indent=2)
+        return cls(path, jcas)
+
+    @property
+    def weights(self):
+        if self._weights is None:
+            self._weights = np.load(self.path + '.npy', mmap_mode='r')
+        return self._weights
+
+    @property
+    def jcas(self):
+        # Chỉ cần khi lái lại / tinh chỉnh nghiệm tra được
+        if self._jcas is None:
+            self._jcas = JCAS_System(self.N, frequency=self.meta['frequency'],
+                                     spacing_ratio=self.meta['spacing_ratio'])
+        return self._jcas
+
+    def index(self, user_angle, target_angle):
+        """Chỉ số ô lưới gần nhất (cắt về biên lưới nếu góc nằm ngoài)"""
+        i = min(max(int(round((user_angle - self.user_start) / self.user_step)), 0), self.num_user - 1)
+        j = min(max(int(round((target_angle - self.target_start) / self.target_step)), 0), self.num_target - 1)
+        return i, j
+
+    def grid_angles(self, i, j):
+        return self.user_start + i * self.user_step, self.target_start + j * self.target_step
+
+    def lookup(self, user_angle, target_angle, interpolate=False, refine=0):
+        """
+        Trả về vector trọng số (N,) complex cho cặp góc gần nhất trên lưới.
+        interpolate: Lái lại nghiệm ô lưới gần nhất sang đúng góc yêu cầu (JCAS_System.resteer_weights)
+        refine: Số vòng lặp ILS khởi tạo nóng từ nghiệm tra được (0 = không tinh chỉnh)
+        """
+        i, j = self.index(user_angle, target_angle)
+        w = np.array(self.weights[i, j], dtype=complex)
+        if interpolate:
+            w = self.jcas.resteer_weights(w, self.grid_angles(i, j), (user_angle, target_angle))
+            w = w / np.linalg.norm(w)
+        if refine > 0:
+            optimizer = ILS_Optimizer(self.jcas, user_angle, target_angle, self.N)
+            w, _ = optimizer.optimize(max_iter=refine, initial_weights=w)
+        return w
+
+    def nbytes(self):
+        return os.path.getsize(self.path + '.npy')
+
+
+if __name__ == "__main__":
+    N = 64
+    jcas = JCAS_System(num_antennas=N)
+    path = 'jcas_codebook'
+
+    print("Dựng codebook ILS (User -30..0 độ, Target 15..45 độ, bước 5 độ)...")
+    BeamCodebook.build(path, jcas, np.arange(-30, 1, 5.0), np.arange(15, 46, 5.0))
+
+    codebook = BeamCodebook(path)
+    print(f"Kích thước file: {codebook.nbytes() / 1024:.1f} KiB")
+    queries = np.random.uniform([-30, 15], [0, 45], (1000, 2))
+    for label, kwargs in (('nearest', {}), ('interpolate', {'interpolate': True})):
+        start = time.perf_counter()
+        for u, t in queries:
+            codebook.lookup(u, t, **kwargs)
+        print(f"Tra cứu {label}: {(time.perf_counter() - start) / len(queries) * 1e6:.1f} us / lần")
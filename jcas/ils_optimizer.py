@@ -1,91 +1,227 @@
 import numpy as np
+from collections import OrderedDict
+from stopping import StoppingCriteria
+from instrumentation import NULL_PROBE
+
+# Cache phân tích SVD của B = A^H theo (N, d, lambda, dtype, lưới góc mẫu): B cố định với mỗi mảng ăng-ten
+# và lưới góc, nên chỉ cần phân tích một lần cho mọi lần chạy / mọi kịch bản User-Target.
+_FACTOR_CACHE = OrderedDict()
+_FACTOR_CACHE_SIZE = 8
+
+
+def ls_factor(jcas, sample_angles):
+    """
+    Trả về (B, B_pinv) với B = A^H (M, N) và B_pinv (N, M) là giả nghịch đảo tính từ SVD của B.
+    Nghiệm B_pinv @ y trùng với np.linalg.lstsq(B, y) (nghiệm chuẩn nhỏ nhất, cùng ngưỡng rcond),
+    nên mỗi vòng lặp ILS chỉ còn một phép nhân ma trận thay vì phân tích lại B từ đầu.
+    """
+    sample_angles = np.asarray(sample_angles, dtype=float)
+    key = (jcas.N, jcas.d, jcas.lam, np.dtype(jcas.dtype).str, sample_angles.shape, sample_angles.tobytes())
+    if key in _FACTOR_CACHE:
+        _FACTOR_CACHE.move_to_end(key)
+        return _FACTOR_CACHE[key]
+
+    B = jcas.steering_vector(sample_angles).conj().T
+    U, s, Vh = np.linalg.svd(B, full_matrices=False)
+    # Bỏ các giá trị suy biến nhỏ như lstsq (rcond=None): eps * max(M, N) * s_max
+    cutoff = np.finfo(s.dtype).eps * max(B.shape) * s[0]
+    s_inv = np.where(s > cutoff, 1.0 / s, 0.0)
+    B_pinv = np.matmul(Vh.conj().T * s_inv, U.conj().T)
+    B.setflags(write=False)
+    B_pinv.setflags(write=False)
+
+    _FACTOR_CACHE[key] = (B, B_pinv)
+    if len(_FACTOR_CACHE) > _FACTOR_CACHE_SIZE:
+        _FACTOR_CACHE.popitem(last=False)
+    return B, B_pinv
+
+
+def desired_pattern(sample_angles, user_angles, target_angles):
+    """
+    Biên độ mong muốn (M, S) cho S kịch bản: = 1 tại hướng User/Target (mở rộng +-1 mẫu), = 0 ở nơi khác
+    """
+    user_angles = np.atleast_1d(user_angles)
+    target_angles = np.atleast_1d(target_angles)
+    M = len(sample_angles)
+    desired_magnitude = np.zeros((M, len(user_angles)))
+    for s, (user_angle, target_angle) in enumerate(zip(user_angles, target_angles)):
+        # Tìm chỉ số (index) gần đúng nhất của góc User và Target
+        idx_user = np.abs(sample_angles - user_angle).argmin()
+        idx_target = np.abs(sample_angles - target_angle).argmin()
+        # Mở rộng nhẹ vùng đỉnh (+- 1 độ) để búp sóng không quá nhọn
+        desired_magnitude[max(0, idx_user-1):min(M, idx_user+2), s] = 1.0
+        desired_magnitude[max(0, idx_target-1):min(M, idx_target+2), s] = 1.0
+    return desired_magnitude
+
+
+def ils_batch(jcas, user_angles, target_angles, max_iter=20, initial_weights=None, target_error=None,
+              sample_angles=None, stopping=None, rng=None, probe=None):
+    """
+    Giải ILS đồng thời cho S kịch bản (user_angles[s], target_angles[s]) như một hệ nhiều vế phải:
+    mỗi vòng lặp là W = B_pinv @ Y với Y (M, S), thay vì S lần gọi lstsq.
+    initial_weights: Ma trận (S, N) - khởi tạo nóng pha ban đầu từ búp sóng của các w này
+    target_error: Dừng sớm khi lỗi của MỌI kịch bản xuống dưới ngưỡng
+    stopping: StoppingCriteria (tìm min, xét lỗi lớn nhất trong các kịch bản); lý do dừng ở stopping.reason
+    rng: seed hoặc np.random.Generator cho pha ban đầu ngẫu nhiên
+    probe: instrumentation.Profiler - thời gian pha 'solve' (bước LS) / 'pattern' (búp sóng, pha, lỗi)
+    Trả về (W (S, N), history (số vòng lặp, S) lỗi LS từng kịch bản).
+    """
+    # Lấy mẫu dày đặc để ép búp sóng phụ xuống
+    if sample_angles is None:
+        sample_angles = np.linspace(-90, 90, 181)
+    desired_magnitude = desired_pattern(sample_angles, user_angles, target_angles)
+    M, S = desired_magnitude.shape
+    B, B_pinv = ls_factor(jcas, sample_angles)
+
+    # Vì ta chỉ quan tâm biên độ |A^H w| khớp với |d|, còn pha có thể tự do,
+    # thuật toán lặp để chỉnh pha. Pha ban đầu ngẫu nhiên hoặc lấy từ búp sóng của initial_weights.
+    if initial_weights is None:
+        current_phase = np.exp(1j * np.random.default_rng(rng).random((M, S)) * 2 * np.pi)
+    else:
+        W0 = np.reshape(initial_weights, (S, -1)).T
+        current_phase = np.exp(1j * np.angle(np.matmul(B, W0)))
+
+    if stopping is None:
+        stopping = StoppingCriteria()
+    stopping.start(maximize=False)
+    if probe is None:
+        probe = NULL_PROBE
+    probe.begin('ILS', num_antennas=jcas.N, scenarios=S, samples=M, max_iter=max_iter)
+    history = []
+    for i in range(max_iter):
+        probe.iteration_start(i)
+        # Vector mục tiêu phức (Biên độ mong muốn + Pha hiện tại)
+        Y = desired_magnitude * current_phase
+
+        # Bước 1: Least Squares - Pattern P = w^H A, lấy liên hợp: P^H = A^H w = B w ~ y
+        W = np.matmul(B_pinv, Y)
+        # Chuẩn hóa công suất từng cột w
+        W = W / np.linalg.norm(W, axis=0)
+        probe.mark('solve')
+
+        # Bước 2: Cập nhật pha theo búp sóng thực tế thu được, giữ nguyên biên độ mong muốn
+        pattern_actual = np.matmul(B, W)
+        current_phase = np.exp(1j * np.angle(pattern_actual))
+
+        # Lỗi (Error/Fitness) từng kịch bản
+        error = np.linalg.norm(np.abs(pattern_actual) - desired_magnitude, axis=0)
+        history.append(error)
+        probe.mark('pattern')
+        probe.count('evaluations', S)
+        probe.iteration_end(i, np.max(error))
+        stopping.update(np.max(error), S)
+        if target_error is not None and np.all(error <= target_error):
+            stopping.reason = StoppingCriteria.TARGET
+        if stopping.reason is not None:
+            break
+
+    probe.end(stop_reason=stopping.finish(), best=float(np.max(history[-1])))
+    return W.T, np.array(history)
+
+
+def ils_planar(ura, user_angle, target_angle, max_iter=20, initial_weights=None, target_error=None,
+               sample_angles=None, stopping=None, rng=None, probe=None):
+    """
+    ILS cho mảng phẳng URA (jcas_model.URA_System), user_angle / target_angle là cặp (az, el) độ.
+    Búp sóng trên lưới tích sample_angles x sample_angles (góc theo trục) tách được:
+        P = A^H w = B_x W B_y^T với B_x = A_x^H, B_y = A_y^H
+    nên giả nghịch đảo cũng tách được: pinv(B_x kron B_y) = pinv(B_x) kron pinv(B_y), bước LS là
+    W = pinv(B_x) Y pinv(B_y)^T - chỉ dùng hai phân tích SVD nhỏ của từng trục (ls_factor).
+    Lưới gồm cả vùng không nhìn thấy (u^2 + v^2 > 1, mong muốn = 0) để giữ cấu trúc Kronecker.
+    Trả về (w (N,), history (số vòng lặp,) lỗi LS).
+    """
+    if sample_angles is None:
+        sample_angles = np.linspace(-90, 90, 181)
+    sample_angles = np.asarray(sample_angles, dtype=float)
+    point_x, point_y = ura.axis_angles([user_angle[0], target_angle[0]], [user_angle[1], target_angle[1]])
+    # Biên độ mong muốn (G, G): = 1 trong ô +-1 mẫu quanh User và Target
+    box_x = desired_pattern(sample_angles, point_x, point_x)
+    box_y = desired_pattern(sample_angles, point_y, point_y)
+    desired_magnitude = np.maximum(np.outer(box_x[:, 0], box_y[:, 0]), np.outer(box_x[:, 1], box_y[:, 1]))
+    Bx, Bx_pinv = ls_factor(ura.x_axis, sample_angles)
+    By, By_pinv = ls_factor(ura.y_axis, sample_angles)
+
+    if initial_weights is None:
+        current_phase = np.exp(1j * np.random.default_rng(rng).random(desired_magnitude.shape) * 2 * np.pi)
+    else:
+        W0 = ura.weight_matrix(np.ravel(initial_weights))
+        current_phase = np.exp(1j * np.angle(np.matmul(np.matmul(Bx, W0), By.T)))
+
+    if stopping is None:
+        stopping = StoppingCriteria()
+    stopping.start(maximize=False)
+    if probe is None:
+        probe = NULL_PROBE
+    probe.begin('ILS', num_antennas=ura.N, scenarios=1, samples=desired_magnitude.size, max_iter=max_iter)
+    history = []
+    for i in range(max_iter):
+        probe.iteration_start(i)
+        Y = desired_magnitude * current_phase
+        W = np.matmul(np.matmul(Bx_pinv, Y), By_pinv.T)
+        W = W / np.linalg.norm(W)
+        probe.mark('solve')
+
+        pattern_actual = np.matmul(np.matmul(Bx, W), By.T)
+        current_phase = np.exp(1j * np.angle(pattern_actual))
+        error = np.linalg.norm(np.abs(pattern_actual) - desired_magnitude)
+        history.append(error)
+        probe.mark('pattern')
+        probe.count('evaluations')
+        probe.iteration_end(i, error)
+        stopping.update(error, 1)
+        if target_error is not None and error <= target_error:
+            stopping.reason = StoppingCriteria.TARGET
+        if stopping.reason is not None:
+            break
+
+    probe.end(stop_reason=stopping.finish(), best=float(history[-1]))
+    return W.ravel(), np.array(history)
+
 
 class ILS_Optimizer:
     """
     Iterative Least Squares (ILS) Optimizer
     Thuật toán gốc dựa trên Toán học (Đại số tuyến tính) để so sánh với GWO.
     """
-    def __init__(self, jcas_system, user_angle, target_angle, num_antennas):
+    def __init__(self, jcas_system, user_angle, target_angle, num_antennas, stopping=None, seed=None, probe=None):
         self.jcas = jcas_system
         self.user_angle = user_angle
         self.target_angle = target_angle
         self.N = num_antennas
+        # Điều kiện dừng sớm (stall / target / deadline / ngân sách), xem stopping.StoppingCriteria
+        self.stopping = stopping if stopping is not None else StoppingCriteria()
+        # Bộ sinh số ngẫu nhiên riêng (pha khởi tạo), không dùng trạng thái toàn cục np.random
+        self.rng = np.random.default_rng(seed)
+        self.probe = probe
 
-    def optimize(self, max_iter=20):
+    def optimize(self, max_iter=20, initial_weights=None, target_error=None):
         """
         Thực hiện tối ưu hóa bằng phương pháp Lặp Bình Phương Tối Thiểu.
-        Mục tiêu: Tìm trọng số w sao cho Búp sóng thực tế (A*w) khớp với Búp sóng mong muốn (d).
+        Mục tiêu: Tìm trọng số w sao cho Búp sóng thực tế (A^H w) khớp với Búp sóng mong muốn (d).
+        initial_weights: Vector (N,) - khởi tạo nóng: pha ban đầu lấy từ búp sóng của w này thay vì ngẫu nhiên
+        target_error: Dừng sớm khi lỗi LS xuống dưới ngưỡng này
+        Với jcas_system là URA_System (mảng phẳng), user_angle / target_angle là cặp (az, el), xem ils_planar.
+        Sau khi chạy: stop_reason (lý do dừng)
         """
-        # 1. Định nghĩa các điểm mẫu (góc) để tối ưu
-        # Ta lấy mẫu dày đặc để ép búp sóng phụ xuống
-        sample_angles = np.linspace(-90, 90, 181) 
-        
-        # 2. Tạo vector mong muốn (Desired Pattern - d)
-        # Tại hướng User và Target: Mong muốn biên độ = 1
-        # Tại các hướng khác (Sidelobe): Mong muốn biên độ = 0
-        desired_magnitude = np.zeros(len(sample_angles))
-        
-        # Tìm chỉ số (index) gần đúng nhất của góc User và Target
-        idx_user = np.abs(sample_angles - self.user_angle).argmin()
-        idx_target = np.abs(sample_angles - self.target_angle).argmin()
-        
-        # Đặt biên độ mong muốn (Main lobes)
-        # Mở rộng nhẹ vùng đỉnh (+- 1 độ) để búp sóng không quá nhọn
-        desired_magnitude[max(0, idx_user-1):min(len(sample_angles), idx_user+2)] = 1.0
-        desired_magnitude[max(0, idx_target-1):min(len(sample_angles), idx_target+2)] = 1.0
-        
-        # 3. Tính Ma trận lái (Steering Matrix) cho tất cả các góc mẫu
-        # Shape: (N, 181)
-        A = self.jcas.steering_vector(sample_angles)
-        
-        # Tính ma trận giả nghịch đảo (Moore-Penrose Pseudo-inverse)
-        # Công thức LS: w = pinv(A) * d
-        # A_pinv shape: (181, N)
-        A_pinv = np.linalg.pinv(A)
-        
-        # 4. Vòng lặp ILS (Iterative Least Squares)
-        # Vì ta chỉ quan tâm biên độ |A*w| khớp với |d|, còn pha có thể tự do.
-        # Thuật toán sẽ lặp để chỉnh pha sao cho tối ưu nhất.
-        
-        # Khởi tạo pha ban đầu ngẫu nhiên cho vector mong muốn
-        current_phase = np.exp(1j * np.random.rand(len(sample_angles)) * 2 * np.pi)
-        
-        history = []
-        
-        for i in range(max_iter):
-            # Vector mục tiêu phức (Biên độ mong muốn + Pha hiện tại)
-            y = desired_magnitude * current_phase
-            
-            # Bước 1: Tìm w tối ưu cho y hiện tại (Least Squares Step)
-            # w = A_dagger * y
-            # y shape (181,), A_pinv shape (N, 181) -> w shape (N,)
-            # Cần transpose y thành cột hoặc xử lý chiều đúng
-            w_opt = np.matmul(A_pinv.T, y) # Lưu ý: A_pinv của numpy là (N, M) nếu A là (M, N). 
-            # Check lại: A (N, 181). pinv(A) là (181, N).
-            # Công thức đúng: A.T * w = y (trong miền mẫu). 
-            # Thực tế: Pattern = w.H * A. => Pattern.T = A.H * w.
-            # Hệ phương trình: A^H * w = y
-            # => w = pinv(A^H) * y
-            
-            # Sửa lại tính toán cho khớp chiều vật lý:
-            # Pattern P = w^H * A. Ta muốn P ~ y.
-            # Lấy liên hợp: P^H = A^H * w.
-            # Đặt B = A^H (Shape: 181, N). Ta giải B * w = y^H (hoặc y vì y là 1 chiều).
-            B = A.conj().T
-            w_opt, _, _, _ = np.linalg.lstsq(B, y, rcond=None)
-            
-            # Chuẩn hóa công suất w
-            w_opt = w_opt / np.linalg.norm(w_opt)
-            
-            # Bước 2: Cập nhật pha (Update Phase)
-            # Tính búp sóng thực tế thu được
-            pattern_actual = np.matmul(B, w_opt)
-            
-            # Giữ nguyên biên độ mong muốn, chỉ lấy pha của búp sóng thực tế cập nhật lại
-            current_phase = np.exp(1j * np.angle(pattern_actual))
-            
-            # Tính lỗi (Error/Fitness) để so sánh
-            error = np.linalg.norm(np.abs(pattern_actual) - desired_magnitude)
-            history.append(error)
-            
-        return w_opt, history
\ No newline at end of file
+        if hasattr(self.jcas, 'x_axis'):
+            # Mảng phẳng URA: user_angle / target_angle là cặp (az, el)
+            w, history = ils_planar(self.jcas, self.user_angle, self.target_angle, max_iter, initial_weights,
+                                    target_error, stopping=self.stopping, rng=self.rng, probe=self.probe)
+            self.stop_reason = self.stopping.reason
+            return w, list(history)
+        W, history = ils_batch(self.jcas, self.user_angle, self.target_angle, max_iter,
+                               initial_weights, target_error, stopping=self.stopping, rng=self.rng,
+                               probe=self.probe)
+        self.stop_reason = self.stopping.reason
+        return W[0], list(history[:, 0])
+
+    @staticmethod
+    def optimize_batch(jcas_system, scenarios, max_iter=20, initial_weights=None, target_error=None, stopping=None,
+                       seed=None, probe=None):
+        """
+        Tối ưu đồng thời nhiều kịch bản. scenarios: Danh sách / mảng (S, 2) các cặp (user_angle, target_angle).
+        Trả về (W (S, N), history (số vòng lặp, S)).
+        """
+        scenarios = np.reshape(np.asarray(scenarios, dtype=float), (-1, 2))
+        return ils_batch(jcas_system, scenarios[:, 0], scenarios[:, 1], max_iter, initial_weights, target_error,
+                         stopping=stopping, rng=seed, probe=probe)
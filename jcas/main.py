@@ -1,63 +1,97 @@
+import sys
+import time
+import argparse
 import numpy as np
-import matplotlib.pyplot as plt
-from jcas_model import JCAS_System
+from jcas_model import JCAS_System, JCASObjective, URA_System, URAObjective
 from ils_optimizer import ILS_Optimizer
+from results_io import save_run
 
 # ==========================================
 # 1. CẤU HÌNH (Giống hệt GWO để so sánh)
 # ==========================================
 N = 64
+NY = 0 # > 0: mảng phẳng URA N x NY, góc User/Target là (az, el)
 USER_ANGLE = -15.0
 TARGET_ANGLE = 30.0
+USER_ELEVATION = 0.0 # Góc ngẩng User / Target (độ, chỉ dùng khi NY > 0)
+TARGET_ELEVATION = 0.0
+MAX_ITER = 50 # ILS hội tụ rất nhanh, chỉ cần khoảng 20 vòng lặp
+SLL_TOL = None # Sai số SLL cho phép (dB) khi tính metrics: quét SLL thích nghi thay cho lưới cố định 1 độ
+OUTPUT = 'jcas_benchmark' # Tiền tố file kết quả (.npz, .json) và ảnh (_beampattern.png, _convergence.png)
 
-# Khởi tạo hệ thống
-jcas = JCAS_System(num_antennas=N)
 
-# ==========================================
-# 2. CHẠY THUẬT TOÁN GỐC (ILS)
-# ==========================================
-print(f"Đang chạy thuật toán gốc ILS cho N={N}...")
-optimizer = ILS_Optimizer(jcas, USER_ANGLE, TARGET_ANGLE, N)
+def run(n=N, user_angle=USER_ANGLE, target_angle=TARGET_ANGLE, max_iter=MAX_ITER, seed=None,
+        ny=NY, user_elevation=USER_ELEVATION, target_elevation=TARGET_ELEVATION, sll_tol=SLL_TOL):
+    """
+    Chạy thuật toán gốc ILS cho một cấu hình, không vẽ gì. Trả về (w (N,), error_history, metrics);
+    metrics tính bằng cùng hàm mục tiêu với GWO (JCASObjective / URAObjective) để so sánh trực tiếp.
+    ny > 0: mảng phẳng n x ny (ILS tách trục, xem ils_optimizer.ils_planar).
+    sll_tol (dB): SLL trong metrics tính bằng quét thích nghi thô -> mịn (xem JCASObjective).
+    """
+    if ny > 0:
+        jcas = URA_System(n, ny)
+        user, target = (user_angle, user_elevation), (target_angle, target_elevation)
+        objective = URAObjective(n, ny, user, target, ura=jcas, sll_tol=sll_tol)
+    else:
+        jcas = JCAS_System(num_antennas=n)
+        user, target = user_angle, target_angle
+        objective = JCASObjective(n, user_angle, target_angle, jcas=jcas, sll_tol=sll_tol)
+    optimizer = ILS_Optimizer(jcas, user, target, jcas.N, seed=seed)
 
-# ILS hội tụ rất nhanh, chỉ cần khoảng 20 vòng lặp
-w_opt_ils, error_history = optimizer.optimize(max_iter=50)
+    start = time.perf_counter()
+    w_opt_ils, error_history = optimizer.optimize(max_iter=max_iter)
+    wall_time = time.perf_counter() - start
 
-# ==========================================
-# 3. VẼ VÀ LƯU KẾT QUẢ
-# ==========================================
-theta_plot = np.linspace(-90, 90, 720)
-beampattern = jcas.calculate_beampattern(w_opt_ils, theta_plot)
-beampattern_db = 10 * np.log10(beampattern + 1e-12)
-beampattern_db_norm = beampattern_db - np.max(beampattern_db)
-
-# --- HÌNH 1: ĐỒ THỊ BÚP SÓNG (BEAMPATTERN) ---
-plt.figure(figsize=(10, 6))
-plt.plot(theta_plot, beampattern_db_norm, 'k-', linewidth=2, label='ILS (Original) Benchmark')
-plt.axvline(x=USER_ANGLE, color='g', linestyle='--', label='User Direction')
-plt.axvline(x=TARGET_ANGLE, color='r', linestyle='--', label='Target Direction')
-
-plt.title(f'JCAS Benchmark: Iterative Least Squares (N={N})')
-plt.xlabel('Angle (deg)')
-plt.ylabel('Normalized Gain (dB)')
-plt.ylim([-60, 0])
-plt.xlim([-90, 90])
-plt.legend()
-plt.grid(True, alpha=0.3)
-
-# Lưu ảnh Beampattern
-plt.savefig('jcas_benchmark_beampattern.png', dpi=300)
-print("Đã lưu ảnh 1: jcas_benchmark_beampattern.png")
-plt.show()
-
-# --- HÌNH 2: TỐC ĐỘ HỘI TỤ (CONVERGENCE) ---
-plt.figure(figsize=(8, 5))
-plt.plot(error_history, 'k-o', linewidth=1.5, markersize=4)
-plt.title('Convergence Speed: ILS Algorithm')
-plt.xlabel('Iteration')
-plt.ylabel('Least Squares Error (Cost Function)')
-plt.grid(True, linestyle='--', alpha=0.7)
-
-# Lưu ảnh Hội tụ
-plt.savefig('jcas_benchmark_convergence.png', dpi=300)
-print("Đã lưu ảnh 2: jcas_benchmark_convergence.png")
-plt.show()
\ No newline at end of file
+    position = np.concatenate([np.real(w_opt_ils), np.imag(w_opt_ils)])
+    metrics = objective.metrics(position)
+    metrics.update(wall_time=wall_time, ls_error=float(error_history[-1]), stop_reason=optimizer.stop_reason)
+    return w_opt_ils, error_history, metrics
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tối ưu beamforming JCAS bằng ILS, ghi kết quả ra file")
+    parser.add_argument('--n', type=int, default=N, help="Số phần tử ăng-ten")
+    parser.add_argument('--user', type=float, default=USER_ANGLE, help="Góc người dùng (độ)")
+    parser.add_argument('--target', type=float, default=TARGET_ANGLE, help="Góc mục tiêu (độ)")
+    parser.add_argument('--ny', type=int, default=NY, help="> 0: mảng phẳng N x NY")
+    parser.add_argument('--user-el', type=float, default=USER_ELEVATION, help="Góc ngẩng người dùng (độ)")
+    parser.add_argument('--target-el', type=float, default=TARGET_ELEVATION, help="Góc ngẩng mục tiêu (độ)")
+    parser.add_argument('--max-iter', type=int, default=MAX_ITER)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--sll-tol', type=float, default=SLL_TOL, help="Quét SLL thích nghi với sai số (dB)")
+    parser.add_argument('--out', default=OUTPUT, help="Tiền tố file kết quả")
+    parser.add_argument('--plot', action='store_true', help="Vẽ ảnh sau khi chạy (xem plotting.py)")
+    parser.add_argument('--show', action='store_true', help="Vẽ và hiển thị cửa sổ")
+    args = parser.parse_args(argv)
+
+    # ==========================================
+    # 2. CHẠY THUẬT TOÁN GỐC (ILS)
+    # ==========================================
+    if args.ny > 0:
+        print(f"Đang chạy thuật toán gốc ILS cho URA {args.n}x{args.ny} ({args.n * args.ny} phần tử)...")
+    else:
+        print(f"Đang chạy thuật toán gốc ILS cho N={args.n}...")
+    w_opt_ils, error_history, metrics = run(args.n, args.user, args.target, args.max_iter, args.seed,
+                                            args.ny, args.user_el, args.target_el, args.sll_tol)
+
+    # ==========================================
+    # 3. LƯU KẾT QUẢ (vẽ riêng bằng plotting.py hoặc --plot)
+    # ==========================================
+    prefix = save_run(args.out, w_opt_ils, error_history, metrics, algorithm='ILS', user_angle=args.user,
+                      target_angle=args.target, max_iter=args.max_iter, seed=args.seed,
+                      num_y=args.ny, user_elevation=args.user_el, target_elevation=args.target_el,
+                      sll_tol=args.sll_tol, history_label='Least Squares Error (Cost Function)')
+    print(f"Lỗi LS = {metrics['ls_error']:.4f}, SLL lớn nhất = {metrics['max_sll_db']:.2f} dB, "
+          f"{metrics['wall_time'] * 1e3:.1f} ms")
+    print(f"Đã lưu kết quả: {prefix}.npz, {prefix}.json")
+
+    if args.plot or args.show:
+        # Chỉ import matplotlib khi cần vẽ
+        from plotting import plot_run
+        for f in plot_run(prefix, show=args.show):
+            print(f"Đã lưu ảnh: {f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+import time
+import numpy as np
+from jcas_model import JCAS_System
+from ils_optimizer import ILS_Optimizer
+
+
+class ILS_Tracker:
+    """
+    Bám búp sóng (beam tracking) bằng ILS khi User/Target dịch chuyển vài độ mỗi khung (frame).
+    Khung đầu chạy ILS từ pha ngẫu nhiên. Các khung sau khởi tạo nóng: pha ban đầu lấy từ búp sóng
+    của nghiệm khung trước đã lái lại sang góc mới (JCAS_System.resteer_weights), và dừng sớm khi
+    lỗi LS xuống dưới mức tham chiếu * (1 + tolerance). Mức tham chiếu là lỗi của lần chạy đủ
+    max_iter gần nhất (không lấy khung dừng sớm, để ngưỡng không bị nới dần qua các khung).
+
+    compare_cold=True: mỗi khung chạy thêm ILS từ pha ngẫu nhiên đủ max_iter để báo chênh lệch lỗi.
+    """
+    def __init__(self, num_antennas, max_iter=50, tolerance=0.05, compare_cold=False, jcas=None, seed=None):
+        self.N = num_antennas
+        self.max_iter = max_iter
+        self.tolerance = tolerance # Sai lệch tương đối cho phép so với lỗi tham chiếu
+        self.compare_cold = compare_cold
+        # Dùng chung một JCAS_System (và cache ma trận lái) cho mọi khung
+        self.jcas = jcas if jcas is not None else JCAS_System(num_antennas)
+        # Một Generator cho cả chuỗi khung: cùng seed -> cùng chuỗi nghiệm
+        self.rng = np.random.default_rng(seed)
+        self.reset()
+
+    def reset(self):
+        """Quên nghiệm trước, khung tiếp theo sẽ chạy từ pha ngẫu nhiên"""
+        self.weights = None
+        self.angles = None
+        self.error = None
+        self.reference = None
+        self.reports = []
+
+    def _run(self, optimizer, initial_weights=None, target_error=None):
+        start = time.perf_counter()
+        w, history = optimizer.optimize(self.max_iter, initial_weights, target_error)
+        return w, history, time.perf_counter() - start
+
+    def update(self, user_angle, target_angle):
+        """
+        Tối ưu lại cho cặp góc mới, trả về (w, report).
+        report: angles, warm (có khởi tạo nóng không), iterations, latency (s), error,
+                cold_error / cold_latency / gap (= error - cold_error) khi compare_cold=True
+        """
+        optimizer = ILS_Optimizer(self.jcas, user_angle, target_angle, self.N, seed=self.rng)
+        warm = self.weights is not None
+        if warm:
+            initial_weights = self.jcas.resteer_weights(self.weights, self.angles, (user_angle, target_angle))
+            target_error = self.reference * (1 + self.tolerance)
+        else:
+            initial_weights, target_error = None, None
+        w, history, latency = self._run(optimizer, initial_weights, target_error)
+
+        self.weights = w
+        self.angles = (user_angle, target_angle)
+        self.error = history[-1]
+        if len(history) == self.max_iter:
+            self.reference = self.error
+        report = {
+            'angles': self.angles, 'warm': warm, 'iterations': len(history),
+            'latency': latency, 'error': self.error,
+        }
+        if self.compare_cold:
+            _, cold_history, cold_latency = self._run(optimizer)
+            report.update(cold_error=cold_history[-1], cold_latency=cold_latency,
+                          gap=self.error - cold_history[-1])
+        self.reports.append(report)
+        return self.weights, report
+
+    def track(self, angle_stream, verbose=True):
+        """
+        Chạy tracking trên dãy (user_angle, target_angle), trả về danh sách report của từng khung.
+        """
+        reports = []
+        for frame, (user_angle, target_angle) in enumerate(angle_stream):
+            _, report = self.update(user_angle, target_angle)
+            reports.append(report)
+            if verbose:
+                line = (f"Frame {frame}: User={user_angle:.1f}, Target={target_angle:.1f}, "
+                        f"{'warm' if report['warm'] else 'cold'}, {report['iterations']} iter, "
+                        f"{report['latency'] * 1e3:.1f} ms, Error = {report['error']:.4f}")
+                if self.compare_cold:
+                    line += (f" (cold: {report['cold_error']:.4f}, {report['cold_latency'] * 1e3:.1f} ms,"
+                             f" gap = {report['gap']:+.4f})")
+                print(line)
+        return reports
+
+
+if __name__ == "__main__":
+    # User và Target dịch chuyển 1 độ mỗi khung
+    frames = [(-15.0 + f, 30.0 - f) for f in range(10)]
+    tracker = ILS_Tracker(num_antennas=64, compare_cold=True)
+    tracker.track(frames)
@@ -0,0 +1,73 @@
+import time
+import numpy as np
+from swarm_core import gwo_update
+from hybrid_optimizer import Hybrid_GWO_GA_Optimizer
+
+# ==========================================
+# BENCHMARK VÒNG LẶP HYBRID GWO-GA
+# ==========================================
+
+N = 64
+DIM = 2 * N
+ITERS = 5
+
+
+def sphere(positions):
+    """Fitness rẻ để thời gian đo chỉ phản ánh phần cập nhật quần thể (sắp xếp, GWO, GA, chọn lãnh đạo)"""
+    return -np.sum(positions**2, axis=-1)
+
+
+sphere.batch = sphere
+
+
+class Legacy_Hybrid_Optimizer(Hybrid_GWO_GA_Optimizer):
+    """Bước lặp theo cách cũ: argsort toàn quần thể, GA lặp theo từng cá thể và từng gen"""
+    def step(self, t):
+        self.history.append(self.alpha_score)
+        a = 2.0 - t * (2.0 / self.max_iter)
+        sorted_idx = np.argsort(self.fitness)[::-1]
+        self.population = self.population[sorted_idx]
+        self.fitness = self.fitness[sorted_idx]
+        half_pop = self.pop_size // 2
+        self.population[:half_pop] = gwo_update(self.population[:half_pop], self.alpha_pos, self.beta_pos, self.delta_pos, a)
+        for i in range(half_pop, self.pop_size):
+            w_cross = np.random.rand()
+            child = w_cross * self.alpha_pos + (1.0 - w_cross) * self.beta_pos
+            for d in range(self.dim):
+                if np.random.rand() < self.mutation_rate:
+                    child[d] = np.random.uniform(self.lb, self.ub)
+            self.population[i] = child
+        self.population = np.clip(self.population, self.lb, self.ub)
+        self.fitness = self.fitness_func.batch(self.population)
+        current_best_idx = np.argmax(self.fitness)
+        if self.fitness[current_best_idx] > self.alpha_score:
+            self.alpha_score = self.fitness[current_best_idx]
+            self.alpha_pos = self.population[current_best_idx].copy()
+        sorted_indices_new = np.argsort(self.fitness)[::-1]
+        self.beta_pos = self.population[sorted_indices_new[1]].copy()
+        self.beta_score = self.fitness[sorted_indices_new[1]]
+        self.delta_pos = self.population[sorted_indices_new[2]].copy()
+
+
+def time_per_iteration(optimizer_cls, pop_size):
+    """Thời gian trung bình (giây) mỗi vòng lặp step()"""
+    optimizer = optimizer_cls(sphere, DIM, pop_size, ITERS, -1, 1, verbose=False)
+    optimizer.init_leaders()
+    start = time.perf_counter()
+    for t in range(ITERS):
+        optimizer.step(t)
+    return (time.perf_counter() - start) / ITERS
+
+
+def bench_ga_phase(pop_sizes=(20, 200, 2000)):
+    """So sánh thời gian mỗi vòng lặp Hybrid GWO-GA: GA lặp từng gen (cũ) vs GA theo khối (mới)"""
+    print(f"{'pop':>6} {'dim':>6} {'loop (ms)':>12} {'batched (ms)':>13} {'speedup':>9}")
+    for pop_size in pop_sizes:
+        t_loop = time_per_iteration(Legacy_Hybrid_Optimizer, pop_size)
+        t_vec = time_per_iteration(Hybrid_GWO_GA_Optimizer, pop_size)
+        print(f"{pop_size:>6} {DIM:>6} {t_loop * 1e3:>12.2f} {t_vec * 1e3:>13.3f} {t_loop / t_vec:>8.1f}x")
+
+
+if __name__ == "__main__":
+    print(f"Benchmark vòng lặp Hybrid GWO-GA (dim={DIM}, fitness rẻ)")
+    bench_ga_phase()
@@ -1,98 +1,260 @@
+import os
+import sys
+import csv
+import json
+import time
+import argparse
 import numpy as np
-import matplotlib.pyplot as plt
-from jcas_model import JCAS_System
+from concurrent.futures import ProcessPoolExecutor
+from jcas_model import JCASObjective
 from hybrid_optimizer import Hybrid_GWO_GA_Optimizer
+from ils_optimizer import ILS_Optimizer
+from swarm_core import gwo_update, evaluate_population, as_evaluator, as_generator, select_leaders, spawn_seeds
+
+# ==========================================
+# BỘ BENCHMARK THỐNG KÊ: ILS vs GWO vs HYBRID GWO-GA
+# ==========================================
+# Mỗi thuật toán chạy R seed trên ma trận (N, cặp góc User-Target), các lần chạy được chia cho nhiều
+# process. Ghi lại fitness, gain, SLL lớn nhất, thời gian và số lần đánh giá fitness của từng lần chạy (CSV),
+# cùng trung vị / phân vị theo từng cấu hình (JSON). --baseline so với một file JSON đã lưu và
+# trả về mã lỗi 1 khi có hồi quy.
 
 # --- CẤU HÌNH ---
-N = 64
-USER_ANGLE = -15.0
-TARGET_ANGLE = 30.0
+ALGORITHMS = ('ILS', 'GWO', 'Hybrid', 'Memetic')
+ANTENNA_SIZES = (16, 64, 256, 1024)
+ANGLE_CASES = ((-15.0, 30.0), (0.0, 45.0), (-40.0, -10.0))
+NUM_SEEDS = 10
+SEED = 2024
 POP_SIZE = 30
 MAX_ITER = 100
+ILS_MAX_ITER = 50
+MUTATION_RATE = 0.1
+POLISH_EVERY = 5 # 'Memetic': Hybrid GWO-GA + tinh chỉnh gradient Alpha mỗi POLISH_EVERY vòng lặp
 ALPHA_WEIGHT = 0.5
 LAMBDA_INT = 0.5
 
-# Khởi tạo hệ thống
-jcas = JCAS_System(num_antennas=N)
-
-# --- HÀM FITNESS (Dùng chung) ---
-def fitness_function(wolf_position):
-    w_real = wolf_position[0:N]
-    w_imag = wolf_position[N:]
-    w_complex = w_real + 1j * w_imag
-    w_complex = w_complex.reshape(-1, 1)
-    w_complex = w_complex / np.linalg.norm(w_complex)
-    
-    gain_comm = 10 * np.log10(jcas.calculate_beampattern(w_complex, np.array([USER_ANGLE]))[0] + 1e-12)
-    gain_sense = 10 * np.log10(jcas.calculate_beampattern(w_complex, np.array([TARGET_ANGLE]))[0] + 1e-12)
-    
-    scan_angles = np.linspace(-90, 90, 181)
-    mask = np.ones(len(scan_angles), dtype=bool)
-    mask[(scan_angles > USER_ANGLE-5) & (scan_angles < USER_ANGLE+5)] = False
-    mask[(scan_angles > TARGET_ANGLE-5) & (scan_angles < TARGET_ANGLE+5)] = False
-    max_sll = 10 * np.log10(np.max(jcas.calculate_beampattern(w_complex, scan_angles[mask])) + 1e-12)
-    
-    score = (ALPHA_WEIGHT * gain_comm) + ((1 - ALPHA_WEIGHT) * gain_sense) - (LAMBDA_INT * max_sll)
-    return score
-
-# --- ĐỊNH NGHĨA LẠI GWO THƯỜNG (Để chạy so sánh tại đây) ---
+METRICS = ('fitness', 'gain_comm_db', 'gain_sense_db', 'max_sll_db', 'wall_time', 'evaluations')
+PERCENTILES = (10, 50, 90)
+# Ngưỡng hồi quy so với baseline: fitness trung vị giảm quá FITNESS_TOL (dB),
+# thời gian / số lần đánh giá trung vị tăng quá COST_RATIO lần
+FITNESS_TOL = 0.5
+COST_RATIO = 1.5
+# Bỏ qua chênh lệch thời gian nhỏ hơn mức này (s): lần chạy ngắn cỡ ms bị nhiễu bởi lịch CPU
+TIME_SLACK = 0.005
+
+
+# --- GWO THƯỜNG (Để chạy so sánh tại đây) ---
 class Standard_GWO_Optimizer:
-    def __init__(self, fitness_func, dim, pop_size, max_iter, lb, ub):
+    def __init__(self, fitness_func, dim, pop_size, max_iter, lb, ub, executor=None, seed=None):
         self.fitness_func = fitness_func
         self.dim = dim; self.pop_size = pop_size; self.max_iter = max_iter
         self.lb = lb; self.ub = ub
-        self.population = np.random.uniform(lb, ub, (pop_size, dim))
-        self.fitness = np.zeros(pop_size)
-        
+        self.executor = as_evaluator(executor)
+        self.rng = as_generator(seed)
+        self.population = self.rng.uniform(lb, ub, (pop_size, dim))
+
     def optimize(self):
-        for i in range(self.pop_size): self.fitness[i] = self.fitness_func(self.population[i])
-        sorted_idx = np.argsort(self.fitness)[::-1]
-        alpha = self.population[sorted_idx[0]].copy(); alpha_score = self.fitness[sorted_idx[0]]
-        beta = self.population[sorted_idx[1]].copy()
-        delta = self.population[sorted_idx[2]].copy()
+        self.fitness = evaluate_population(self.fitness_func, self.population, self.executor)
+        leaders = select_leaders(self.fitness, 3)
+        alpha = self.population[leaders[0]].copy(); alpha_score = self.fitness[leaders[0]]
+        beta = self.population[leaders[1]].copy()
+        delta = self.population[leaders[2]].copy()
         history = []
-        
+
         for t in range(self.max_iter):
             history.append(alpha_score)
             a = 2.0 - t * (2.0 / self.max_iter)
-            for i in range(self.pop_size):
-                for d in range(self.dim):
-                    r1=np.random.rand(); r2=np.random.rand(); A1=2*a*r1-a; C1=2*r2
-                    D_alpha=abs(C1*alpha[d]-self.population[i,d]); X1=alpha[d]-A1*D_alpha
-                    r1=np.random.rand(); r2=np.random.rand(); A2=2*a*r1-a; C2=2*r2
-                    D_beta=abs(C2*beta[d]-self.population[i,d]); X2=beta[d]-A2*D_beta
-                    r1=np.random.rand(); r2=np.random.rand(); A3=2*a*r1-a; C3=2*r2
-                    D_delta=abs(C3*delta[d]-self.population[i,d]); X3=delta[d]-A3*D_delta
-                    self.population[i,d]=(X1+X2+X3)/3
-            
+            self.population = gwo_update(self.population, alpha, beta, delta, a, self.rng)
+
             self.population = np.clip(self.population, self.lb, self.ub)
-            for i in range(self.pop_size): self.fitness[i] = self.fitness_func(self.population[i])
-            sorted_idx = np.argsort(self.fitness)[::-1]
-            if self.fitness[sorted_idx[0]] > alpha_score:
-                alpha_score = self.fitness[sorted_idx[0]]
-                alpha = self.population[sorted_idx[0]].copy()
-                beta = self.population[sorted_idx[1]].copy()
-                delta = self.population[sorted_idx[2]].copy()
-        return history
-
-# --- CHẠY SO SÁNH ---
-print("Đang chạy Standard GWO...")
-gwo_opt = Standard_GWO_Optimizer(fitness_function, 2*N, POP_SIZE, MAX_ITER, -1, 1)
-hist_gwo = gwo_opt.optimize()
-
-print("Đang chạy Hybrid GWO-GA...")
-hybrid_opt = Hybrid_GWO_GA_Optimizer(fitness_function, 2*N, POP_SIZE, MAX_ITER, -1, 1, mutation_rate=0.1)
-_, hist_hybrid = hybrid_opt.optimize()
-
-# --- VẼ VÀ LƯU ẢNH ---
-plt.figure(figsize=(10, 6))
-plt.plot(hist_gwo, 'k--', linewidth=1.5, label='Standard GWO')
-plt.plot(hist_hybrid, 'b-o', linewidth=2, markersize=4, label='Hybrid GWO-GA')
-plt.title('Comparison of Convergence Speed')
-plt.xlabel('Iteration')
-plt.ylabel('Fitness Score')
-plt.legend()
-plt.grid(True)
-plt.savefig('comparison_convergence.png', dpi=300)
-print("Đã lưu ảnh: comparison_convergence.png")
-plt.show()
\ No newline at end of file
+            self.fitness = evaluate_population(self.fitness_func, self.population, self.executor)
+            leaders = select_leaders(self.fitness, 3)
+            if self.fitness[leaders[0]] > alpha_score:
+                alpha_score = self.fitness[leaders[0]]
+                alpha = self.population[leaders[0]].copy()
+                beta = self.population[leaders[1]].copy()
+                delta = self.population[leaders[2]].copy()
+        self.evaluations = self.pop_size * (self.max_iter + 1)
+        return alpha, history
+
+
+# --- MỘT LẦN CHẠY ---
+def run_case(task):
+    """
+    Chạy một thuật toán cho một cấu hình (N, góc User, góc Target, seed), trả về một dòng kết quả.
+    Với ILS, evaluations là số vòng lặp LS (mỗi vòng tính búp sóng một lần).
+    """
+    algorithm, N, user_angle, target_angle, seed_index, seed, config = task
+    objective = JCASObjective(N, user_angle, target_angle, alpha_weight=config['alpha_weight'],
+                              lambda_int=config['lambda_int'])
+    start = time.perf_counter()
+    if algorithm == 'ILS':
+        optimizer = ILS_Optimizer(objective.jcas, user_angle, target_angle, N, seed=seed)
+        w, history = optimizer.optimize(max_iter=config['ils_max_iter'])
+        best_pos = np.concatenate([np.real(w), np.imag(w)])
+        evaluations = len(history)
+    elif algorithm == 'GWO':
+        optimizer = Standard_GWO_Optimizer(objective, 2 * N, config['pop_size'], config['max_iter'], -1, 1, seed=seed)
+        best_pos, _ = optimizer.optimize()
+        evaluations = optimizer.evaluations
+    elif algorithm in ('Hybrid', 'Memetic'):
+        polish_every = config['polish_every'] if algorithm == 'Memetic' else 0
+        optimizer = Hybrid_GWO_GA_Optimizer(objective, 2 * N, config['pop_size'], config['max_iter'], -1, 1,
+                                            mutation_rate=config['mutation_rate'], verbose=False, seed=seed,
+                                            polish_every=polish_every)
+        best_pos, _ = optimizer.optimize()
+        evaluations = optimizer.evaluations
+    else:
+        raise ValueError(f"Thuật toán không hợp lệ: {algorithm!r}")
+    wall_time = time.perf_counter() - start
+
+    metrics = objective.metrics(best_pos)
+    return {'algorithm': algorithm, 'N': N, 'user_angle': user_angle, 'target_angle': target_angle,
+            'seed': seed_index, 'fitness': metrics['score'], 'gain_comm_db': metrics['gain_comm_db'],
+            'gain_sense_db': metrics['gain_sense_db'], 'max_sll_db': metrics['max_sll_db'],
+            'wall_time': wall_time, 'evaluations': evaluations}
+
+
+def make_tasks(algorithms=ALGORITHMS, antenna_sizes=ANTENNA_SIZES, angle_cases=ANGLE_CASES,
+               num_seeds=NUM_SEEDS, seed=SEED, **config):
+    """
+    Danh sách lần chạy cho toàn bộ ma trận. Lần chạy thứ r của mọi thuật toán / cấu hình dùng chung
+    seed con thứ r (common random numbers), nên chênh lệch giữa các thuật toán ít nhiễu hơn.
+    """
+    config = dict({'pop_size': POP_SIZE, 'max_iter': MAX_ITER, 'ils_max_iter': ILS_MAX_ITER,
+                   'mutation_rate': MUTATION_RATE, 'polish_every': POLISH_EVERY, 'alpha_weight': ALPHA_WEIGHT, 'lambda_int': LAMBDA_INT}, **config)
+    seeds = spawn_seeds(seed, num_seeds)
+    # N lớn trước để các lần chạy lâu nhất được chia cho worker sớm
+    return [(algorithm, N, float(u), float(t), r, seeds[r], config)
+            for N in sorted(antenna_sizes, reverse=True) for u, t in angle_cases
+            for algorithm in algorithms for r in range(num_seeds)]
+
+
+def run_benchmark(tasks, workers=None, verbose=True):
+    """
+    Chạy các lần chạy song song trên workers process (workers=1: tuần tự trong process hiện tại,
+    thời gian đo ít bị nhiễu do tranh chấp CPU hơn). Trả về danh sách dòng kết quả theo thứ tự tasks.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        rows = [run_case(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(workers) as executor:
+            rows = []
+            for i, row in enumerate(executor.map(run_case, tasks)):
+                rows.append(row)
+                if verbose and (i + 1) % 20 == 0:
+                    print(f"  {i + 1}/{len(tasks)} lần chạy")
+    return rows
+
+
+# --- THỐNG KÊ ---
+def summarize(rows):
+    """Gom các lần chạy theo (thuật toán, N, góc User, góc Target): phân vị PERCENTILES của từng metric"""
+    groups = {}
+    for row in rows:
+        key = (row['algorithm'], row['N'], row['user_angle'], row['target_angle'])
+        groups.setdefault(key, []).append(row)
+    summary = []
+    for (algorithm, N, user_angle, target_angle), group in groups.items():
+        stats = {}
+        for metric in METRICS:
+            values = np.percentile([r[metric] for r in group], PERCENTILES)
+            stats[metric] = {f'p{p}': float(v) for p, v in zip(PERCENTILES, values)}
+        summary.append({'algorithm': algorithm, 'N': N, 'user_angle': user_angle, 'target_angle': target_angle,
+                        'runs': len(group), 'metrics': stats})
+    return summary
+
+
+def save_results(prefix, rows, summary, config):
+    """Ghi <prefix>.csv (từng lần chạy) và <prefix>.json (cấu hình + thống kê)"""
+    with open(prefix + '.csv', 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    with open(prefix + '.json', 'w') as f:
+        json.dump({'config': config, 'summary': summary}, f, indent=2)
+
+
+def check_regression(summary, baseline, fitness_tol=FITNESS_TOL, cost_ratio=COST_RATIO):
+    """
+    So trung vị (p50) với baseline cho các cấu hình có ở cả hai: trả về danh sách mô tả hồi quy
+    (rỗng = đạt). Fitness càng lớn càng tốt; wall_time, evaluations càng nhỏ càng tốt.
+    """
+    def key(entry):
+        return entry['algorithm'], entry['N'], entry['user_angle'], entry['target_angle']
+    reference = {key(entry): entry['metrics'] for entry in baseline['summary']}
+    failures = []
+    for entry in summary:
+        base = reference.get(key(entry))
+        if base is None:
+            continue
+        name = '{} N={} ({:g}, {:g})'.format(*key(entry))
+        now = entry['metrics']
+        if now['fitness']['p50'] < base['fitness']['p50'] - fitness_tol:
+            failures.append(f"{name}: fitness {now['fitness']['p50']:.3f} < baseline {base['fitness']['p50']:.3f}")
+        for metric in ('wall_time', 'evaluations'):
+            slack = TIME_SLACK if metric == 'wall_time' else 0
+            if now[metric]['p50'] > base[metric]['p50'] * cost_ratio + slack:
+                failures.append(f"{name}: {metric} {now[metric]['p50']:.4g} > {cost_ratio} x baseline "
+                                f"{base[metric]['p50']:.4g}")
+    return failures
+
+
+def print_summary(summary):
+    print(f"{'algorithm':>9} {'N':>5} {'angles':>13} {'fitness p50 [p10, p90]':>28} "
+          f"{'SLL p50':>8} {'time p50 (s)':>13} {'evals':>7}")
+    for entry in summary:
+        m = entry['metrics']
+        angles = f"({entry['user_angle']:g}, {entry['target_angle']:g})"
+        spread = f"{m['fitness']['p50']:.3f} [{m['fitness']['p10']:.3f}, {m['fitness']['p90']:.3f}]"
+        print(f"{entry['algorithm']:>9} {entry['N']:>5} {angles:>13} {spread:>28} "
+              f"{m['max_sll_db']['p50']:>8.2f} {m['wall_time']['p50']:>13.4f} {m['evaluations']['p50']:>7.0f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark thống kê ILS / GWO / Hybrid GWO-GA / Memetic cho JCAS")
+    parser.add_argument('--algorithms', nargs='+', default=list(ALGORITHMS), choices=ALGORITHMS)
+    parser.add_argument('--sizes', nargs='+', type=int, default=list(ANTENNA_SIZES), help="Các giá trị N")
+    parser.add_argument('--seeds', type=int, default=NUM_SEEDS, help="Số seed R mỗi cấu hình")
+    parser.add_argument('--seed', type=int, default=SEED, help="Seed gốc")
+    parser.add_argument('--pop-size', type=int, default=POP_SIZE)
+    parser.add_argument('--max-iter', type=int, default=MAX_ITER)
+    parser.add_argument('--workers', type=int, default=None, help="Số process (mặc định: số lõi; 1 = tuần tự)")
+    parser.add_argument('--out', default='benchmark_results', help="Tiền tố file kết quả (.csv, .json)")
+    parser.add_argument('--baseline', default=None, help="File JSON baseline; có hồi quy -> mã thoát 1")
+    parser.add_argument('--fitness-tol', type=float, default=FITNESS_TOL)
+    parser.add_argument('--cost-ratio', type=float, default=COST_RATIO)
+    args = parser.parse_args(argv)
+    if args.seeds < 1:
+        parser.error("--seeds phải >= 1")
+
+    tasks = make_tasks(args.algorithms, args.sizes, ANGLE_CASES, args.seeds, args.seed,
+                       pop_size=args.pop_size, max_iter=args.max_iter)
+    config = dict(pop_size=args.pop_size, max_iter=args.max_iter, algorithms=args.algorithms,
+                  antenna_sizes=args.sizes, angle_cases=ANGLE_CASES, num_seeds=args.seeds, seed=args.seed)
+    print(f">>> {len(tasks)} lần chạy ({len(args.algorithms)} thuật toán x {len(args.sizes)} N x "
+          f"{len(ANGLE_CASES)} cặp góc x {args.seeds} seed)")
+    start = time.perf_counter()
+    rows = run_benchmark(tasks, args.workers)
+    summary = summarize(rows)
+    print(f">>> Xong sau {time.perf_counter() - start:.1f} s")
+    print_summary(summary)
+    save_results(args.out, rows, summary, config)
+    print(f">>> Đã lưu: {args.out}.csv, {args.out}.json")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        failures = check_regression(summary, baseline, args.fitness_tol, args.cost_ratio)
+        if failures:
+            print(f">>> HỒI QUY so với {args.baseline}:")
+            for failure in failures:
+                print("  " + failure)
+            return 1
+        print(f">>> Không có hồi quy so với {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,12 @@
 import numpy as np
+from swarm_core import gwo_update, ga_offspring, gwo_update_codes, ga_offspring_codes, gradient_polish, select_leaders, split_best, evaluate_population, as_evaluator, as_generator, phase_levels, random_codes, save_checkpoint, load_checkpoint
+from stopping import StoppingCriteria
+from instrumentation import NULL_PROBE
 
 class Hybrid_GWO_GA_Optimizer:
-    def __init__(self, fitness_func, dim, pop_size, max_iter, lower_bound, upper_bound, mutation_rate=0.1):
+    def __init__(self, fitness_func, dim, pop_size, max_iter, lower_bound, upper_bound, mutation_rate=0.1, executor=None, verbose=True, stopping=None, seed=None, probe=None,
+                 polish_every=0, polish_top=1, polish_steps=5, dtype=np.float64, phase_bits=0,
+                 checkpoint=None, checkpoint_every=0, checkpoint_meta=None):
         self.fitness_func = fitness_func
         self.dim = dim
         self.pop_size = pop_size
@@ -9,99 +14,249 @@ class Hybrid_GWO_GA_Optimizer:
         self.lb = lower_bound
         self.ub = upper_bound
         self.mutation_rate = mutation_rate
+        self.verbose = verbose
+        # Pool đánh giá song song (None = tuần tự), xem swarm_core.ParallelEvaluator
+        self.executor = as_evaluator(executor)
+        # Điều kiện dừng sớm (stall / target / deadline / ngân sách đánh giá), xem stopping.StoppingCriteria
+        self.stopping = stopping if stopping is not None else StoppingCriteria()
+        # Bộ sinh số ngẫu nhiên riêng (seed: None, số nguyên, SeedSequence hoặc np.random.Generator)
+        self.rng = as_generator(seed)
+        # Đo đạc theo pha / sự kiện vòng lặp (instrumentation.Profiler), mặc định tắt
+        self.probe = probe if probe is not None else NULL_PROBE
+        # Giai đoạn memetic: cứ polish_every vòng lặp, tinh chỉnh polish_top cá thể tốt nhất bằng polish_steps
+        # bước gradient trên hàm mục tiêu trơn (cần fitness_func.surrogate_grad); 0 = tắt
+        if polish_every > 0 and not hasattr(fitness_func, 'surrogate_grad'):
+            raise ValueError("polish_every > 0 cần fitness_func có surrogate_grad")
+        self.polish_every = polish_every
+        self.polish_top = polish_top
+        self.polish_steps = polish_steps
+        self.step_evals = pop_size # Số lần đánh giá fitness của vòng lặp gần nhất
+        # Kiểu dữ liệu của quần thể: float32 giảm một nửa bộ nhớ / băng thông (dùng cùng JCASObjective(dtype=np.float32))
+        self.dtype = np.dtype(dtype)
+        # Chế độ pha b-bit: phase_bits > 0 - mỗi cá thể là vector mã pha (dim = N) uint8, GWO/GA thao tác trên mã
+        # nguyên (swarm_core.gwo_update_codes / ga_offspring_codes), fitness_func nhận mã pha
+        # (jcas_model.PhaseCodeObjective); lower_bound / upper_bound bị bỏ qua
+        self.phase_bits = phase_bits
+        if phase_bits > 0:
+            if polish_every > 0:
+                raise ValueError("phase_bits > 0 không dùng được với polish_every (mã pha rời rạc)")
+            self.levels = phase_levels(phase_bits)
+            self.dtype = np.dtype(np.uint8)
         
-        # Khởi tạo quần thể
-        self.population = np.random.uniform(self.lb, self.ub, (self.pop_size, self.dim))
-        self.fitness = np.zeros(self.pop_size)
+        # Checkpoint: cứ checkpoint_every vòng lặp ghi toàn bộ trạng thái (quần thể, lãnh đạo, lịch sử, RNG, bộ đếm
+        # dừng) ra file checkpoint (ghi nguyên tử, xem swarm_core.save_checkpoint); 0 = tắt.
+        # optimize(resume=True) chạy tiếp từ file đó, kết quả trùng bit với lần chạy không bị ngắt
+        self.checkpoint = checkpoint
+        self.checkpoint_every = checkpoint_every
+        # checkpoint_meta: dict mô tả bài toán (tham số hàm mục tiêu, seed...) ghi cùng cấu hình bộ tối ưu,
+        # chạy tiếp với bài toán khác sẽ bị từ chối (ValueError) thay vì nạp trạng thái cũ
+        self.checkpoint_meta = dict(checkpoint_meta or {})
         
-        # Đánh giá fitness ban đầu
-        for i in range(self.pop_size):
-            self.fitness[i] = self.fitness_func(self.population[i])
+        # Quần thể ban đầu được tạo khi cần (init_population, gọi từ init_leaders): chạy tiếp từ checkpoint
+        # nạp quần thể từ file nên không tốn thêm pop_size lần đánh giá cho quần thể sẽ bị bỏ đi
+        self.population = None
+        self.fitness = None
+
+    def init_population(self):
+        """Khởi tạo quần thể ngẫu nhiên và đánh giá fitness ban đầu"""
+        if self.phase_bits > 0:
+            self.population = random_codes(self.rng, (self.pop_size, self.dim), self.levels)
+        else:
+            self.population = self.rng.uniform(self.lb, self.ub, (self.pop_size, self.dim)).astype(self.dtype, copy=False)
+        self.fitness = evaluate_population(self.fitness_func, self.population, self.executor)
             
-    def optimize(self):
-        # Sắp xếp để tìm Alpha, Beta, Delta
-        sorted_indices = np.argsort(self.fitness)[::-1] # Fitness bài này là Score (càng cao càng tốt)
+    def init_leaders(self):
+        """Tìm Alpha, Beta, Delta từ quần thể hiện tại (khởi tạo quần thể nếu chưa có) và đặt lại lịch sử hội tụ"""
+        if self.population is None:
+            self.init_population()
+        # Tìm Alpha, Beta, Delta (một lần argpartition, không sắp xếp cả quần thể)
+        sorted_indices = select_leaders(self.fitness, 3) # Fitness bài này là Score (càng cao càng tốt)
         # Lưu ý: Ở bài WSN là khoảng cách (càng nhỏ càng tốt), còn bài JCAS là Gain (càng lớn càng tốt).
-        # Nên ta dùng [::-1] để sort giảm dần (Max problem).
+        # Nên ta chọn theo thứ tự giảm dần (Max problem).
         
-        alpha_pos = self.population[sorted_indices[0]].copy()
-        alpha_score = self.fitness[sorted_indices[0]]
+        self.alpha_pos = self.population[sorted_indices[0]].copy()
+        self.alpha_score = self.fitness[sorted_indices[0]]
         
-        beta_pos = self.population[sorted_indices[1]].copy()
-        delta_pos = self.population[sorted_indices[2]].copy()
+        self.beta_pos = self.population[sorted_indices[1]].copy()
+        self.beta_score = self.fitness[sorted_indices[1]]
+        self.delta_pos = self.population[sorted_indices[2]].copy()
         
-        history = []
+        self.history = []
+
+    def step(self, t):
+        """Thực hiện một vòng lặp Hybrid GWO-GA (t: chỉ số vòng lặp, dùng để tính hệ số a)"""
+        self.history.append(self.alpha_score)
+        probe = self.probe
+        probe.iteration_start(t)
         
-        print(">>> Bắt đầu chạy Hybrid GWO-GA cho JCAS...")
+        a = 2.0 - t * (2.0 / self.max_iter) # Hệ số a giảm dần
         
-        for t in range(self.max_iter):
-            history.append(alpha_score)
-            
-            a = 2.0 - t * (2.0 / self.max_iter) # Hệ số a giảm dần
-            
-            # Sắp xếp lại quần thể theo Fitness giảm dần (người giỏi nhất đứng đầu)
-            sorted_idx = np.argsort(self.fitness)[::-1]
-            self.population = self.population[sorted_idx]
-            self.fitness = self.fitness[sorted_idx]
-            
-            # Chia đôi quần thể
-            half_pop = self.pop_size // 2
-            
-            # === GIAI ĐOẠN 1: GWO (Top 50% Tốt nhất) ===
-            for i in range(half_pop):
-                for d in range(self.dim):
-                    r1 = np.random.rand(); r2 = np.random.rand()
-                    A1 = 2*a*r1 - a; C1 = 2*r2
-                    D_alpha = abs(C1 * alpha_pos[d] - self.population[i, d])
-                    X1 = alpha_pos[d] - A1 * D_alpha
-                    
-                    r1 = np.random.rand(); r2 = np.random.rand()
-                    A2 = 2*a*r1 - a; C2 = 2*r2
-                    D_beta = abs(C2 * beta_pos[d] - self.population[i, d])
-                    X2 = beta_pos[d] - A2 * D_beta
-                    
-                    r1 = np.random.rand(); r2 = np.random.rand()
-                    A3 = 2*a*r1 - a; C3 = 2*r2
-                    D_delta = abs(C3 * delta_pos[d] - self.population[i, d])
-                    X3 = delta_pos[d] - A3 * D_delta
-                    
-                    self.population[i, d] = (X1 + X2 + X3) / 3.0
-            
-            # === GIAI ĐOẠN 2: GA (Bottom 50% Yếu hơn) ===
-            for i in range(half_pop, self.pop_size):
-                # Lai ghép (Crossover) giữa Alpha và Beta
-                w_cross = np.random.rand() # Trọng số lai ghép
-                child = w_cross * alpha_pos + (1.0 - w_cross) * beta_pos
-                
-                # Đột biến (Mutation) trên từng gen
-                for d in range(self.dim):
-                    if np.random.rand() < self.mutation_rate:
-                        # Đột biến ngẫu nhiên trong vùng tìm kiếm
-                        child[d] = np.random.uniform(self.lb, self.ub)
-                
-                # Thay thế cá thể yếu bằng con mới sinh ra
-                self.population[i] = child
-            
-            # Ràng buộc biên (Boundary Check)
-            self.population = np.clip(self.population, self.lb, self.ub)
-            
-            # Cập nhật Fitness
-            for i in range(self.pop_size):
-                self.fitness[i] = self.fitness_func(self.population[i])
+        # Chia đôi quần thể: đưa nửa có Fitness cao hơn lên đầu (argpartition, không cần sắp xếp đầy đủ)
+        half_pop = self.pop_size // 2
+        order = split_best(self.fitness, half_pop)
+        self.population = self.population[order]
+        self.fitness = self.fitness[order]
+        probe.mark('split')
+        
+        if self.phase_bits > 0:
+            self._step_codes(half_pop, a)
+        else:
+            self._step_positions(half_pop, a)
+        
+        # Cập nhật Fitness
+        self.fitness = evaluate_population(self.fitness_func, self.population, self.executor)
+        probe.mark('fitness')
+        probe.count('evaluations', self.pop_size)
+        self.step_evals = self.pop_size
+        
+        if self.polish_every > 0 and (t + 1) % self.polish_every == 0:
+            self._polish(select_leaders(self.fitness, self.polish_top))
+            probe.mark('polish')
+        
+        # Cập nhật Alpha, Beta, Delta toàn cục (một lần argpartition lấy 3 cá thể tốt nhất)
+        sorted_indices_new = select_leaders(self.fitness, 3)
+        current_best_idx = sorted_indices_new[0]
+        if self.fitness[current_best_idx] > self.alpha_score:
+            self.alpha_score = self.fitness[current_best_idx]
+            self.alpha_pos = self.population[current_best_idx].copy()
+        
+        # Cập nhật lại Beta, Delta (xét trên toàn quần thể mới)
+        self.beta_pos = self.population[sorted_indices_new[1]].copy()
+        self.beta_score = self.fitness[sorted_indices_new[1]]
+        self.delta_pos = self.population[sorted_indices_new[2]].copy()
+        probe.mark('leaders')
+        probe.iteration_end(t, self.alpha_score)
+
+    def _step_positions(self, half_pop, a):
+        """GWO cho nửa tốt, GA (lai ghép số học + đột biến) cho nửa yếu trên vị trí thực [Re w, Im w]"""
+        # === GIAI ĐOẠN 1: GWO (Top 50% Tốt nhất) ===
+        self.population[:half_pop] = gwo_update(self.population[:half_pop], self.alpha_pos, self.beta_pos, self.delta_pos, a, self.rng)
+        self.probe.mark('update')
+        
+        # === GIAI ĐOẠN 2: GA (Bottom 50% Yếu hơn) ===
+        # Lai ghép Alpha-Beta và đột biến cho cả nửa dưới cùng lúc
+        children, _, _ = ga_offspring(self.alpha_pos, self.beta_pos, self.pop_size - half_pop,
+                                         self.lb, self.ub, self.mutation_rate, rng=self.rng, dtype=self.dtype)
+        
+        # Thay thế cá thể yếu bằng con mới sinh ra
+        self.population[half_pop:] = children
+        
+        # Ràng buộc biên (Boundary Check)
+        self.population = np.clip(self.population, self.lb, self.ub)
+        self.probe.mark('ga')
+
+    def _step_codes(self, half_pop, a):
+        """Như _step_positions nhưng trên mã pha uint8: GWO theo khoảng cách vòng, GA lai ghép đồng nhất + đột biến mã"""
+        self.population[:half_pop] = gwo_update_codes(self.population[:half_pop], self.alpha_pos, self.beta_pos,
+                                                      self.delta_pos, a, self.levels, self.rng)
+        self.probe.mark('update')
+        self.population[half_pop:], _ = ga_offspring_codes(self.alpha_pos, self.beta_pos, self.pop_size - half_pop,
+                                                           self.levels, self.mutation_rate, self.rng)
+        self.probe.mark('ga')
+
+    def _polish(self, idx):
+        """Tinh chỉnh gradient các cá thể idx tại chỗ (vị trí, fitness)"""
+        positions, scores, evals = gradient_polish(self.fitness_func, self.population[idx], self.fitness[idx],
+                                                   self.polish_steps, self.lb, self.ub)
+        self.population[idx] = positions
+        self.fitness[idx] = scores
+        self.step_evals += evals
+        self.probe.count('evaluations', evals)
+
+    def accept_migrants(self, positions, scores):
+        """
+        Nhận các cá thể di cư (từ đảo khác): thay thế các cá thể yếu nhất của quần thể,
+        cập nhật Alpha nếu cá thể di cư tốt hơn.
+        positions: Ma trận (k, dim), scores: Vector (k,) fitness đã biết của chúng
+        """
+        positions = np.asarray(positions, dtype=self.population.dtype) # Bảng di cư là float64 (kể cả mã pha)
+        scores = np.asarray(scores)
+        # Topology 'full' có thể gửi tới 2*(K-1) cá thể: chỉ nhận những cá thể tốt nhất,
+        # luôn giữ lại ít nhất một cá thể của đảo
+        num_kept = min(len(scores), self.pop_size - 1)
+        if num_kept < len(scores):
+            keep = select_leaders(scores, num_kept)
+            positions, scores = positions[keep], scores[keep]
+        worst_idx = split_best(self.fitness, len(scores), maximize=False)[:len(scores)]
+        self.population[worst_idx] = positions
+        self.fitness[worst_idx] = scores
+        best = np.argmax(scores)
+        if scores[best] > self.alpha_score:
+            self.alpha_score = scores[best]
+            self.alpha_pos = positions[best].copy()
+
+    def _checkpoint_config(self):
+        """Cấu hình phải trùng khi chạy tiếp từ checkpoint"""
+        return {'algorithm': 'Hybrid GWO-GA', 'dim': self.dim, 'pop_size': self.pop_size, 'max_iter': self.max_iter,
+                'lower_bound': self.lb, 'upper_bound': self.ub, 'mutation_rate': self.mutation_rate,
+                'polish_every': self.polish_every, 'dtype': self.dtype.str,
+                'phase_bits': self.phase_bits, **self.checkpoint_meta}
+
+    def save_state(self, path, next_iter):
+        """Ghi trạng thái sau vòng lặp next_iter - 1 ra path (vòng lặp kế tiếp là next_iter)"""
+        stopping = self.stopping.state()
+        arrays = dict(population=self.population, fitness=self.fitness, alpha_pos=self.alpha_pos,
+                      alpha_score=self.alpha_score, beta_pos=self.beta_pos, beta_score=self.beta_score,
+                      delta_pos=self.delta_pos, history=np.asarray(self.history, dtype=float), next_iter=next_iter,
+                      stop_evals=stopping['evals'], stop_iterations=stopping['iterations'],
+                      stop_best_history=np.asarray(stopping['best_history'], dtype=float),
+                      stop_elapsed=stopping['elapsed'])
+        return save_checkpoint(path, self.rng, self._checkpoint_config(), **arrays)
+
+    def load_state(self, path):
+        """Khôi phục trạng thái từ checkpoint (gọi sau stopping.start), trả về chỉ số vòng lặp kế tiếp"""
+        state = load_checkpoint(path, self.rng, self._checkpoint_config())
+        self.population = state['population']
+        self.fitness = state['fitness']
+        self.alpha_pos = state['alpha_pos']
+        self.alpha_score = state['alpha_score'][()]
+        self.beta_pos = state['beta_pos']
+        self.beta_score = state['beta_score'][()]
+        self.delta_pos = state['delta_pos']
+        self.history = list(state['history'])
+        self.stopping.restore(int(state['stop_evals']), int(state['stop_iterations']),
+                              state['stop_best_history'], float(state['stop_elapsed']))
+        return int(state['next_iter'])
+
+    def optimize(self, resume=False):
+        """
+        Chạy tối đa max_iter vòng lặp. Sau khi chạy: stop_reason (lý do dừng), evaluations (số lần đánh giá fitness)
+        resume=True: chạy tiếp từ file self.checkpoint thay vì từ quần thể ban đầu
+        """
+        stopping = self.stopping
+        if resume:
+            # Bộ đếm đánh giá / vòng lặp / thời gian được khôi phục từ checkpoint
+            stopping.start(maximize=True)
+            start_iter = self.load_state(self.checkpoint)
+        else:
+            self.init_leaders()
+            stopping.start(maximize=True, evals=self.pop_size)
+            start_iter = 0
+        self.probe.begin('Hybrid GWO-GA', pop_size=self.pop_size, dim=self.dim, max_iter=self.max_iter)
+        if not resume:
+            # Quần thể ban đầu đã được đánh giá trong init_leaders
+            self.probe.count('evaluations', self.pop_size)
+        
+        if self.verbose:
+            print(">>> Bắt đầu chạy Hybrid GWO-GA cho JCAS..." if start_iter == 0 else
+                  f">>> Chạy tiếp Hybrid GWO-GA từ vòng lặp {start_iter} ({self.checkpoint})")
+        
+        for t in range(start_iter, self.max_iter):
+            self.step(t)
             
-            # Cập nhật Alpha, Beta, Delta toàn cục
-            # Tìm max fitness
-            current_best_idx = np.argmax(self.fitness)
-            if self.fitness[current_best_idx] > alpha_score:
-                alpha_score = self.fitness[current_best_idx]
-                alpha_pos = self.population[current_best_idx].copy()
+            if self.verbose and (t+1) % 10 == 0:
+                print(f"Iter {t+1}: Best Fitness = {self.alpha_score:.4f}")
             
-            # Cập nhật lại Beta, Delta (xét trên toàn quần thể mới)
-            sorted_indices_new = np.argsort(self.fitness)[::-1]
-            beta_pos = self.population[sorted_indices_new[1]].copy()
-            delta_pos = self.population[sorted_indices_new[2]].copy()
+            if stopping.update(self.alpha_score, self.step_evals):
+                break
             
-            if (t+1) % 10 == 0:
-                print(f"Iter {t+1}: Best Fitness = {alpha_score:.4f}")
-                
-        return alpha_pos, history
\ No newline at end of file
+            if self.checkpoint_every > 0 and (t + 1) % self.checkpoint_every == 0:
+                self.save_state(self.checkpoint, t + 1)
+                self.probe.count('checkpoints')
+        
+        self.stop_reason = stopping.finish()
+        self.evaluations = stopping.evals
+        self.probe.end(stop_reason=self.stop_reason, best=float(self.alpha_score))
+        if self.verbose:
+            print(f">>> Dừng sau {stopping.iterations} vòng lặp ({self.stop_reason}), {self.evaluations} lần đánh giá fitness")
+        return self.alpha_pos, self.history
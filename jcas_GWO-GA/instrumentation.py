@@ -0,0 +1,181 @@
+import os
+import json
+import time
+import tracemalloc
+from collections import defaultdict
+
+try:
+    import resource # Chỉ có trên Unix; Windows bỏ qua RSS
+except ImportError:
+    resource = None
+
+
+class NullProbe:
+    """
+    Probe rỗng mặc định của các bộ tối ưu: mọi hook không làm gì, không gọi đồng hồ,
+    nên khi tắt đo đạc mỗi vòng lặp chỉ tốn vài lời gọi hàm rỗng.
+    """
+    enabled = False
+
+    def begin(self, name, **info):
+        pass
+
+    def iteration_start(self, t):
+        pass
+
+    def mark(self, phase):
+        pass
+
+    def count(self, name, k=1):
+        pass
+
+    def iteration_end(self, t, best):
+        pass
+
+    def end(self, **info):
+        pass
+
+
+NULL_PROBE = NullProbe()
+
+
+class Profiler(NullProbe):
+    """
+    Đo đạc một lần chạy tối ưu: thời gian từng pha trong vòng lặp, bộ đếm (số lần đánh giá fitness,
+    số lần dựng ma trận lái...) và mẫu bộ nhớ. Truyền vào bộ tối ưu qua tham số probe=.
+
+    Bộ tối ưu gọi begin(...) trước vòng lặp, iteration_start(t) đầu mỗi vòng, mark(pha) ngay sau mỗi pha
+    (thời gian tính từ mark / iteration_start trước đó), count(tên, k) cho bộ đếm, iteration_end(t, best)
+    cuối vòng và end(...) khi kết thúc. Mỗi bước sinh một sự kiện (dict) gửi tới sink:
+      run_start: name + thông tin cấu hình
+      iteration: t, best, time (s mỗi pha), counts (bộ đếm của vòng này), memory (nếu đến lượt lấy mẫu)
+      run_end:   tổng thời gian từng pha, tổng bộ đếm, thời gian chạy, bộ nhớ
+    sink: callable(event) - ví dụ JsonlSink(path) ghi mỗi sự kiện một dòng JSON, hoặc list.append;
+          None = chỉ cộng dồn (xem summary())
+    every: Chỉ gửi sự kiện iteration mỗi every vòng lặp (tổng vẫn tính đủ mọi vòng)
+    memory_every: Lấy mẫu bộ nhớ mỗi memory_every vòng lặp (0 = chỉ lấy ở run_end)
+    Số lần dựng ma trận lái của JCAS_System được đếm sau khi gọi attach(jcas).
+    """
+    enabled = True
+
+    def __init__(self, sink=None, every=1, memory_every=0, run_id=None):
+        self.sink = sink
+        self.every = max(1, every)
+        self.memory_every = memory_every
+        self.run_id = run_id if run_id is not None else f"{os.getpid()}-{time.time_ns()}"
+        self.name = None
+        self.phase_time = defaultdict(float)
+        self.counters = defaultdict(int)
+        self.iterations = 0
+        self._last = None
+        self._iter_time = {}
+        self._iter_counts = {}
+
+    def attach(self, jcas):
+        """Đếm số lần dựng ma trận lái (cache trượt hoặc cache tắt) của JCAS_System này"""
+        jcas.probe = self
+        return jcas
+
+    def _emit(self, event, **fields):
+        if self.sink is not None:
+            fields.update(event=event, run=self.run_id, name=self.name, clock=time.time())
+            self.sink(fields)
+
+    def begin(self, name, **info):
+        self.name = name
+        self.phase_time.clear()
+        self.counters.clear()
+        self.iterations = 0
+        self._start = time.perf_counter()
+        self._emit('run_start', **info)
+
+    def iteration_start(self, t):
+        self._iter_time = {}
+        self._iter_counts = {}
+        self._last = time.perf_counter()
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        if self._last is not None:
+            elapsed = now - self._last
+            self.phase_time[phase] += elapsed
+            self._iter_time[phase] = self._iter_time.get(phase, 0.0) + elapsed
+        self._last = now
+
+    def count(self, name, k=1):
+        self.counters[name] += k
+        self._iter_counts[name] = self._iter_counts.get(name, 0) + k
+
+    def iteration_end(self, t, best):
+        self.iterations += 1
+        self._last = None
+        if self.sink is None or (t + 1) % self.every:
+            return
+        fields = {'t': t, 'best': float(best), 'time': self._iter_time, 'counts': self._iter_counts}
+        if self.memory_every and (t + 1) % self.memory_every == 0:
+            fields['memory'] = memory_sample()
+        self._emit('iteration', **fields)
+
+    def end(self, **info):
+        self.wall_time = time.perf_counter() - self._start
+        self._emit('run_end', iterations=self.iterations, wall_time=self.wall_time,
+                   time=dict(self.phase_time), counts=dict(self.counters), memory=memory_sample(), **info)
+
+    def summary(self):
+        """Tổng thời gian từng pha (s), tỉ lệ so với tổng các pha và các bộ đếm"""
+        total = sum(self.phase_time.values()) or 1.0
+        return {'iterations': self.iterations, 'time': dict(self.phase_time),
+                'share': {k: v / total for k, v in self.phase_time.items()}, 'counts': dict(self.counters)}
+
+
+def memory_sample():
+    """RSS lớn nhất của process (KB, Unix) và bộ nhớ Python đang theo dõi nếu tracemalloc đang bật"""
+    sample = {}
+    if resource is not None:
+        sample['max_rss_kb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if tracemalloc.is_tracing():
+        sample['traced_kb'], sample['traced_peak_kb'] = (v // 1024 for v in tracemalloc.get_traced_memory())
+    return sample
+
+
+class JsonlSink:
+    """Ghi mỗi sự kiện một dòng JSON (nối thêm vào file, nhiều lần chạy / nhiều process dùng chung được)"""
+    def __init__(self, path):
+        self.path = path
+
+    def __call__(self, event):
+        line = json.dumps(event, default=float) + '\n'
+        # Một lần write cho mỗi dòng ở chế độ append: các process ghi song song không xen lẫn dòng
+        with open(self.path, 'a') as f:
+            f.write(line)
+
+
+def load_trace(path):
+    """Đọc file trace JSONL thành danh sách sự kiện"""
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def aggregate(events):
+    """
+    Gom các sự kiện run_end (từ một hay nhiều file trace) theo tên bộ tối ưu:
+    số lần chạy, tổng vòng lặp, tổng thời gian từng pha, tổng bộ đếm và thời gian trung bình mỗi vòng.
+    """
+    result = {}
+    for event in events:
+        if event.get('event') != 'run_end':
+            continue
+        entry = result.setdefault(event['name'], {'runs': 0, 'iterations': 0, 'wall_time': 0.0,
+                                                  'time': defaultdict(float), 'counts': defaultdict(int)})
+        entry['runs'] += 1
+        entry['iterations'] += event['iterations']
+        entry['wall_time'] += event['wall_time']
+        for phase, value in event['time'].items():
+            entry['time'][phase] += value
+        for name, value in event['counts'].items():
+            entry['counts'][name] += value
+    for entry in result.values():
+        entry['time'] = dict(entry['time'])
+        entry['counts'] = dict(entry['counts'])
+        entry['per_iteration'] = {k: v / max(1, entry['iterations']) for k, v in entry['time'].items()}
+    return result
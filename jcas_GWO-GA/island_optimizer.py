@@ -0,0 +1,239 @@
+import time
+import queue
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import numpy as np
+from hybrid_optimizer import Hybrid_GWO_GA_Optimizer
+from swarm_core import spawn_seeds
+
+# Chu kỳ (giây) tiến trình chính kiểm tra các đảo còn sống trong lúc chờ kết quả: một đảo chết đột ngột
+# (OOM kill, segfault) không kịp gửi kết quả, các đảo còn lại kẹt ở barrier
+RESULT_POLL = 1.0
+
+
+def island_sources(island_id, num_islands, topology):
+    """Danh sách các đảo gửi cá thể di cư sang đảo island_id"""
+    if topology == 'ring':
+        return [(island_id - 1) % num_islands]
+    if topology == 'full':
+        return [k for k in range(num_islands) if k != island_id]
+    raise ValueError(f"topology phải là 'ring' hoặc 'full', nhận được {topology!r}")
+
+
+def _run_island(island_id, config, shm_name, barrier, result_queue):
+    """
+    Tiến trình của một đảo: chạy Hybrid GWO-GA độc lập trên quần thể con,
+    cứ migration_interval vòng lặp lại trao đổi Alpha/Beta với các đảo khác qua shared memory.
+    """
+    try:
+        result_queue.put(_island_loop(island_id, config, shm_name, barrier))
+    except BaseException as exc:
+        # Giải phóng các đảo khác đang chờ ở barrier rồi báo lỗi về tiến trình chính
+        barrier.abort()
+        result_queue.put((island_id, None, None, None, repr(exc)))
+        raise
+
+
+def _island_loop(island_id, config, shm_name, barrier):
+    fitness_func = config['fitness_factory'](*config['factory_args'])
+    dim = config['dim']
+    num_islands = config['num_islands']
+
+    # Bảng di cư dùng chung: (đảo, [Alpha, Beta], vị trí + điểm ở cột cuối)
+    shm = shared_memory.SharedMemory(name=shm_name)
+    board = np.ndarray((num_islands, 2, dim + 1), dtype=np.float64, buffer=shm.buf)
+    sources = island_sources(island_id, num_islands, config['topology'])
+
+    optimizer = Hybrid_GWO_GA_Optimizer(fitness_func, dim, config['pop_size'], config['max_iter'],
+                                        config['lower_bound'], config['upper_bound'],
+                                        mutation_rate=config['mutation_rate'], verbose=False, seed=config['seed'],
+                                        dtype=config['dtype'], phase_bits=config['phase_bits'],
+                                        polish_every=config['polish_every'])
+    start = time.perf_counter()
+    optimizer.init_leaders()
+    try:
+        for t in range(optimizer.max_iter):
+            optimizer.step(t)
+
+            if num_islands > 1 and (t + 1) % config['migration_interval'] == 0 and t + 1 < optimizer.max_iter:
+                # Ghi Alpha/Beta của đảo mình lên bảng
+                board[island_id, 0, :dim] = optimizer.alpha_pos
+                board[island_id, 0, dim] = optimizer.alpha_score
+                board[island_id, 1, :dim] = optimizer.beta_pos
+                board[island_id, 1, dim] = optimizer.beta_score
+                barrier.wait()
+
+                # Đọc cá thể di cư từ các đảo nguồn
+                migrants = board[sources].reshape(-1, dim + 1).copy()
+                # Chờ mọi đảo đọc xong trước khi bất kỳ đảo nào ghi đè ở lần di cư sau
+                barrier.wait()
+                optimizer.accept_migrants(migrants[:, :dim], migrants[:, dim])
+    finally:
+        del board
+        shm.close()
+
+    elapsed = time.perf_counter() - start
+    return island_id, optimizer.alpha_pos, optimizer.alpha_score, optimizer.history, elapsed
+
+
+class Island_GWO_GA_Optimizer:
+    """
+    Hybrid GWO-GA mô hình đảo (Island Model): K quần thể con chạy song song trên K process.
+    Cứ migration_interval vòng lặp, mỗi đảo gửi Alpha và Beta của mình sang các đảo lân cận
+    theo topology ('ring': đảo k nhận từ đảo k-1; 'full': nhận từ mọi đảo khác).
+    Cá thể di cư thay thế các cá thể yếu nhất của đảo nhận.
+
+    fitness_factory(*factory_args) được gọi trong từng process để dựng hàm fitness tại chỗ
+    (phải pickle được khi multiprocessing dùng chế độ 'spawn').
+    Mỗi đảo dùng một luồng ngẫu nhiên độc lập tách từ seed bằng SeedSequence.spawn.
+    """
+    def __init__(self, fitness_factory, dim, pop_size, max_iter, lower_bound, upper_bound, mutation_rate=0.1,
+                 num_islands=4, migration_interval=10, topology='ring', factory_args=(), seed=None, parallel=True,
+                 dtype=np.float64, phase_bits=0, polish_every=0):
+        island_sources(0, num_islands, topology)  # Kiểm tra topology hợp lệ
+        self.fitness_factory = fitness_factory
+        self.factory_args = factory_args
+        self.dim = dim
+        self.pop_size = pop_size # Kích thước quần thể của MỖI đảo
+        self.max_iter = max_iter
+        self.lb = lower_bound
+        self.ub = upper_bound
+        self.mutation_rate = mutation_rate
+        self.num_islands = num_islands
+        self.migration_interval = migration_interval
+        self.topology = topology
+        self.seed = seed
+        # parallel=False: chạy lần lượt các đảo trong cùng tiến trình, cùng lịch di cư -
+        # với cùng seed cho kết quả trùng khớp từng bit với chế độ song song
+        self.parallel = parallel
+        # Kiểu dữ liệu quần thể của mỗi đảo; bảng di cư luôn là float64 (chứa được float32 không mất mát)
+        self.dtype = np.dtype(dtype)
+        # > 0: mỗi đảo tìm trên mã pha b-bit (xem Hybrid_GWO_GA_Optimizer, fitness_factory trả về PhaseCodeObjective)
+        self.phase_bits = phase_bits
+        # > 0: mỗi đảo tinh chỉnh gradient (memetic) cá thể tốt nhất của mình mỗi polish_every vòng lặp
+        self.polish_every = polish_every
+
+    def optimize(self):
+        """
+        Chạy tất cả các đảo và trả về (best_pos, history), history là fitness tốt nhất toàn cục mỗi vòng lặp.
+        Sau khi chạy: island_histories (K, max_iter), island_scores, island_times, wall_time.
+        """
+        K = self.num_islands
+        # Mỗi đảo có một luồng ngẫu nhiên riêng, độc lập (SeedSequence con của seed gốc)
+        seeds = spawn_seeds(self.seed, K)
+
+        print(f">>> Bắt đầu chạy Hybrid GWO-GA mô hình đảo: {K} đảo x {self.pop_size} cá thể, "
+              f"topology={self.topology}, di cư mỗi {self.migration_interval} vòng lặp")
+        start = time.perf_counter()
+        configs = [self._island_config(k, seeds[k]) for k in range(K)]
+        results = self._run_parallel(configs) if self.parallel else self._run_serial(configs)
+        self.wall_time = time.perf_counter() - start
+
+        self.island_histories = np.array([r[3] for r in results])
+        self.island_scores = np.array([r[2] for r in results])
+        self.island_times = np.array([r[4] for r in results])
+        best = int(np.argmax(self.island_scores))
+        history = list(np.max(self.island_histories, axis=0))
+
+        for k in range(K):
+            print(f"  Đảo {k}: Best Fitness = {self.island_scores[k]:.4f} ({self.island_times[k]:.2f} s)")
+        print(f">>> Tốt nhất: đảo {best}, Fitness = {self.island_scores[best]:.4f}, "
+              f"tổng thời gian = {self.wall_time:.2f} s")
+        return results[best][1], history
+
+    def _island_config(self, island_id, seed):
+        return {
+            'fitness_factory': self.fitness_factory, 'factory_args': self.factory_args,
+            'dim': self.dim, 'pop_size': self.pop_size, 'max_iter': self.max_iter,
+            'lower_bound': self.lb, 'upper_bound': self.ub, 'mutation_rate': self.mutation_rate,
+            'num_islands': self.num_islands, 'migration_interval': self.migration_interval,
+            'topology': self.topology, 'seed': seed, 'dtype': self.dtype,
+            'phase_bits': self.phase_bits, 'polish_every': self.polish_every,
+        }
+
+    def _run_parallel(self, configs):
+        """Mỗi đảo một process, trao đổi cá thể di cư qua shared memory + barrier"""
+        K = self.num_islands
+        ctx = mp.get_context()
+        shm = shared_memory.SharedMemory(create=True, size=K * 2 * (self.dim + 1) * 8)
+        barrier = ctx.Barrier(K)
+        result_queue = ctx.Queue()
+        processes = []
+        try:
+            for k in range(K):
+                p = ctx.Process(target=_run_island, args=(k, configs[k], shm.name, barrier, result_queue))
+                p.start()
+                processes.append(p)
+
+            # Lấy kết quả trước khi join để tránh kẹt hàng đợi
+            results = self._collect(processes, result_queue)
+            for p in processes:
+                p.join()
+            errors = [f"đảo {r[0]}: {r[4]}" for r in results if r[1] is None]
+            if errors:
+                raise RuntimeError("Island model thất bại - " + "; ".join(errors))
+        finally:
+            for p in processes:
+                if p.is_alive():
+                    p.terminate()
+                    p.join()
+            shm.close()
+            shm.unlink()
+        return results
+
+    def _collect(self, processes, result_queue):
+        """
+        Đợi kết quả của mọi đảo, cứ RESULT_POLL giây kiểm tra các đảo chưa trả kết quả còn sống không;
+        đảo chết mà không gửi kết quả -> RuntimeError (các đảo còn lại bị dừng trong _run_parallel)
+        """
+        results = {}
+        while len(results) < len(processes):
+            try:
+                result = result_queue.get(timeout=RESULT_POLL)
+                results[result[0]] = result
+                continue
+            except queue.Empty:
+                pass
+            dead = [k for k, p in enumerate(processes) if k not in results and not p.is_alive()]
+            if not dead:
+                continue
+            # Đảo có thể gửi kết quả ngay trước khi thoát: lấy nốt những gì đã nằm trong hàng đợi
+            while True:
+                try:
+                    result = result_queue.get(timeout=0.1)
+                except queue.Empty:
+                    break
+                results[result[0]] = result
+            lost = [k for k in dead if k not in results]
+            if lost:
+                raise RuntimeError("Island model thất bại - " + "; ".join(
+                    f"đảo {k} kết thúc bất thường (exitcode={processes[k].exitcode})" for k in lost))
+        return [results[k] for k in sorted(results)]
+
+    def _run_serial(self, configs):
+        """Chạy lần lượt các đảo trong tiến trình hiện tại, cùng thứ tự bước / di cư như _island_loop"""
+        K = self.num_islands
+        optimizers = []
+        for config in configs:
+            fitness_func = config['fitness_factory'](*config['factory_args'])
+            optimizers.append(Hybrid_GWO_GA_Optimizer(fitness_func, self.dim, self.pop_size, self.max_iter,
+                                                      self.lb, self.ub, mutation_rate=self.mutation_rate,
+                                                      verbose=False, seed=config['seed'], dtype=self.dtype,
+                                                      phase_bits=self.phase_bits, polish_every=self.polish_every))
+        elapsed = np.zeros(K)
+        for k, optimizer in enumerate(optimizers):
+            optimizer.init_leaders()
+        for t in range(self.max_iter):
+            for k, optimizer in enumerate(optimizers):
+                start = time.perf_counter()
+                optimizer.step(t)
+                elapsed[k] += time.perf_counter() - start
+
+            if K > 1 and (t + 1) % self.migration_interval == 0 and t + 1 < self.max_iter:
+                # Chụp Alpha/Beta của mọi đảo trước, rồi mới cho các đảo nhận (giống 2 lần barrier)
+                board = np.array([[np.append(o.alpha_pos, o.alpha_score), np.append(o.beta_pos, o.beta_score)]
+                                  for o in optimizers])
+                for k, optimizer in enumerate(optimizers):
+                    migrants = board[island_sources(k, K, self.topology)].reshape(-1, self.dim + 1)
+                    optimizer.accept_migrants(migrants[:, :self.dim], migrants[:, self.dim])
+        return [(k, o.alpha_pos, o.alpha_score, o.history, elapsed[k]) for k, o in enumerate(optimizers)]
@@ -1,87 +1,195 @@
+import os
+import sys
+import time
+import argparse
+import functools
 import numpy as np
-import matplotlib.pyplot as plt
-from jcas_model import JCAS_System
+from jcas_model import JCAS_System, JCASObjective, URAObjective, PhaseCodeObjective
 from hybrid_optimizer import Hybrid_GWO_GA_Optimizer
+from island_optimizer import Island_GWO_GA_Optimizer
+from swarm_core import ParallelEvaluator
+from results_io import save_run, weights_from_position
 
 # --- CẤU HÌNH (GIỮ NGUYÊN ĐỂ SO SÁNH) ---
 N = 64
+NY = 0 # > 0: mảng phẳng URA N x NY, góc User/Target là (az, el)
 USER_ANGLE = -15.0
 TARGET_ANGLE = 30.0
+USER_ELEVATION = 0.0 # Góc ngẩng User / Target (độ, chỉ dùng khi NY > 0)
+TARGET_ELEVATION = 0.0
 POP_SIZE = 30
 MAX_ITER = 100
 ALPHA_WEIGHT = 0.5
 LAMBDA_INT = 0.5
+EXCLUSION_WIDTH = 5.0 # Nửa độ rộng vùng búp chính bỏ qua khi tính SLL (độ)
+NUM_WORKERS = 0 # > 0: đánh giá quần thể song song trên NUM_WORKERS process
+NUM_ISLANDS = 0 # > 0: chạy mô hình đảo với NUM_ISLANDS quần thể con (mỗi đảo POP_SIZE cá thể)
+POLISH_EVERY = 0 # > 0: tinh chỉnh gradient (memetic) cá thể tốt nhất mỗi POLISH_EVERY vòng lặp
+DTYPE = 'float64' # 'float32': quần thể / ma trận lái / AF ở độ chính xác đơn (metrics vẫn tính float64)
+PHASE_BITS = 0 # > 0: chỉ điều pha bằng bộ dịch pha PHASE_BITS bit (quần thể mã uint8, dim = N)
+SLL_TOL = None # Sai số SLL cho phép (dB): quét SLL thích nghi thô -> mịn thay cho lưới cố định 1 độ
+CHECKPOINT_EVERY = 10 # Số vòng lặp giữa hai lần ghi checkpoint (khi có checkpoint)
+OUTPUT = 'jcas_hybrid' # Tiền tố file kết quả (.npz, .json) và ảnh (_beampattern.png, _convergence.png)
 
-jcas = JCAS_System(num_antennas=N)
 
-# --- HAM FITNESS (GIỮ NGUYÊN) ---
-def fitness_function(wolf_position):
-    w_real = wolf_position[0:N]
-    w_imag = wolf_position[N:]
-    w_complex = w_real + 1j * w_imag
-    w_complex = w_complex.reshape(-1, 1)
-    w_complex = w_complex / np.linalg.norm(w_complex)
-    
-    gain_comm = 10 * np.log10(jcas.calculate_beampattern(w_complex, np.array([USER_ANGLE]))[0] + 1e-12)
-    gain_sense = 10 * np.log10(jcas.calculate_beampattern(w_complex, np.array([TARGET_ANGLE]))[0] + 1e-12)
-    
-    scan_angles = np.linspace(-90, 90, 181)
-    mask = np.ones(len(scan_angles), dtype=bool)
-    mask[(scan_angles > USER_ANGLE-5) & (scan_angles < USER_ANGLE+5)] = False
-    mask[(scan_angles > TARGET_ANGLE-5) & (scan_angles < TARGET_ANGLE+5)] = False
-    max_sll = 10 * np.log10(np.max(jcas.calculate_beampattern(w_complex, scan_angles[mask])) + 1e-12)
-    
-    score = (ALPHA_WEIGHT * gain_comm) + ((1 - ALPHA_WEIGHT) * gain_sense) - (LAMBDA_INT * max_sll)
-    return score
+def run(n=N, user_angle=USER_ANGLE, target_angle=TARGET_ANGLE, pop_size=POP_SIZE, max_iter=MAX_ITER,
+        num_workers=NUM_WORKERS, num_islands=NUM_ISLANDS, seed=None, verbose=True,
+        polish_every=POLISH_EVERY, ny=NY, user_elevation=USER_ELEVATION, target_elevation=TARGET_ELEVATION,
+        dtype=DTYPE, phase_bits=PHASE_BITS, sll_tol=SLL_TOL, checkpoint=None, checkpoint_every=CHECKPOINT_EVERY,
+        resume=False):
+    """
+    Chạy Hybrid GWO-GA (hoặc mô hình đảo) cho một cấu hình, không vẽ gì. Trả về (w (N,), history, metrics)
+    ny > 0: mảng phẳng n x ny, User/Target tại (user_angle, user_elevation), (target_angle, target_elevation)
+    checkpoint: file checkpoint ghi mỗi checkpoint_every vòng lặp; resume=True chạy tiếp từ file đó nếu đã có
+    (chưa hỗ trợ mô hình đảo)
+    """
+    if num_islands > 0 and (checkpoint is not None or num_workers > 0):
+        raise ValueError("checkpoint / num_workers không dùng được với mô hình đảo (num_islands > 0)")
+    # --- HAM FITNESS (GIỮ NGUYÊN CÔNG THỨC) ---
+    # F = alpha * Gain_Comm + (1-alpha) * Gain_Sensing - lambda * max_SLL (dB), bỏ vùng +-5 độ quanh User/Target
+    # JCASObjective dựng sẵn ma trận lái và bộ đệm một lần, hỗ trợ .batch (cả quần thể)
+    # Mảng phẳng: URAObjective cùng công thức, búp sóng tính tách trục A_x^T conj(W) A_y
+    # sll_tol (dB): lưới SLL thô + tinh chỉnh quanh các đỉnh thay cho lưới cố định 1 độ
+    if ny > 0:
+        factory = functools.partial(URAObjective, dtype=dtype, sll_tol=sll_tol)
+        objective_args = (n, ny, (user_angle, user_elevation), (target_angle, target_elevation),
+                          EXCLUSION_WIDTH, ALPHA_WEIGHT, LAMBDA_INT)
+        fitness_function = factory(*objective_args)
+    else:
+        factory = functools.partial(JCASObjective, dtype=dtype, sll_tol=sll_tol)
+        objective_args = (n, user_angle, target_angle, EXCLUSION_WIDTH, ALPHA_WEIGHT, LAMBDA_INT)
+        fitness_function = factory(*objective_args, jcas=JCAS_System(num_antennas=n))
 
-# --- CHẠY TỐI ƯU HYBRID ---
-optimizer = Hybrid_GWO_GA_Optimizer(
-    fitness_func=fitness_function,
-    dim=2*N,
-    pop_size=POP_SIZE,
-    max_iter=MAX_ITER,
-    lower_bound=-1,
-    upper_bound=1,
-    mutation_rate=0.1 # Tỷ lệ đột biến
-)
+    # Chế độ pha b-bit: cá thể là vector mã pha (N,) uint8, PhaseCodeObjective bọc hàm mục tiêu ở trên
+    if phase_bits > 0:
+        factory, objective_args = PhaseCodeObjective, (fitness_function, phase_bits)
+        fitness_function = PhaseCodeObjective(*objective_args)
+    dim = fitness_function.N if phase_bits > 0 else 2 * fitness_function.N
+    # Tham số bài toán ghi cùng checkpoint: chạy tiếp với góc / trọng số / seed khác sẽ bị từ chối
+    checkpoint_meta = dict(n=n, ny=ny, user_angle=user_angle, target_angle=target_angle,
+                           user_elevation=user_elevation if ny > 0 else None,
+                           target_elevation=target_elevation if ny > 0 else None,
+                           exclusion_width=EXCLUSION_WIDTH, alpha_weight=ALPHA_WEIGHT, lambda_int=LAMBDA_INT,
+                           sll_tol=sll_tol, seed=seed)
 
-best_pos, history = optimizer.optimize()
+    # --- CHẠY TỐI ƯU HYBRID ---
+    start = time.perf_counter()
+    info = {}
+    if num_islands > 0:
+        # Mô hình đảo: mỗi process tự dựng hàm mục tiêu từ objective_args
+        optimizer = Island_GWO_GA_Optimizer(
+            fitness_factory=factory,
+            factory_args=objective_args,
+            dim=dim,
+            pop_size=pop_size,
+            max_iter=max_iter,
+            lower_bound=-1,
+            upper_bound=1,
+            mutation_rate=0.1,
+            num_islands=num_islands,
+            seed=seed,
+            dtype=np.dtype(dtype),
+            phase_bits=phase_bits,
+            polish_every=polish_every
+        )
+        best_pos, history = optimizer.optimize()
+    else:
+        # Đánh giá song song: mỗi worker tự dựng hàm mục tiêu một lần khi khởi động
+        executor = None
+        if num_workers > 0:
+            executor = ParallelEvaluator('process', num_workers, fitness_factory=factory,
+                                         factory_args=objective_args)
 
-# --- VẼ KẾT QUẢ SO SÁNH ---
-w_real = best_pos[0:N]
-w_imag = best_pos[N:]
-w_opt = w_real + 1j * w_imag
-w_opt = w_opt.reshape(-1, 1)
-w_opt = w_opt / np.linalg.norm(w_opt)
+        optimizer = Hybrid_GWO_GA_Optimizer(
+            fitness_func=fitness_function,
+            dim=dim,
+            pop_size=pop_size,
+            max_iter=max_iter,
+            lower_bound=-1,
+            upper_bound=1,
+            mutation_rate=0.1, # Tỷ lệ đột biến
+            executor=executor,
+            verbose=verbose,
+            seed=seed,
+            polish_every=polish_every,
+            dtype=np.dtype(dtype),
+            phase_bits=phase_bits,
+            checkpoint=checkpoint,
+            checkpoint_every=checkpoint_every if checkpoint is not None else 0,
+            checkpoint_meta=checkpoint_meta
+        )
+        try:
+            best_pos, history = optimizer.optimize(resume=resume and checkpoint is not None
+                                                   and os.path.exists(checkpoint))
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        info = {'evaluations': optimizer.evaluations, 'stop_reason': optimizer.stop_reason}
 
-theta_plot = np.linspace(-90, 90, 720)
-beampattern_db = 10 * np.log10(jcas.calculate_beampattern(w_opt, theta_plot) + 1e-12)
-beampattern_norm = beampattern_db - np.max(beampattern_db)
+    metrics = fitness_function.metrics(best_pos)
+    metrics.update(wall_time=time.perf_counter() - start, **info)
+    if phase_bits > 0:
+        best_pos = fitness_function.to_position(best_pos)
+    return weights_from_position(best_pos), history, metrics
 
-plt.figure(figsize=(10, 6))
-# Vẽ kết quả Hybrid
-plt.plot(theta_plot, beampattern_norm, 'b-', linewidth=2, label='Hybrid GWO-GA')
-# Vẽ đường tham chiếu User/Target
-plt.axvline(x=USER_ANGLE, color='g', linestyle='--', label='User')
-plt.axvline(x=TARGET_ANGLE, color='r', linestyle='--', label='Target')
-# Vẽ đường giới hạn nhiễu mong muốn (Ví dụ -15dB)
-plt.axhline(y=-15, color='orange', linestyle=':', label='Desired SLL limit')
 
-plt.title(f'JCAS Beamforming with Hybrid GWO-GA (N={N})')
-plt.xlabel('Angle (deg)')
-plt.ylabel('Normalized Gain (dB)')
-plt.ylim([-50, 0])
-plt.legend()
-plt.grid(True, alpha=0.3)
-plt.savefig('jcas_hybrid_result.png', dpi=300)
-plt.show()
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tối ưu beamforming JCAS bằng Hybrid GWO-GA, ghi kết quả ra file")
+    parser.add_argument('--n', type=int, default=N, help="Số phần tử ăng-ten")
+    parser.add_argument('--user', type=float, default=USER_ANGLE, help="Góc người dùng (độ)")
+    parser.add_argument('--target', type=float, default=TARGET_ANGLE, help="Góc mục tiêu (độ)")
+    parser.add_argument('--ny', type=int, default=NY, help="> 0: mảng phẳng N x NY")
+    parser.add_argument('--user-el', type=float, default=USER_ELEVATION, help="Góc ngẩng người dùng (độ)")
+    parser.add_argument('--target-el', type=float, default=TARGET_ELEVATION, help="Góc ngẩng mục tiêu (độ)")
+    parser.add_argument('--pop-size', type=int, default=POP_SIZE)
+    parser.add_argument('--max-iter', type=int, default=MAX_ITER)
+    parser.add_argument('--workers', type=int, default=NUM_WORKERS, help="> 0: đánh giá song song")
+    parser.add_argument('--islands', type=int, default=NUM_ISLANDS, help="> 0: mô hình đảo")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--polish-every', type=int, default=POLISH_EVERY, help="> 0: tinh chỉnh gradient memetic")
+    parser.add_argument('--dtype', choices=('float64', 'float32'), default=DTYPE, help="Độ chính xác khi tối ưu")
+    parser.add_argument('--phase-bits', type=int, default=PHASE_BITS, help="> 0: chỉ điều pha b-bit")
+    parser.add_argument('--sll-tol', type=float, default=SLL_TOL, help="Quét SLL thích nghi với sai số (dB)")
+    parser.add_argument('--checkpoint', default=None, help="File checkpoint (ghi nguyên tử mỗi --checkpoint-every vòng lặp)")
+    parser.add_argument('--checkpoint-every', type=int, default=CHECKPOINT_EVERY)
+    parser.add_argument('--resume', action='store_true', help="Chạy tiếp từ --checkpoint nếu file đã có")
+    parser.add_argument('--out', default=OUTPUT, help="Tiền tố file kết quả")
+    parser.add_argument('--plot', action='store_true', help="Vẽ ảnh sau khi chạy (xem plotting.py)")
+    parser.add_argument('--show', action='store_true', help="Vẽ và hiển thị cửa sổ")
+    parser.add_argument('--quiet', action='store_true')
+    args = parser.parse_args(argv)
+    if args.checkpoint and args.islands > 0:
+        parser.error("--checkpoint chưa hỗ trợ mô hình đảo (--islands)")
+    if args.workers > 0 and args.islands > 0:
+        parser.error("--workers không dùng được với --islands (mỗi đảo đã chạy trên một process riêng)")
+    if args.resume and not args.checkpoint:
+        parser.error("--resume cần --checkpoint")
 
-# Vẽ hội tụ
-plt.figure(figsize=(8, 4))
-plt.plot(history, 'b-o', markersize=3)
-plt.title('Hybrid GWO-GA Convergence')
-plt.xlabel('Iteration')
-plt.ylabel('Fitness Score')
-plt.grid(True)
-plt.savefig('jcas_hybrid_convergence.png', dpi=300)
-plt.show()
\ No newline at end of file
+    w_opt, history, metrics = run(args.n, args.user, args.target, args.pop_size, args.max_iter,
+                                  args.workers, args.islands, args.seed, verbose=not args.quiet,
+                                  polish_every=args.polish_every, ny=args.ny, user_elevation=args.user_el,
+                                  target_elevation=args.target_el, dtype=args.dtype,
+                                  phase_bits=args.phase_bits, sll_tol=args.sll_tol, checkpoint=args.checkpoint,
+                                  checkpoint_every=args.checkpoint_every, resume=args.resume)
+
+    prefix = save_run(args.out, w_opt, history, metrics, algorithm='Hybrid GWO-GA', user_angle=args.user,
+                      target_angle=args.target, pop_size=args.pop_size, max_iter=args.max_iter,
+                      num_islands=args.islands, seed=args.seed, polish_every=args.polish_every,
+                      num_y=args.ny, user_elevation=args.user_el, target_elevation=args.target_el, dtype=args.dtype,
+                      phase_bits=args.phase_bits, sll_tol=args.sll_tol,
+                      alpha_weight=ALPHA_WEIGHT, lambda_int=LAMBDA_INT, exclusion_width=EXCLUSION_WIDTH,
+                      history_label='Fitness Score')
+    print(f"Fitness = {metrics['score']:.4f}, SLL lớn nhất = {metrics['max_sll_db']:.2f} dB, "
+          f"{metrics['wall_time']:.2f} s")
+    print(f"Đã lưu kết quả: {prefix}.npz, {prefix}.json")
+
+    if args.plot or args.show:
+        # Chỉ import matplotlib khi cần vẽ
+        from plotting import plot_run
+        for f in plot_run(prefix, show=args.show):
+            print(f"Đã lưu ảnh: {f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
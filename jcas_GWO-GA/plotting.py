@@ -0,0 +1,129 @@
+import os
+import sys
+import argparse
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from jcas_model import JCAS_System, URA_System
+from results_io import load_run
+
+# ==========================================
+# VẼ KẾT QUẢ TỪ FILE (HẬU XỬ LÝ)
+# ==========================================
+# Đọc kết quả do main.py ghi (results_io.save_run) và xuất ảnh <prefix>_beampattern.png,
+# <prefix>_convergence.png. matplotlib chỉ được import khi thực sự vẽ (backend Agg, không cần màn hình),
+# nên các lần chạy tối ưu không tốn thời gian khởi động matplotlib. Nhiều kết quả được vẽ song song:
+#     python plotting.py results/*.json --workers 4
+
+PLOT_ANGLES = np.linspace(-90, 90, 720) # Độ phân giải cao để vẽ đẹp
+PLANAR_ANGLES = np.linspace(-90, 90, 361) # Lưới góc theo trục (mỗi trục) cho búp sóng mảng phẳng
+DPI = 300
+
+
+def _pyplot(show=False):
+    """Import matplotlib.pyplot khi cần; không hiển thị cửa sổ thì dùng backend Agg"""
+    import matplotlib
+    if not show:
+        matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def _plot_planar(plt, run, label):
+    """Búp sóng mảng phẳng (chuẩn hóa 0 dB) trên lưới góc theo trục theta_x x theta_y, che vùng không nhìn thấy"""
+    config = run['config']
+    ny = config['num_y']
+    ura = URA_System(run['num_antennas'] // ny, ny, config.get('frequency', 28e9), config.get('spacing_ratio', 0.5))
+    power = ura.beampattern_grid(run['weights'], PLANAR_ANGLES, PLANAR_ANGLES)
+    power_db = 10 * np.log10(power + 1e-12)
+    power_db -= np.max(power_db)
+    power_db[~URA_System.visible_mask(PLANAR_ANGLES, PLANAR_ANGLES)] = np.nan
+    points_x, points_y = ura.axis_angles([config['user_angle'], config['target_angle']],
+                                         [config.get('user_elevation', 0.0), config.get('target_elevation', 0.0)])
+
+    fig = plt.figure(figsize=(8, 7))
+    extent = [PLANAR_ANGLES[0], PLANAR_ANGLES[-1], PLANAR_ANGLES[0], PLANAR_ANGLES[-1]]
+    plt.imshow(power_db.T, origin='lower', extent=extent, vmin=-60, vmax=0, cmap='viridis', aspect='equal')
+    plt.colorbar(label='Normalized Magnitude (dB)')
+    plt.plot(points_x[0], points_y[0], 'g+', markersize=14, label='User Direction (Comm)')
+    plt.plot(points_x[1], points_y[1], 'rx', markersize=12, label='Target Direction (Sensing)')
+    plt.title(f"JCAS Beampattern - {label} ({ura.Nx}x{ura.Ny} URA)")
+    plt.xlabel('theta_x = arcsin(cos(el) sin(az)) (Degrees)')
+    plt.ylabel('theta_y = el (Degrees)')
+    plt.legend(loc='lower right')
+    return fig
+
+
+def plot_run(path, dpi=DPI, show=False):
+    """Vẽ búp sóng (chuẩn hóa 0 dB) và đường hội tụ của một kết quả, trả về danh sách file ảnh"""
+    run = load_run(path)
+    config = run['config']
+    label = config.get('algorithm', 'Optimized')
+    user_angle, target_angle = config['user_angle'], config['target_angle']
+
+    plt = _pyplot(show)
+    files = [run['prefix'] + '_beampattern.png', run['prefix'] + '_convergence.png']
+
+    # --- HÌNH 1: ĐỒ THỊ BÚP SÓNG (BEAMPATTERN) ---
+    if config.get('num_y'):
+        fig = _plot_planar(plt, run, label)
+    else:
+        jcas = JCAS_System(run['num_antennas'], config.get('frequency', 28e9), config.get('spacing_ratio', 0.5))
+        beampattern_db = 10 * np.log10(jcas.calculate_beampattern(run['weights'], PLOT_ANGLES) + 1e-12)
+        beampattern_db_norm = beampattern_db - np.max(beampattern_db)
+
+        fig = plt.figure(figsize=(10, 6))
+        plt.plot(PLOT_ANGLES, beampattern_db_norm, linewidth=2, label=label)
+        plt.axvline(x=user_angle, color='g', linestyle='--', label='User Direction (Comm)')
+        plt.axvline(x=target_angle, color='r', linestyle='--', label='Target Direction (Sensing)')
+        plt.title(f"JCAS Beampattern - {label} (N={run['num_antennas']})")
+        plt.xlabel('Angle (Degrees)')
+        plt.ylabel('Normalized Magnitude (dB)')
+        plt.ylim([-60, 0])
+        plt.xlim([-90, 90])
+        plt.legend()
+        plt.grid(True, alpha=0.3)
+    plt.savefig(files[0], dpi=dpi)
+
+    # --- HÌNH 2: TỐC ĐỘ HỘI TỤ (CONVERGENCE) ---
+    fig2 = plt.figure(figsize=(8, 4))
+    plt.plot(run['history'], 'b-o', markersize=3)
+    plt.title(f'{label} Convergence Curve')
+    plt.xlabel('Iteration')
+    plt.ylabel(config.get('history_label', 'Fitness Value'))
+    plt.grid(True)
+    plt.savefig(files[1], dpi=dpi)
+
+    if show:
+        plt.show()
+    plt.close(fig)
+    plt.close(fig2)
+    return files
+
+
+def plot_runs(paths, workers=None, dpi=DPI):
+    """Vẽ nhiều kết quả song song trên workers process (workers=1: tuần tự), trả về danh sách file ảnh"""
+    workers = min(len(paths), workers or os.cpu_count() or 1)
+    if workers <= 1:
+        return [f for path in paths for f in plot_run(path, dpi)]
+    with ProcessPoolExecutor(workers) as executor:
+        return [f for files in executor.map(plot_run, paths, [dpi] * len(paths)) for f in files]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Vẽ ảnh từ kết quả tối ưu đã lưu (.json/.npz)")
+    parser.add_argument('paths', nargs='+', help="Tiền tố hoặc file .json của các kết quả")
+    parser.add_argument('--workers', type=int, default=None, help="Số process vẽ song song")
+    parser.add_argument('--dpi', type=int, default=DPI)
+    parser.add_argument('--show', action='store_true', help="Hiển thị cửa sổ (vẽ tuần tự)")
+    args = parser.parse_args(argv)
+    if args.show:
+        files = [f for path in args.paths for f in plot_run(path, args.dpi, show=True)]
+    else:
+        files = plot_runs(args.paths, args.workers, args.dpi)
+    for f in files:
+        print(f"Đã lưu ảnh: {f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+import time
+
+
+class StoppingCriteria:
+    """
+    Điều kiện dừng dùng chung cho các bộ tối ưu (GWO, Hybrid GWO-GA, ILS).
+    Mọi điều kiện đều tùy chọn (None = tắt); bộ tối ưu luôn dừng ở max_iter của chính nó.
+      stall_window, stall_tol: Dừng khi giá trị tốt nhất không cải thiện quá stall_tol
+                               sau stall_window vòng lặp liên tiếp
+      target: Dừng khi giá trị tốt nhất đạt ngưỡng (>= khi tìm max, <= khi tìm min)
+      deadline: Ngân sách thời gian (giây) - dừng khi vòng lặp tiếp theo (ước lượng theo thời gian
+                trung bình mỗi vòng) sẽ vượt ngân sách, để luôn trả về nghiệm tốt nhất kịp hạn
+      max_evals: Ngân sách số lần đánh giá fitness - dừng khi vòng lặp tiếp theo sẽ vượt ngân sách
+
+    Bộ tối ưu gọi start(...) trước vòng lặp, update(best, evals) sau mỗi vòng lặp;
+    update trả về lý do dừng (chuỗi) hoặc None. Lý do cuối cùng nằm ở thuộc tính reason.
+    """
+    STALL = 'stall'
+    TARGET = 'target'
+    DEADLINE = 'deadline'
+    MAX_EVALS = 'max_evals'
+    MAX_ITER = 'max_iter'
+
+    def __init__(self, stall_window=None, stall_tol=1e-6, target=None, deadline=None, max_evals=None):
+        self.stall_window = stall_window
+        self.stall_tol = stall_tol
+        self.target = target
+        self.deadline = deadline
+        self.max_evals = max_evals
+        self.start()
+
+    def start(self, maximize=True, evals=0):
+        """
+        Đặt lại bộ đếm trước một lần chạy.
+        maximize: Hướng tối ưu (GWO/Hybrid tìm max fitness, ILS tìm min lỗi)
+        evals: Số lần đánh giá đã tốn trước vòng lặp (ví dụ đánh giá quần thể ban đầu)
+        """
+        self.maximize = maximize
+        self.evals = evals
+        self.iterations = 0
+        self.best_history = []
+        self.reason = None
+        self.start_time = time.perf_counter()
+
+    def elapsed(self):
+        return time.perf_counter() - self.start_time
+
+    def _improvement(self, new, old):
+        return new - old if self.maximize else old - new
+
+    def update(self, best, evals=0):
+        """
+        Ghi nhận kết quả một vòng lặp.
+        best: Giá trị tốt nhất hiện tại, evals: Số lần đánh giá fitness mà mỗi vòng lặp tốn
+        """
+        self.iterations += 1
+        self.evals += evals
+        self.best_history.append(best)
+
+        if self.target is not None and self._improvement(best, self.target) >= 0:
+            self.reason = self.TARGET
+        elif (self.stall_window is not None and len(self.best_history) > self.stall_window and
+              self._improvement(best, self.best_history[-1 - self.stall_window]) <= self.stall_tol):
+            self.reason = self.STALL
+        elif self.max_evals is not None and self.evals + evals > self.max_evals:
+            self.reason = self.MAX_EVALS
+        elif self.deadline is not None:
+            elapsed = self.elapsed()
+            if elapsed + elapsed / self.iterations > self.deadline:
+                self.reason = self.DEADLINE
+        return self.reason
+
+    def state(self):
+        """Bộ đếm hiện tại để ghi checkpoint: evals, iterations, best_history, elapsed (giây đã chạy)"""
+        return {'evals': self.evals, 'iterations': self.iterations,
+                'best_history': list(self.best_history), 'elapsed': self.elapsed()}
+
+    def restore(self, evals, iterations, best_history, elapsed=0.0):
+        """
+        Khôi phục bộ đếm từ checkpoint (gọi sau start()) để chạy tiếp như chưa bị ngắt;
+        thời gian đã chạy trước đó vẫn tính vào deadline.
+        """
+        self.evals = evals
+        self.iterations = iterations
+        self.best_history = list(best_history)
+        self.start_time = time.perf_counter() - elapsed
+
+    def finish(self):
+        """Gọi khi vòng lặp kết thúc: nếu không điều kiện nào kích hoạt thì lý do là max_iter"""
+        if self.reason is None:
+            self.reason = self.MAX_ITER
+        return self.reason
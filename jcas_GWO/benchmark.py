@@ -0,0 +1,240 @@
+import time
+import tracemalloc
+import numpy as np
+from swarm_core import gwo_update
+from jcas_model import JCAS_System, JCASObjective, PhaseCodeObjective, sll_edge_angles
+from gwo_optimizer import GWO_Optimizer
+
+# ==========================================
+# BENCHMARK HIỆU NĂNG CÁC THÀNH PHẦN GWO
+# ==========================================
+
+POP_SIZE = 30
+REPEAT = 5
+USER_ANGLE = -15.0
+TARGET_ANGLE = 30.0
+
+
+def loop_update(positions, alpha_pos, beta_pos, delta_pos, a):
+    """Cập nhật vị trí theo cách cũ: vòng lặp đôi (pop x dim), 6 lần gọi RNG mỗi ô"""
+    positions = positions.copy()
+    pop, dim = positions.shape
+    for i in range(pop):
+        for j in range(dim):
+            X = 0.0
+            for leader in (alpha_pos, beta_pos, delta_pos):
+                r1 = np.random.random()
+                r2 = np.random.random()
+                A = 2 * a * r1 - a
+                C = 2 * r2
+                D = abs(C * leader[j] - positions[i, j])
+                X += leader[j] - A * D
+            positions[i, j] = X / 3
+    return positions
+
+
+def time_call(func, *args):
+    """Thời gian trung bình (giây) cho một lần gọi func"""
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        func(*args)
+    return (time.perf_counter() - start) / REPEAT
+
+
+def bench_position_update(antenna_sizes=(16, 64, 256, 1024)):
+    """So sánh thời gian cập nhật vị trí mỗi vòng lặp: vòng lặp Python vs vector hóa"""
+    print(f"{'N':>6} {'dim':>6} {'loop (ms)':>12} {'vector (ms)':>12} {'speedup':>9}")
+    for N in antenna_sizes:
+        dim = 2 * N
+        positions = np.random.uniform(-1, 1, (POP_SIZE, dim))
+        alpha_pos, beta_pos, delta_pos = np.random.uniform(-1, 1, (3, dim))
+        t_loop = time_call(loop_update, positions, alpha_pos, beta_pos, delta_pos, 1.0)
+        t_vec = time_call(gwo_update, positions, alpha_pos, beta_pos, delta_pos, 1.0)
+        print(f"{N:>6} {dim:>6} {t_loop * 1e3:>12.2f} {t_vec * 1e3:>12.3f} {t_loop / t_vec:>8.1f}x")
+
+
+def single_fitness(jcas, wolf_position):
+    """Hàm fitness từng con sói như trong main.py (3 lần gọi calculate_beampattern)"""
+    w = jcas.decode_population(wolf_position).reshape(-1, 1)
+    gain_comm = 10 * np.log10(jcas.calculate_beampattern(w, np.array([USER_ANGLE]))[0] + 1e-12)
+    gain_sense = 10 * np.log10(jcas.calculate_beampattern(w, np.array([TARGET_ANGLE]))[0] + 1e-12)
+    scan_angles = np.linspace(-90, 90, 181)
+    mask = np.ones(len(scan_angles), dtype=bool)
+    mask[(scan_angles > USER_ANGLE-5) & (scan_angles < USER_ANGLE+5)] = False
+    mask[(scan_angles > TARGET_ANGLE-5) & (scan_angles < TARGET_ANGLE+5)] = False
+    max_sll = 10 * np.log10(np.max(jcas.calculate_beampattern(w, scan_angles[mask])) + 1e-12)
+    return 0.5 * gain_comm + 0.5 * gain_sense - 0.5 * max_sll
+
+
+def bench_steering_cache(antenna_sizes=(16, 64, 256, 1024), calls=200):
+    """
+    Số lần gọi fitness mỗi giây khi không có / có cache ma trận lái,
+    so với JCASObjective dựng sẵn (ma trận lái ghép + bộ đệm cấp phát trước).
+    """
+    print(f"{'N':>6} {'no cache (calls/s)':>20} {'cache (calls/s)':>17} {'speedup':>9} {'hits':>7} {'misses':>7}"
+          f" {'objective (calls/s)':>21}")
+    for N in antenna_sizes:
+        position = np.random.uniform(-1, 1, 2 * N)
+        rates = []
+        for cache_size in (0, 16):
+            jcas = JCAS_System(num_antennas=N, cache_size=cache_size)
+            start = time.perf_counter()
+            for _ in range(calls):
+                single_fitness(jcas, position)
+            rates.append(calls / (time.perf_counter() - start))
+        info = jcas.cache_info()
+        objective = JCASObjective(N, USER_ANGLE, TARGET_ANGLE)
+        start = time.perf_counter()
+        for _ in range(calls):
+            objective(position)
+        rate_obj = calls / (time.perf_counter() - start)
+        print(f"{N:>6} {rates[0]:>20.0f} {rates[1]:>17.0f} {rates[1] / rates[0]:>8.1f}x {info['hits']:>7} {info['misses']:>7}"
+              f" {rate_obj:>21.0f}")
+
+
+
+def bench_fft_beampattern(antenna_sizes=(16, 64, 256, 1024), grid_sizes=(720, 8192)):
+    """
+    So sánh beampattern FFT với đường tính chính xác (exact):
+    thời gian mỗi lần gọi và sai số (lỗi tuyệt đối so với đỉnh, lỗi dB tại các điểm >= -40 dB).
+    """
+    print(f"{'N':>6} {'M':>6} {'exact (ms)':>11} {'fft (ms)':>9} {'max err/peak':>13} {'max dB err (>-40dB)':>20}")
+    for N in antenna_sizes:
+        # Tắt cache để so sánh công bằng chi phí xây ma trận lái của đường exact
+        jcas = JCAS_System(num_antennas=N, cache_size=0)
+        w = np.random.randn(N, 1) + 1j * np.random.randn(N, 1)
+        w = w / np.linalg.norm(w)
+        for M in grid_sizes:
+            theta = np.linspace(-90, 90, M)
+            exact = jcas.calculate_beampattern(w, theta)
+            approx = jcas.calculate_beampattern(w, theta, method='fft')
+            t_exact = time_call(jcas.calculate_beampattern, w, theta)
+            t_fft = time_call(jcas.calculate_beampattern, w, theta, 'fft')
+            err_peak = np.max(np.abs(exact - approx)) / np.max(exact)
+            exact_db = 10 * np.log10(exact / np.max(exact) + 1e-12)
+            approx_db = 10 * np.log10(approx / np.max(exact) + 1e-12)
+            visible = exact_db >= -40
+            err_db = np.max(np.abs(exact_db - approx_db)[visible])
+            print(f"{N:>6} {M:>6} {t_exact * 1e3:>11.3f} {t_fft * 1e3:>9.3f} {err_peak:>13.2e} {err_db:>20.3f}")
+
+def bench_precision(antenna_sizes=(64, 256, 1024), pop_sizes=(30, 300), num_angles=1801, calls=20):
+    """
+    float64 so với float32 cho JCASObjective.batch trên lưới SLL dày (num_angles góc):
+    bộ nhớ đỉnh (tracemalloc, gồm ma trận lái + bộ đệm + quần thể), thông lượng (lần đánh giá/giây)
+    và sai lệch fitness |F32 - F64| (dB) trên cùng quần thể.
+    """
+    scan_angles = np.linspace(-90, 90, num_angles)
+    print(f"{'N':>6} {'pop':>5} {'mem64 (MB)':>11} {'mem32 (MB)':>11} {'evals/s 64':>11} {'evals/s 32':>11}"
+          f" {'speedup':>8} {'max |dF| (dB)':>14}")
+    for N in antenna_sizes:
+        for pop_size in pop_sizes:
+            positions = np.random.default_rng(N + pop_size).uniform(-1, 1, (pop_size, 2 * N))
+            peaks, rates, scores = [], [], []
+            for dtype in (np.float64, np.float32):
+                tracemalloc.start()
+                objective = JCASObjective(N, USER_ANGLE, TARGET_ANGLE, scan_angles=scan_angles,
+                                          jcas=JCAS_System(N, cache_size=0), dtype=dtype)
+                P = positions.astype(dtype)
+                scores.append(objective.batch(P))
+                peaks.append(tracemalloc.get_traced_memory()[1] / 1e6)
+                tracemalloc.stop()
+                start = time.perf_counter()
+                for _ in range(calls):
+                    objective.batch(P)
+                rates.append(calls * pop_size / (time.perf_counter() - start))
+            deviation = np.max(np.abs(scores[1] - scores[0]))
+            print(f"{N:>6} {pop_size:>5} {peaks[0]:>11.1f} {peaks[1]:>11.1f} {rates[0]:>11.0f} {rates[1]:>11.0f}"
+                  f" {rates[1] / rates[0]:>7.2f}x {deviation:>14.2e}")
+
+
+def bench_precision_run(N=1024, pop_size=100, max_iter=50, seed=7):
+    """Chạy GWO đầy đủ ở float64 và float32 (cùng seed), metrics cuối của cả hai đều tính lại bằng float64"""
+    print(f"{'dtype':>8} {'time (s)':>9} {'score':>9} {'max SLL (dB)':>13}")
+    for dtype in (np.float64, np.float32):
+        objective = JCASObjective(N, USER_ANGLE, TARGET_ANGLE, dtype=dtype)
+        optimizer = GWO_Optimizer(objective, 2 * N, pop_size, max_iter, verbose=False, seed=seed, dtype=dtype)
+        start = time.perf_counter()
+        best_position, _ = optimizer.optimize()
+        elapsed = time.perf_counter() - start
+        metrics = objective.metrics(best_position)
+        print(f"{np.dtype(dtype).name:>8} {elapsed:>9.2f} {metrics['score']:>9.4f} {metrics['max_sll_db']:>13.2f}")
+
+def bench_phase_codes(antenna_sizes=(64, 256, 1024), pop_size=300, bits=3, calls=20):
+    """
+    Chế độ pha b-bit (PhaseCodeObjective: gather bảng phasor + nhân ma trận lái) so với vị trí thực 2N:
+    kích thước quần thể (byte) và thông lượng đánh giá (lần/giây).
+    """
+    print(f"{'N':>6} {'pos (KB)':>9} {'codes (KB)':>11} {'evals/s pos':>12} {'evals/s codes':>14} {'speedup':>8}")
+    for N in antenna_sizes:
+        objective = JCASObjective(N, USER_ANGLE, TARGET_ANGLE)
+        coded = PhaseCodeObjective(objective, bits)
+        rng = np.random.default_rng(N)
+        codes = rng.integers(0, coded.levels, (pop_size, N), dtype=np.uint8)
+        positions = rng.uniform(-1, 1, (pop_size, 2 * N))
+        rates = []
+        for func, population in ((objective, positions), (coded, codes)):
+            func.batch(population)
+            start = time.perf_counter()
+            for _ in range(calls):
+                func.batch(population)
+            rates.append(calls * pop_size / (time.perf_counter() - start))
+        print(f"{N:>6} {positions.nbytes / 1e3:>9.0f} {codes.nbytes / 1e3:>11.0f} {rates[0]:>12.0f} {rates[1]:>14.0f}"
+              f" {rates[1] / rates[0]:>7.2f}x")
+
+def dense_sll_db(objective, positions, oversample=32, block=4096):
+    """SLL lớn nhất (dB) 'thật' trên lưới rất dày đều theo sin(theta) (oversample * N điểm, gồm mép vùng loại trừ)"""
+    jcas = JCAS_System(objective.N, cache_size=0)
+    angles = sll_edge_angles(np.rad2deg(np.arcsin(np.linspace(-1, 1, oversample * objective.N + 1))),
+                             [objective.user_angle, objective.target_angle], objective.exclusion_width)
+    keep = ~((np.abs(angles - objective.user_angle) < objective.exclusion_width)
+             | (np.abs(angles - objective.target_angle) < objective.exclusion_width))
+    angles = angles[keep]
+    w_conj = positions[:, :objective.N] - 1j * positions[:, objective.N:]
+    peak = np.zeros(len(positions))
+    for start in range(0, len(angles), block):
+        af = np.matmul(w_conj, jcas.steering_vector(angles[start:start + block]))
+        peak = np.maximum(peak, np.max(af.real**2 + af.imag**2, axis=1))
+    return 10 * np.log10(peak / np.einsum('ij,ij->i', positions, positions) + 1e-12)
+
+
+def bench_adaptive_sll(antenna_sizes=(16, 64, 256, 1024), tol=0.1, pop_size=30, calls=10):
+    """
+    Quét SLL thích nghi (sll_tol=tol) so với lưới cố định 1 độ (mặc định) và lưới đều cố định đủ dày để đạt
+    cùng sai số tol: số điểm góc mỗi lần đánh giá, thông lượng (lần/giây) và sai số max_SLL lớn nhất (dB)
+    so với lưới rất dày (dense_sll_db) trên cùng quần thể ngẫu nhiên.
+    """
+    print(f"{'N':>6} {'grid':>9} {'points':>7} {'evals/s':>9} {'max err (dB)':>13}")
+    for N in antenna_sizes:
+        positions = np.random.default_rng(N).uniform(-1, 1, (pop_size, 2 * N))
+        truth = dense_sll_db(JCASObjective(N, USER_ANGLE, TARGET_ANGLE), positions)
+        # Lưới cố định bước 2 * du (du: bước cuối của leo đồi ứng với tol, xem sll_refine_steps), gồm mép vùng loại trừ
+        fine = np.sqrt(tol * np.log(10) / 10) / (np.pi * 0.5 * N)
+        dense = sll_edge_angles(np.rad2deg(np.arcsin(np.linspace(-1, 1, int(np.ceil(1 / fine)) + 1))),
+                                [USER_ANGLE, TARGET_ANGLE], 5.0)
+        objectives = (('1 deg', JCASObjective(N, USER_ANGLE, TARGET_ANGLE)),
+                      ('dense', JCASObjective(N, USER_ANGLE, TARGET_ANGLE, scan_angles=dense)),
+                      ('adaptive', JCASObjective(N, USER_ANGLE, TARGET_ANGLE, sll_tol=tol)))
+        for name, objective in objectives:
+            error = np.max(truth - [objective.metrics(p)['max_sll_db'] for p in positions])
+            objective.batch(positions)
+            start = time.perf_counter()
+            for _ in range(calls):
+                objective.batch(positions)
+            rate = calls * pop_size / (time.perf_counter() - start)
+            print(f"{N:>6} {name:>9} {objective.sll_points:>7} {rate:>9.0f} {error:>13.3f}")
+
+if __name__ == "__main__":
+    print("Benchmark cập nhật vị trí GWO (mỗi vòng lặp, pop=%d)" % POP_SIZE)
+    bench_position_update()
+    print("\nBenchmark cache ma trận lái (fitness từng con sói)")
+    bench_steering_cache()
+    print("\nBenchmark beampattern FFT so với exact")
+    bench_fft_beampattern()
+    print("\nBenchmark độ chính xác float64 / float32 (JCASObjective.batch, lưới SLL dày)")
+    bench_precision()
+    print("\nGWO đầy đủ float64 / float32 (metrics tính lại bằng float64)")
+    bench_precision_run()
+    print("\nBenchmark chế độ pha 3-bit (mã uint8) so với vị trí thực")
+    bench_phase_codes()
+    print("\nBenchmark quét SLL thích nghi (sll_tol=0.1 dB) so với lưới cố định")
+    bench_adaptive_sll()
@@ -1,40 +1,89 @@
 import numpy as np
+from swarm_core import gwo_update, gwo_update_codes, gradient_polish, evaluate_population, as_evaluator, as_generator, phase_levels, random_codes
+from stopping import StoppingCriteria
+from instrumentation import NULL_PROBE
 
 class GWO_Optimizer:
-    def __init__(self, fitness_func, dim, pop_size=30, max_iter=100, lower_bound=-1, upper_bound=1):
+    def __init__(self, fitness_func, dim, pop_size=30, max_iter=100, lower_bound=-1, upper_bound=1, executor=None, verbose=True, stopping=None, seed=None, probe=None,
+                 polish_every=0, polish_top=1, polish_steps=5, dtype=np.float64, phase_bits=0):
         self.fitness_func = fitness_func
         self.dim = dim # Số chiều bài toán (2*N)
         self.pop_size = pop_size
         self.max_iter = max_iter
         self.lb = lower_bound
         self.ub = upper_bound
+        # Pool đánh giá song song (None = tuần tự), xem swarm_core.ParallelEvaluator
+        self.executor = as_evaluator(executor)
+        self.verbose = verbose
+        # Điều kiện dừng sớm (stall / target / deadline / ngân sách đánh giá), xem stopping.StoppingCriteria
+        self.stopping = stopping if stopping is not None else StoppingCriteria()
+        # Bộ sinh số ngẫu nhiên riêng (seed: None, số nguyên, SeedSequence hoặc np.random.Generator)
+        self.rng = as_generator(seed)
+        # Đo đạc theo pha / sự kiện vòng lặp (instrumentation.Profiler), mặc định tắt
+        self.probe = probe if probe is not None else NULL_PROBE
+        # Giai đoạn memetic: cứ polish_every vòng lặp, tinh chỉnh polish_top con đầu đàn (1-3: Alpha, Beta, Delta)
+        # bằng polish_steps bước gradient trên hàm mục tiêu trơn (cần fitness_func.surrogate_grad); 0 = tắt
+        if polish_every > 0 and not hasattr(fitness_func, 'surrogate_grad'):
+            raise ValueError("polish_every > 0 cần fitness_func có surrogate_grad")
+        self.polish_every = polish_every
+        self.polish_top = min(max(polish_top, 1), 3)
+        self.polish_steps = polish_steps
+        # Kiểu dữ liệu của quần thể: float32 giảm một nửa bộ nhớ / băng thông (dùng cùng JCASObjective(dtype=np.float32))
+        self.dtype = np.dtype(dtype)
+        # Chế độ pha b-bit: phase_bits > 0 - mỗi con sói là vector mã pha (dim = N) uint8,
+        # fitness_func nhận mã pha (jcas_model.PhaseCodeObjective); lower_bound / upper_bound bị bỏ qua
+        self.phase_bits = phase_bits
+        if phase_bits > 0:
+            if polish_every > 0:
+                raise ValueError("polish_every > 0 không dùng được với phase_bits > 0 (mã pha rời rạc)")
+            self.levels = phase_levels(phase_bits)
+            self.dtype = np.dtype(np.uint8)
 
-    def optimize(self):
+    def optimize(self, initial_positions=None, target_fitness=None):
+        """
+        initial_positions: Ma trận (k, dim), k <= pop_size - khởi tạo nóng (warm start) k con sói đầu,
+                           phần còn lại vẫn khởi tạo ngẫu nhiên
+        target_fitness: Dừng sớm khi Alpha đạt ngưỡng fitness này
+        Sau khi chạy: stop_reason (lý do dừng), evaluations (số lần đánh giá fitness)
+        """
         # 1. Khởi tạo quần thể sói (Positions)
         # Mỗi hàng là một con sói
-        positions = np.random.uniform(self.lb, self.ub, (self.pop_size, self.dim))
+        if self.phase_bits > 0:
+            positions = random_codes(self.rng, (self.pop_size, self.dim), self.levels)
+        else:
+            positions = self.rng.uniform(self.lb, self.ub, (self.pop_size, self.dim)).astype(self.dtype, copy=False)
+        if initial_positions is not None:
+            initial_positions = np.atleast_2d(initial_positions)[:self.pop_size]
+            positions[:len(initial_positions)] = initial_positions
         
         # Khởi tạo Alpha, Beta, Delta
-        alpha_pos = np.zeros(self.dim)
+        alpha_pos = np.zeros(self.dim, dtype=self.dtype)
         alpha_score = -float('inf') # Chúng ta đang tìm Maximize Fitness
         
-        beta_pos = np.zeros(self.dim)
+        beta_pos = np.zeros(self.dim, dtype=self.dtype)
         beta_score = -float('inf')
         
-        delta_pos = np.zeros(self.dim)
+        delta_pos = np.zeros(self.dim, dtype=self.dtype)
         delta_score = -float('inf')
         
         history = [] # Lưu lịch sử hội tụ
+        stopping = self.stopping
+        stopping.start(maximize=True)
+        probe = self.probe
+        probe.begin('GWO', pop_size=self.pop_size, dim=self.dim, max_iter=self.max_iter)
 
         # Vòng lặp chính
         for l in range(0, self.max_iter):
             # Tính a giảm dần từ 2 xuống 0
             a = 2 - l * ((2) / self.max_iter) 
+            probe.iteration_start(l)
             
-            # Đánh giá fitness cho từng con sói
+            # Đánh giá fitness cho cả bầy (dùng hàm batch nếu có)
+            scores = evaluate_population(self.fitness_func, positions, self.executor)
+            probe.mark('fitness')
+            probe.count('evaluations', self.pop_size)
             for i in range(self.pop_size):
-                # Tính hàm mục tiêu
-                fitness = self.fitness_func(positions[i, :])
+                fitness = scores[i]
                 
                 # Cập nhật Alpha, Beta, Delta (Tìm MAX)
                 if fitness > alpha_score:
@@ -52,40 +101,45 @@ class GWO_Optimizer:
                 elif fitness > delta_score:
                     delta_score = fitness
                     delta_pos = positions[i, :].copy()
+            probe.mark('leaders')
+            
+            evals = self.pop_size
+            if self.polish_every > 0 and (l + 1) % self.polish_every == 0:
+                k = self.polish_top
+                leaders, leader_scores, polish_evals = gradient_polish(
+                    self.fitness_func, np.array([alpha_pos, beta_pos, delta_pos][:k]),
+                    [alpha_score, beta_score, delta_score][:k], self.polish_steps, self.lb, self.ub)
+                # Thứ tự Alpha/Beta/Delta có thể đổi sau khi tinh chỉnh
+                ranked = sorted(zip(leader_scores, range(k)), reverse=True)
+                pool = [(s, leaders[i]) for s, i in ranked] + [(beta_score, beta_pos), (delta_score, delta_pos)][k - 1:]
+                (alpha_score, alpha_pos), (beta_score, beta_pos), (delta_score, delta_pos) = pool[:3]
+                evals += polish_evals
+                probe.mark('polish')
+                probe.count('evaluations', polish_evals)
             
             history.append(alpha_score)
+            stopping.update(alpha_score, evals)
+            if target_fitness is not None and alpha_score >= target_fitness:
+                stopping.reason = StoppingCriteria.TARGET
+            if stopping.reason is not None:
+                probe.iteration_end(l, alpha_score)
+                break
             
-            # Cập nhật vị trí các con sói (Bao vây con mồi)
-            for i in range(self.pop_size):
-                for j in range(self.dim):
-                    r1 = np.random.random()
-                    r2 = np.random.random()
-                    
-                    # Tính toán dựa trên Alpha
-                    A1 = 2 * a * r1 - a
-                    C1 = 2 * r2
-                    D_alpha = abs(C1 * alpha_pos[j] - positions[i, j])
-                    X1 = alpha_pos[j] - A1 * D_alpha
-                    
-                    # Tính toán dựa trên Beta
-                    r1 = np.random.random()
-                    r2 = np.random.random()
-                    A2 = 2 * a * r1 - a
-                    C2 = 2 * r2
-                    D_beta = abs(C2 * beta_pos[j] - positions[i, j])
-                    X2 = beta_pos[j] - A2 * D_beta
-                    
-                    # Tính toán dựa trên Delta
-                    r1 = np.random.random()
-                    r2 = np.random.random()
-                    A3 = 2 * a * r1 - a
-                    C3 = 2 * r2
-                    D_delta = abs(C3 * delta_pos[j] - positions[i, j])
-                    X3 = delta_pos[j] - A3 * D_delta
-                    
-                    # Cập nhật vị trí mới: trung bình cộng
-                    positions[i, j] = (X1 + X2 + X3) / 3
+            # Cập nhật vị trí các con sói (Bao vây con mồi) - vector hóa toàn quần thể
+            if self.phase_bits > 0:
+                positions = gwo_update_codes(positions, alpha_pos, beta_pos, delta_pos, a, self.levels, self.rng)
+            else:
+                positions = gwo_update(positions, alpha_pos, beta_pos, delta_pos, a, self.rng)
+            probe.mark('update')
+            probe.iteration_end(l, alpha_score)
             
-            print(f"Iteration {l+1}/{self.max_iter}, Best Fitness: {alpha_score:.4f}")
+            # In mỗi 10 vòng lặp: in mọi vòng làm chậm đáng kể vòng lặp ngắn (dùng probe để theo dõi chi tiết)
+            if self.verbose and (l + 1) % 10 == 0:
+                print(f"Iteration {l+1}/{self.max_iter}, Best Fitness: {alpha_score:.4f}")
 
+        self.stop_reason = stopping.finish()
+        self.evaluations = stopping.evals
+        probe.end(stop_reason=self.stop_reason, best=float(alpha_score))
+        if self.verbose:
+            print(f"Dừng sau {len(history)} vòng lặp ({self.stop_reason}), {self.evaluations} lần đánh giá fitness")
         return alpha_pos, history
\ No newline at end of file
@@ -1,13 +1,28 @@
+import threading
 import numpy as np
+from collections import OrderedDict
 
 class JCAS_System:
-    def __init__(self, num_antennas, frequency=28e9, spacing_ratio=0.5):
+    def __init__(self, num_antennas, frequency=28e9, spacing_ratio=0.5, cache_size=16, dtype=np.complex128):
         self.N = num_antennas
         self.fc = frequency
         self.lam = 3e8 / frequency
         self.d = spacing_ratio * self.lam  # Khoảng cách d = lambda/2
+        
+        # Bộ nhớ đệm LRU cho ma trận lái: các lưới góc (User, Target, lưới quét SLL, lưới vẽ)
+        # không đổi trong suốt một lần chạy nên chỉ cần tính exp(...) một lần.
+        # cache_size = 0 để tắt cache.
+        self.cache_size = cache_size
+        self._sv_cache = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # Probe đo đạc (instrumentation.Profiler.attach), None = tắt
+        self.probe = None
+        # Kiểu dữ liệu mặc định của ma trận lái: complex64 giảm một nửa bộ nhớ / băng thông
+        # (pha vẫn tính bằng float64 rồi mới ép kiểu)
+        self.dtype = np.dtype(dtype)
 
-    def steering_vector(self, theta_deg):
+    def _build_steering_vector(self, theta_deg, dtype=None):
         """
         Tạo vector lái (Steering Vector) cho mảng ULA.
         Tương ứng với file generateSteeringVector.m
@@ -19,14 +34,63 @@ class JCAS_System:
         # a(theta) = exp(j * k * d * n * sin(theta))
         # Lưu ý: Code gốc của bạn dùng positive phase trong generateSteeringVector.m
         sv = np.exp(1j * k * self.d * n * np.sin(theta_rad))
+        if self.probe is not None:
+            self.probe.count('steering_builds')
+        return sv.astype(self.dtype if dtype is None else dtype, copy=False)
+
+    def steering_vector(self, theta_deg, dtype=None):
+        """
+        Trả về ma trận lái (N, số lượng góc), lấy từ cache nếu lưới góc đã được tính.
+        Mảng trả về từ cache là read-only để nơi gọi không thể làm hỏng cache.
+        dtype: complex64 / complex128 (mặc định self.dtype)
+        """
+        theta_deg = np.atleast_1d(np.asarray(theta_deg, dtype=float))
+        dtype = self.dtype if dtype is None else np.dtype(dtype)
+        if self.cache_size <= 0:
+            return self._build_steering_vector(theta_deg, dtype)
+        
+        # Khóa cache: lưới góc + số phần tử + khoảng cách phần tử + kiểu dữ liệu
+        key = (self.N, self.d, self.lam, dtype.str, theta_deg.shape, theta_deg.tobytes())
+        sv = self._sv_cache.get(key)
+        if sv is not None:
+            self.cache_hits += 1
+            self._sv_cache.move_to_end(key)
+            return sv
+        
+        self.cache_misses += 1
+        sv = self._build_steering_vector(theta_deg, dtype)
+        sv.setflags(write=False)
+        self._sv_cache[key] = sv
+        # Loại bỏ lưới góc ít được dùng gần đây nhất khi vượt quá kích thước
+        if len(self._sv_cache) > self.cache_size:
+            self._sv_cache.popitem(last=False)
         return sv
 
-    def calculate_beampattern(self, weights, theta_range):
+    def cache_info(self):
+        """Thống kê cache ma trận lái: số lần trúng/trượt và kích thước hiện tại"""
+        return {'hits': self.cache_hits, 'misses': self.cache_misses,
+                'size': len(self._sv_cache), 'maxsize': self.cache_size}
+
+    def clear_cache(self):
+        """Xóa cache ma trận lái và đặt lại bộ đếm"""
+        self._sv_cache.clear()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def calculate_beampattern(self, weights, theta_range, method='exact', n_fft=None):
         """
         Tính toán đồ thị bức xạ (Beampattern)
         weights: Vector trọng số w (complex)
         theta_range: Dải góc cần quét
+        method: 'exact' - nhân ma trận với ma trận lái, O(N*M)
+                'fft'   - FFT zero-padding trên lưới sin(theta) rồi nội suy, O(L log L)
+        n_fft: Số điểm FFT cho method='fft' (mặc định xem fft_size)
         """
+        if method == 'fft':
+            return self.beampattern_fft(np.reshape(weights, -1), theta_range, n_fft=n_fft)
+        if method != 'exact':
+            raise ValueError(f"method phải là 'exact' hoặc 'fft', nhận được {method!r}")
+        
         # Đảm bảo dimensions khớp nhau để nhân ma trận
         # a_matrix shape: (N, số lượng góc)
         a_matrix = self.steering_vector(theta_range)
@@ -37,4 +101,782 @@ class JCAS_System:
         
         # Power Gain (Magnitude squared)
         power_gain = np.abs(af)**2
-        return power_gain.flatten()
\ No newline at end of file
+        return power_gain.flatten()
+
+    def fft_size(self, oversample=64):
+        """Số điểm FFT mặc định: lũy thừa của 2 >= oversample * N (tối thiểu 1024)"""
+        return int(2 ** np.ceil(np.log2(max(oversample * self.N, 1024))))
+
+    def array_factor_fft(self, weights, n_fft=None):
+        """
+        Array Factor trên lưới đều của psi = (d/lambda) * sin(theta), psi_m = m / n_fft (m = 0..n_fft-1).
+        Với ULA cách đều: AF(psi) = sum_n conj(w_n) * exp(j*2*pi*n*psi) = n_fft * IFFT(conj(w)) (zero-padding).
+        weights: Vector (N,) hoặc ma trận (pop, N)
+        Trả về mảng phức (..., n_fft).
+        """
+        if n_fft is None:
+            n_fft = self.fft_size()
+        return np.fft.ifft(np.conj(weights), n=n_fft, axis=-1) * n_fft
+
+    def beampattern_fft(self, weights, theta_range=None, n_fft=None):
+        """
+        Beampattern tính bằng FFT.
+        theta_range = None: trả về (u, power) trên lưới sin-space u = sin(theta) thuộc [-1, 1] (tăng dần).
+        Ngược lại: nội suy tuyến tính AF phức từ lưới FFT về các góc yêu cầu, trả về power (..., số góc).
+        """
+        if n_fft is None:
+            n_fft = self.fft_size()
+        af = self.array_factor_fft(weights, n_fft)
+        spacing = self.d / self.lam  # d/lambda
+        
+        if theta_range is None:
+            # Sắp xếp lại lưới psi về [-0.5, 0.5) rồi đổi sang u = sin(theta), chỉ giữ vùng nhìn thấy |u| <= 1
+            psi = np.fft.fftshift(np.fft.fftfreq(n_fft))
+            u = psi / spacing
+            visible = np.abs(u) <= 1
+            af = np.fft.fftshift(af, axes=-1)[..., visible]
+            return u[visible], af.real**2 + af.imag**2
+        
+        # Vị trí (thực) của từng góc trên lưới FFT, tuần hoàn theo chu kỳ n_fft
+        theta_rad = np.deg2rad(np.atleast_1d(np.asarray(theta_range, dtype=float)))
+        pos = np.mod(spacing * np.sin(theta_rad), 1.0) * n_fft
+        i0 = np.floor(pos).astype(int) % n_fft
+        i1 = (i0 + 1) % n_fft
+        frac = pos - np.floor(pos)
+        af_interp = (1 - frac) * af[..., i0] + frac * af[..., i1]
+        return af_interp.real**2 + af_interp.imag**2
+
+    def decode_population(self, positions):
+        """
+        Giải mã quần thể sói (pop, 2N) thành ma trận trọng số phức (pop, N).
+        Nửa đầu mỗi hàng là phần thực, nửa sau là phần ảo; mỗi hàng được chuẩn hóa công suất.
+        """
+        positions = np.atleast_2d(positions)
+        w = positions[:, :self.N] + 1j * positions[:, self.N:]
+        return w / np.linalg.norm(w, axis=1, keepdims=True)
+
+    def resteer_weights(self, weights, old_angles, new_angles):
+        """
+        Lái lại (re-steer) vector trọng số khi các hướng búp chính dịch chuyển (chế độ tracking).
+        w được tách thành thành phần trên các vector lái cũ a(theta_old) và phần dư:
+            w = sum_k c_k * a(theta_old_k) + r
+        rồi thay a(theta_old_k) bằng a(theta_new_k), giữ nguyên phần dư r (định hình búp sóng phụ).
+        old_angles, new_angles: Danh sách góc (độ) cùng thứ tự, ví dụ (User, Target)
+        """
+        w = np.reshape(weights, -1)
+        a_old = self.steering_vector(old_angles)
+        a_new = self.steering_vector(new_angles)
+        coeffs, _, _, _ = np.linalg.lstsq(a_old, w, rcond=None)
+        return w + np.matmul(a_new - a_old, coeffs)
+
+
+# Độ sắc của log-sum-exp thay cho max_SLL trong surrogate_grad (1/dB): sai lệch so với max <= log(M)/SLL_SHARPNESS dB
+SLL_SHARPNESS = 2.0
+
+# Quét SLL thích nghi (sll_tol): số điểm lưới thô trên mỗi khoảng búp phụ, số đỉnh thô được tinh chỉnh
+# và số vòng chia đôi bước tối đa
+SLL_OVERSAMPLE = 2
+SLL_CANDIDATES = 8
+SLL_MAX_ROUNDS = 12
+# Sai số làm tròn (độ) cho phép khi kiểm tra điểm tinh chỉnh nằm trên mép vùng loại trừ (sin -> arcsin)
+SLL_EDGE_SLACK = 1e-9
+
+
+def sll_coarse_angles(num_antennas, spacing_ratio=0.5, oversample=SLL_OVERSAMPLE):
+    """Lưới quét thô (độ) đều theo u = sin(theta): oversample điểm trên mỗi khoảng búp phụ lam / (N*d)"""
+    count = int(np.ceil(2 * oversample * spacing_ratio * num_antennas)) + 1
+    return np.rad2deg(np.arcsin(np.linspace(-1, 1, count)))
+
+
+def sll_edge_angles(scan_angles, points, exclusion_width):
+    """
+    Thêm các mép vùng loại trừ points +- exclusion_width vào lưới quét (sắp xếp tăng dần):
+    SLL lớn nhất thường nằm ngay mép vùng búp chính, lưới thô có thể bỏ sót.
+    """
+    edges = np.concatenate([np.asarray(points, dtype=float) - exclusion_width,
+                            np.asarray(points, dtype=float) + exclusion_width])
+    edges = edges[(edges >= -90) & (edges <= 90)]
+    return np.unique(np.concatenate((scan_angles, edges)))
+
+
+def sll_refine_steps(coarse_step, tol_db, num_antennas, spacing_ratio=0.5):
+    """
+    Dãy bước leo đồi theo u = sin(theta): bắt đầu từ coarse_step / 2, chia đôi đến khi không lớn hơn
+    bước du mà đỉnh búp phụ lấy mẫu lệch du chỉ thấp hơn đỉnh thật tối đa tol_db dB.
+    Búp phụ của mảng N phần tử rộng cỡ lam / (N*d) theo u; gần đỉnh |AF|^2 giảm cỡ
+    (10/ln10) * (pi*d/lam * N * du)^2 dB, nên du = sqrt(tol_db * ln10 / 10) / (pi * d/lam * N).
+    """
+    fine = np.sqrt(tol_db * np.log(10) / 10) / (np.pi * spacing_ratio * num_antennas)
+    step = coarse_step / 2
+    rounds = 1 + max(0, int(np.ceil(np.log2(step / fine))))
+    return step * 0.5 ** np.arange(min(rounds, SLL_MAX_ROUNDS))
+
+
+def climb_moves(dim):
+    """Các hướng thử của một vòng leo đồi: {-1, 0, 1}^dim bỏ điểm gốc, (3^dim - 1, dim)"""
+    moves = np.stack(np.meshgrid(*[[-1.0, 0.0, 1.0]] * dim, indexing='ij'), axis=-1).reshape(-1, dim)
+    return moves[np.any(moves != 0, axis=1)]
+
+
+def climb_step(value, start, power, moves, h):
+    """
+    Một vòng leo đồi: với mỗi đỉnh chọn hướng thử tốt nhất (value (pop, K, T) tại start + moves * h),
+    chỉ dịch tới đó nếu công suất lớn hơn power (pop, K). Trả về (start, power, chỉ số hướng chọn, mặt nạ đã dịch).
+    """
+    best = np.argmax(value, axis=2)
+    best_value = np.max(value, axis=2)
+    better = best_value > power
+    start = np.where(better[..., np.newaxis], start + moves[best] * h, start)
+    return start, np.where(better, best_value, power), best, better
+
+
+def refine_peaks(power_fn, valid_fn, start, power, steps):
+    """
+    Tinh chỉnh các đỉnh búp phụ tìm được trên lưới thô bằng leo đồi chia đôi bước: mỗi vòng thử
+    3^D - 1 điểm lân cận start + h * {-1, 0, 1}^D (cả đường chéo để mọi trục cùng dịch được trong một vòng),
+    giữ điểm có công suất lớn nhất, rồi sang bước kế tiếp.
+    power_fn(points (pop, P, D)) -> công suất (pop, P); valid_fn(points) -> mặt nạ điểm thuộc vùng SLL.
+    start (pop, K, D), power (pop, K): tọa độ và công suất các đỉnh thô.
+    Trả về công suất lớn nhất tìm được (pop,) - chỉ gồm các điểm đã tính thật, không nội suy.
+    (JCASObjective / URAObjective dùng cùng vòng lặp nhưng tính AF bằng phép dịch pha, xem _refine_sll.)
+    """
+    pop, K, D = start.shape
+    moves = climb_moves(D)
+    for h in steps:
+        trial = start[:, :, np.newaxis, :] + moves * h  # (pop, K, 3^D - 1, D)
+        value = power_fn(trial.reshape(pop, -1, D)).reshape(pop, K, len(moves))
+        value[~valid_fn(trial)] = -np.inf
+        start, power = climb_step(value, start, power, moves, h)[:2]
+    return np.max(power, axis=1)
+
+
+class JCASObjective:
+    """
+    Hàm mục tiêu JCAS dựng sẵn một lần (thay cho fitness_function viết tay trong các main.py):
+        F = alpha * Gain_Comm(dB) + (1 - alpha) * Gain_Sensing(dB) - lambda * max_SLL(dB)
+    
+    * Một ma trận lái ghép duy nhất A (N, M): cột 0 = User, cột 1 = Target, còn lại = vùng búp sóng phụ
+      (lưới quét trừ đi vùng +-exclusion_width độ quanh User và Target).
+    * Mọi bộ đệm trung gian được cấp phát trước (theo kích thước quần thể, riêng cho từng thread),
+      mỗi lần gọi chỉ cấp phát vector điểm trả về.
+    * Dùng được như fitness_func cho mọi optimizer: obj(position) cho một con sói,
+      obj.batch(P) cho cả quần thể.
+    * Pickle được (dùng làm fitness_factory cho ParallelEvaluator / Island model).
+    * dtype=np.float32: vị trí, ma trận lái (complex64), AF và bộ đệm đều ở độ chính xác đơn
+      (một nửa bộ nhớ / băng thông); metrics() luôn tính lại bằng float64.
+    * sll_tol (dB): quét SLL thích nghi thô -> mịn. Lưới thô đều theo sin(theta) (sll_coarse_angles,
+      khoảng 2 điểm mỗi búp phụ, thay cho lưới 1 độ) chỉ để tìm các đỉnh; sll_candidates đỉnh thô lớn nhất
+      được tinh chỉnh bằng leo đồi chia đôi bước (refine_peaks) đến khi sai số đỉnh <= sll_tol dB.
+      Mỗi lần đánh giá một con sói tốn đúng sll_points điểm góc; tổng số điểm đã tính cộng dồn
+      trong sll_evaluations (và probe.count('sll_points')).
+    """
+    def __init__(self, num_antennas, user_angle, target_angle, exclusion_width=5.0,
+                 alpha_weight=0.5, lambda_int=0.5, scan_angles=None, jcas=None, dtype=np.float64,
+                 sll_tol=None, sll_candidates=SLL_CANDIDATES):
+        self.N = num_antennas
+        self.user_angle = user_angle
+        self.target_angle = target_angle
+        self.exclusion_width = exclusion_width
+        self.alpha_weight = alpha_weight
+        self.lambda_int = lambda_int
+        self.jcas = jcas if jcas is not None else JCAS_System(num_antennas=num_antennas)
+        self.dtype = np.dtype(dtype)
+        self.complex_dtype = np.result_type(self.dtype, np.complex64)
+        
+        self.sll_tol = sll_tol
+        spacing = self.jcas.d / self.jcas.lam
+        
+        # Lưới quét búp sóng phụ: bỏ vùng búp chính quanh User và Target
+        if scan_angles is None:
+            scan_angles = np.linspace(-90, 90, 181) if sll_tol is None else sll_coarse_angles(self.N, spacing)
+        scan_angles = np.asarray(scan_angles, dtype=float)
+        if sll_tol is not None:
+            scan_angles = sll_edge_angles(scan_angles, [user_angle, target_angle], exclusion_width)
+        mask = np.ones(len(scan_angles), dtype=bool)
+        mask[(scan_angles > user_angle - exclusion_width) & (scan_angles < user_angle + exclusion_width)] = False
+        mask[(scan_angles > target_angle - exclusion_width) & (scan_angles < target_angle + exclusion_width)] = False
+        self.sidelobe_angles = scan_angles[mask]
+        self.sll_points = len(self.sidelobe_angles)
+        self.sll_evaluations = 0
+        
+        self.eval_angles = np.concatenate(([user_angle, target_angle], self.sidelobe_angles))
+        self.A = self.jcas.steering_vector(self.eval_angles, self.complex_dtype)
+        # AF chưa chuẩn hóa tuyến tính theo vector vị trí thực 2N: AF = P @ gene_basis (dùng cho surrogate_grad)
+        self.gene_basis = np.vstack((self.A, -1j * self.A))
+        # Hệ số tổ hợp [Gain_Comm, Gain_Sensing, max_SLL] (đều tính bằng dB)
+        self._coeffs = np.array([alpha_weight, 1 - alpha_weight, -lambda_int])
+        self._local = threading.local()
+        
+        if sll_tol is not None:
+            # Tọa độ u của lưới thô, cờ "điểm SLL liền kề điểm trước trên lưới quét" (không cách vùng loại trừ)
+            scan_u = np.sin(np.deg2rad(scan_angles))
+            self._sll_u = scan_u[mask]
+            self._sll_adjacent = np.diff(np.flatnonzero(mask)) == 1
+            self._sll_phase = 2 * np.pi * spacing * np.arange(self.N)
+            self._sll_steps = sll_refine_steps(np.max(np.diff(scan_u)), sll_tol, self.N, spacing)
+            self._sll_candidates = min(sll_candidates, self.sll_points)
+            self.sll_points += self._sll_candidates * 2 * len(self._sll_steps)
+            # Vùng loại trừ theo u (sin đồng biến trên [-90, 90] độ): khoảng mở (lo, hi) quanh User, Target
+            width = exclusion_width - SLL_EDGE_SLACK
+            centers = np.array([user_angle, target_angle])
+            self._sll_excluded = np.sin(np.deg2rad(np.clip(np.stack((centers - width, centers + width)), -90, 90)))
+            self._sll_shifts = {}
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_local']  # Bộ đệm theo thread không cần (và không thể) pickle
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    def _buffers(self, pop):
+        """Bộ đệm cho quần thể kích thước pop, cấp phát một lần cho mỗi thread"""
+        cache = getattr(self._local, 'buffers', None)
+        if cache is None:
+            cache = self._local.buffers = {}
+        buf = cache.get(pop)
+        if buf is None:
+            M = len(self.eval_angles)
+            buf = cache[pop] = {
+                'w': np.empty((pop, self.N), dtype=self.complex_dtype),
+                'af': np.empty((pop, M), dtype=self.complex_dtype),
+                'gains': np.empty((pop, M), dtype=self.dtype),
+                'tmp': np.empty((pop, M), dtype=self.dtype),
+                'norm_sq': np.empty(pop, dtype=self.dtype),
+                'terms': np.empty((pop, 3), dtype=self.dtype),
+            }
+        return buf
+
+    def _terms_db(self, af, norm_sq, buf, w_conj):
+        """
+        [Gain_Comm, Gain_Sensing, max_SLL] (dB) từ AF chưa chuẩn hóa, ghi vào buf['terms'].
+        w_conj (pop, N): dùng khi quét SLL thích nghi (sll_tol) để tính AF tại các điểm tinh chỉnh.
+        """
+        gains, tmp, terms = buf['gains'], buf['tmp'], buf['terms']
+        np.multiply(af.real, af.real, out=gains)
+        np.multiply(af.imag, af.imag, out=tmp)
+        gains += tmp
+        gains /= norm_sq[:, np.newaxis]
+        terms[:, :2] = gains[:, :2]
+        np.max(gains[:, 2:], axis=1, out=terms[:, 2])
+        if self.sll_tol is not None:
+            np.maximum(terms[:, 2], self._refine_sll(gains[:, 2:], w_conj, norm_sq), out=terms[:, 2])
+        self.sll_evaluations += len(af) * self.sll_points
+        if self.jcas.probe is not None:
+            self.jcas.probe.count('sll_points', len(af) * self.sll_points)
+        terms += 1e-12
+        np.log10(terms, out=terms)
+        terms *= 10
+        return terms
+
+    def _refine_sll(self, sll, w_conj, norm_sq):
+        """
+        SLL đã tinh chỉnh (tuyến tính, chuẩn hóa) (pop,): chọn sll_candidates đỉnh cục bộ lớn nhất trên
+        lưới thô sll (pop, M-2) rồi leo đồi chia đôi bước theo u quanh từng đỉnh (như refine_peaks).
+        """
+        adjacent = self._sll_adjacent
+        is_peak = np.ones(sll.shape, dtype=bool)
+        is_peak[:, 1:] &= ~adjacent | (sll[:, 1:] >= sll[:, :-1])
+        is_peak[:, :-1] &= ~adjacent | (sll[:, :-1] >= sll[:, 1:])
+        K = self._sll_candidates
+        idx = np.argpartition(np.where(is_peak, sll, -np.inf), -K, axis=1)[:, -K:]
+        start = self._sll_u[idx][..., np.newaxis]
+        power = np.take_along_axis(sll, idx, axis=1)
+        
+        # Dịch đỉnh u -> u + m*h chỉ nhân vector lái với exp(j*phase*m*h): giữ b = conj(w) * a(u) cho từng đỉnh
+        # (a(u) lấy từ cột ma trận lái lưới thô), mỗi vòng AF tại các điểm thử là b @ shift, không tính exp(N)
+        A = self.A if w_conj.dtype == self.A.dtype else self.jcas.steering_vector(self.eval_angles, w_conj.dtype)
+        b = w_conj[:, np.newaxis, :] * np.moveaxis(A[:, 2 + idx], 0, -1)  # (pop, K, N)
+        power = power * norm_sq[:, np.newaxis]  # leo đồi trên |AF|^2 chưa chuẩn hóa
+        moves, shifts = self._shift_tables(b.dtype)
+        for h, shift in zip(self._sll_steps, shifts):
+            trial = start[:, :, np.newaxis, :] + moves * h  # (pop, K, 2, 1)
+            af = np.matmul(b, shift)
+            value = af.real**2 + af.imag**2
+            value[~self._in_sidelobe(trial)] = -np.inf
+            start, power, best, better = climb_step(value, start, power, moves, h)
+            b = np.where(better[..., np.newaxis], b * shift.T[best], b)
+        return np.max(power, axis=1) / norm_sq
+
+    def _shift_tables(self, dtype):
+        """Hướng thử climb_moves(1) và bảng dịch pha exp(j*phase*m*h) (N, 2) cho từng bước h, dựng một lần mỗi dtype"""
+        moves = climb_moves(1)
+        shifts = self._sll_shifts.get(dtype.str)
+        if shifts is None:
+            shifts = self._sll_shifts[dtype.str] = [
+                np.exp(1j * np.outer(self._sll_phase, moves[:, 0] * h)).astype(dtype) for h in self._sll_steps]
+        return moves, shifts
+
+    def _in_sidelobe(self, points):
+        """Mặt nạ các điểm (..., 1) theo u nằm trong vùng SLL: |u| <= 1, ngoài +-exclusion_width quanh User/Target"""
+        u = points[..., 0]
+        (lo_user, lo_target), (hi_user, hi_target) = self._sll_excluded
+        return ((np.abs(u) <= 1) & ~((u > lo_user) & (u < hi_user)) & ~((u > lo_target) & (u < hi_target)))
+
+    def _array_factor(self, positions):
+        """Giải mã (pop, 2N) -> conj(w) và tính AF chưa chuẩn hóa bằng một phép nhân ma trận"""
+        positions = np.asarray(positions, dtype=self.dtype)
+        if positions.ndim == 1:
+            positions = positions[np.newaxis, :]
+        buf = self._buffers(len(positions))
+        w_conj = buf['w']
+        w_conj.real[...] = positions[:, :self.N]
+        np.negative(positions[:, self.N:], out=w_conj.imag)
+        np.matmul(w_conj, self.A, out=buf['af'])
+        np.einsum('ij,ij->i', positions, positions, out=buf['norm_sq'])
+        return buf
+
+    def batch(self, positions):
+        """Fitness cho cả quần thể (pop, 2N), trả về vector điểm (pop,)"""
+        buf = self._array_factor(positions)
+        return np.matmul(self._terms_db(buf['af'], buf['norm_sq'], buf, buf['w']), self._coeffs)
+
+    def __call__(self, wolf_position):
+        """Fitness cho một con sói (vector thực 2N: nửa đầu phần thực, nửa sau phần ảo)"""
+        return float(self.batch(wolf_position)[0])
+
+    def metrics(self, wolf_position):
+        """
+        Các thành phần của hàm mục tiêu cho một con sói: gain (dB), SLL lớn nhất (dB) và điểm.
+        Luôn tính bằng float64 / complex128 (kể cả khi dtype=float32) để số liệu báo cáo so sánh được.
+        """
+        if self.dtype == np.float64:
+            buf = self._array_factor(wolf_position)
+        else:
+            position = np.atleast_2d(np.asarray(wolf_position, dtype=np.float64))
+            w_conj = position[:, :self.N] - 1j * position[:, self.N:]
+            af = np.matmul(w_conj, self.jcas.steering_vector(self.eval_angles, np.complex128))
+            buf = {'w': w_conj, 'af': af, 'norm_sq': np.einsum('ij,ij->i', position, position),
+                   'gains': np.empty(af.shape), 'tmp': np.empty(af.shape), 'terms': np.empty((1, 3))}
+        gain_comm, gain_sense, max_sll = self._terms_db(buf['af'], buf['norm_sq'], buf, buf['w'])[0]
+        return {'gain_comm_db': float(gain_comm), 'gain_sense_db': float(gain_sense),
+                'max_sll_db': float(max_sll),
+                'score': float(np.dot(self._coeffs, [gain_comm, gain_sense, max_sll])),
+                'sll_points': self.sll_points}
+
+    def surrogate_grad(self, positions, sharpness=SLL_SHARPNESS):
+        """
+        Hàm mục tiêu trơn và gradient giải tích theo vị trí thực 2N (dùng cho bước tinh chỉnh memetic).
+        max_SLL được thay bằng log-sum-exp (1/sharpness) * log(sum exp(sharpness * SLL_m)) trên lưới SLL
+        (lớn hơn max thật tối đa log(M)/sharpness dB), các số hạng còn lại giữ nguyên.
+        Với L_m = 10*log10(|AF_m|^2 / ||p||^2), AF_m = p @ gene_basis[:, m]:
+            dL_m/dp = (10/ln10) * (2*Re(conj(AF_m) * gene_basis[:, m]) / |AF_m|^2 - 2p / ||p||^2)
+        Trả về (giá trị (k,), gradient (k, 2N)) cho ma trận (k, 2N).
+        """
+        positions = np.atleast_2d(np.asarray(positions, dtype=float))
+        af = np.matmul(positions, self.gene_basis)
+        norm_sq = np.einsum('ij,ij->i', positions, positions)[:, np.newaxis]
+        power = af.real**2 + af.imag**2 + 1e-12 * norm_sq
+        levels = 10 * np.log10(power / norm_sq)
+
+        # Trọng số của từng L_m: alpha, 1 - alpha cho User/Target; -lambda * softmax cho vùng SLL
+        sll = levels[:, 2:]
+        peak = np.max(sll, axis=1, keepdims=True)
+        soft = np.exp(sharpness * (sll - peak))
+        total = np.sum(soft, axis=1, keepdims=True)
+        coef = np.empty_like(levels)
+        coef[:, 0] = self.alpha_weight
+        coef[:, 1] = 1 - self.alpha_weight
+        coef[:, 2:] = -self.lambda_int * soft / total
+        lse = peak[:, 0] + np.log(total[:, 0]) / sharpness
+        value = self.alpha_weight * levels[:, 0] + (1 - self.alpha_weight) * levels[:, 1] - self.lambda_int * lse
+
+        # sum_m coef_m * dL_m/dp, gộp thành một phép nhân ma trận (k, M) @ (M, 2N)
+        r = np.conj(af) * (coef / power)
+        grad = 2 * (np.matmul(r.real, self.gene_basis.real.T) - np.matmul(r.imag, self.gene_basis.imag.T))
+        grad -= 2 * positions * (np.sum(coef, axis=1, keepdims=True) / norm_sq)
+        return value, grad * (10 / np.log(10))
+
+
+class URA_System:
+    """
+    Mảng phẳng đều (URA) Nx x Ny, phần tử (i, j) đặt tại (i*d, j*d); vector trọng số xếp theo hàng:
+    w[i*Ny + j] = W[i, j].
+    Hướng (az, el) ứng với cosin chỉ phương u = cos(el)*sin(az), v = sin(el); đặt theta_x = arcsin(u),
+    theta_y = el ("góc theo trục") thì vector lái tách được thành tích Kronecker của hai vector lái ULA:
+        a(az, el) = kron(a_x(theta_x), a_y(theta_y))
+        AF = w^H a = a_x^T conj(W) a_y
+    Trên lưới tích theta_x x theta_y: AF = A_x^T conj(W) A_y (Gx, Gy), chỉ cần hai ma trận lái nhỏ
+    (Nx, Gx) và (Ny, Gy) thay cho ma trận (Nx*Ny, Gx*Gy).
+    """
+    def __init__(self, num_x, num_y, frequency=28e9, spacing_ratio=0.5, cache_size=16, dtype=np.complex128):
+        self.Nx = num_x
+        self.Ny = num_y
+        self.N = num_x * num_y
+        # Hai ULA theo trục x, y: dùng lại vector lái và cache LRU của JCAS_System
+        self.x_axis = JCAS_System(num_x, frequency, spacing_ratio, cache_size, dtype)
+        self.y_axis = JCAS_System(num_y, frequency, spacing_ratio, cache_size, dtype)
+        self.dtype = self.x_axis.dtype
+        self.fc = self.x_axis.fc
+        self.lam = self.x_axis.lam
+        self.d = self.x_axis.d
+
+    @property
+    def probe(self):
+        return self.x_axis.probe
+
+    @probe.setter
+    def probe(self, probe):
+        # Profiler.attach đếm số lần dựng ma trận lái trên cả hai trục
+        self.x_axis.probe = self.y_axis.probe = probe
+
+    @staticmethod
+    def axis_angles(az, el):
+        """(az, el) độ -> góc theo trục (theta_x, theta_y) độ"""
+        az = np.deg2rad(np.asarray(az, dtype=float))
+        el = np.deg2rad(np.asarray(el, dtype=float))
+        return np.rad2deg(np.arcsin(np.cos(el) * np.sin(az))), np.rad2deg(el)
+
+    @staticmethod
+    def visible_mask(theta_x, theta_y):
+        """Mặt nạ (Gx, Gy) vùng nhìn thấy u^2 + v^2 <= 1 của lưới tích góc theo trục"""
+        u = np.sin(np.deg2rad(np.asarray(theta_x, dtype=float)))
+        v = np.sin(np.deg2rad(np.asarray(theta_y, dtype=float)))
+        return u[:, np.newaxis]**2 + v[np.newaxis, :]**2 <= 1 + 1e-12
+
+    def axis_steering(self, theta_x, theta_y, dtype=None):
+        """Hai ma trận lái theo trục: (Nx, Gx), (Ny, Gy)"""
+        return self.x_axis.steering_vector(theta_x, dtype), self.y_axis.steering_vector(theta_y, dtype)
+
+    def steering_vector(self, az, el):
+        """Ma trận lái đầy đủ (N, số điểm) cho các hướng (az[m], el[m]) - chỉ dùng cho ít điểm"""
+        ax, ay = self.axis_steering(*self.axis_angles(az, el))
+        return (ax[:, np.newaxis, :] * ay[np.newaxis, :, :]).reshape(self.N, -1)
+
+    def weight_matrix(self, weights):
+        """Vector trọng số (..., N) -> ma trận (..., Nx, Ny)"""
+        weights = np.asarray(weights)
+        return weights.reshape(weights.shape[:-1] + (self.Nx, self.Ny))
+
+    def calculate_beampattern(self, weights, az, el):
+        """Công suất búp sóng |w^H a(az, el)|^2 tại các hướng (az[m], el[m]), w (N,)"""
+        ax, ay = self.axis_steering(*self.axis_angles(az, el))
+        af = np.sum(ax * np.matmul(np.conj(self.weight_matrix(weights)), ay), axis=0)
+        return af.real**2 + af.imag**2
+
+    def beampattern_grid(self, weights, theta_x, theta_y):
+        """
+        Công suất búp sóng trên lưới tích góc theo trục: A_x^T conj(W) A_y -> (..., Gx, Gy).
+        weights: (N,) hoặc (pop, N). Các điểm ngoài vùng nhìn thấy (xem visible_mask) không có ý nghĩa vật lý.
+        """
+        ax, ay = self.axis_steering(theta_x, theta_y)
+        af = np.matmul(ax.T, np.matmul(np.conj(self.weight_matrix(weights)), ay))
+        return af.real**2 + af.imag**2
+
+
+class URAObjective:
+    """
+    Hàm mục tiêu JCAS cho mảng phẳng URA, cùng công thức và giao diện với JCASObjective
+    (obj(position), obj.batch(P), obj.metrics, obj.surrogate_grad; pickle được):
+        F = alpha * Gain_Comm(dB) + (1 - alpha) * Gain_Sensing(dB) - lambda * max_SLL(dB)
+    
+    * user_angle / target_angle: cặp (az, el) độ.
+    * Vùng SLL: lưới tích scan_angles x scan_angles theo góc theo trục (URA_System.axis_angles), chỉ giữ
+      vùng nhìn thấy và bỏ ô +-exclusion_width độ (trên mỗi trục) quanh User và Target.
+    * AF trên lưới tính tách trục A_x^T conj(W) A_y theo từng khối chunk con sói, bộ nhớ
+      O(chunk * Gx * Gy + (Nx + Ny) * G) thay vì ma trận lái (Nx*Ny, Gx*Gy).
+    * Không có gene_basis vì nó sẽ là ma trận đầy đủ (2N, Gx*Gy); surrogate_grad cũng tính tách trục.
+    * dtype=np.float32: tính ở độ chính xác đơn như JCASObjective; metrics() luôn tính lại bằng float64.
+    * sll_tol (dB): quét SLL thích nghi như JCASObjective - lưới thô đều theo sin của góc theo trục
+      (số điểm theo trục dài hơn), đỉnh cục bộ 2-D trên lưới thô được leo đồi theo (u, v).
+      Số điểm mỗi lần đánh giá: sll_points, cộng dồn trong sll_evaluations.
+    """
+    def __init__(self, num_x, num_y, user_angle, target_angle, exclusion_width=5.0,
+                 alpha_weight=0.5, lambda_int=0.5, scan_angles=None, ura=None, chunk=16, dtype=np.float64,
+                 sll_tol=None, sll_candidates=SLL_CANDIDATES):
+        self.Nx = num_x
+        self.Ny = num_y
+        self.N = num_x * num_y
+        self.user_angle = tuple(user_angle)
+        self.target_angle = tuple(target_angle)
+        self.exclusion_width = exclusion_width
+        self.alpha_weight = alpha_weight
+        self.lambda_int = lambda_int
+        self.chunk = chunk
+        self.ura = ura if ura is not None else URA_System(num_x, num_y)
+        self.dtype = np.dtype(dtype)
+        self.complex_dtype = np.result_type(self.dtype, np.complex64)
+
+        # Hướng User, Target (cột 0, 1) theo góc theo trục
+        point_x, point_y = self.ura.axis_angles([self.user_angle[0], self.target_angle[0]],
+                                                [self.user_angle[1], self.target_angle[1]])
+        self.point_angles = (point_x, point_y)
+
+        self.sll_tol = sll_tol
+        spacing = self.ura.d / self.ura.lam
+        if scan_angles is None:
+            scan_angles = (np.linspace(-90, 90, 181) if sll_tol is None
+                           else sll_coarse_angles(max(num_x, num_y), spacing))
+        self.scan_angles = np.asarray(scan_angles, dtype=float)
+        if sll_tol is not None:
+            self.scan_angles = sll_edge_angles(self.scan_angles, np.concatenate((point_x, point_y)), exclusion_width)
+        self._axes = self._steering(self.complex_dtype)
+        self.Ax, self.Ay, self.Ax_points, self.Ay_points = self._axes
+        mask = URA_System.visible_mask(self.scan_angles, self.scan_angles)
+        near_x = np.abs(self.scan_angles[:, np.newaxis] - point_x) < exclusion_width  # (G, 2)
+        near_y = np.abs(self.scan_angles[:, np.newaxis] - point_y) < exclusion_width
+        for k in range(2):
+            mask &= ~(near_x[:, k, np.newaxis] & near_y[np.newaxis, :, k])
+        self.sidelobe_mask = mask
+        self._coeffs = np.array([alpha_weight, 1 - alpha_weight, -lambda_int])
+        self.sll_points = int(np.count_nonzero(mask))
+        self.sll_evaluations = 0
+
+        if sll_tol is not None:
+            scan_u = np.sin(np.deg2rad(self.scan_angles))
+            self._scan_u = scan_u
+            self._sll_phase = (2 * np.pi * spacing * np.arange(num_x), 2 * np.pi * spacing * np.arange(num_y))
+            self._sll_steps = sll_refine_steps(np.max(np.diff(scan_u)), sll_tol, max(num_x, num_y), spacing)
+            self._sll_candidates = min(sll_candidates, self.sll_points)
+            self.sll_points += self._sll_candidates * 8 * len(self._sll_steps)
+            # Biên vùng nhìn thấy u^2 + v^2 = 1 (lưới tích không chạm tới): lấy mẫu theo góc phi trên đường tròn
+            # cùng bước thô, thêm giao điểm với mép các ô loại trừ, rồi leo đồi 1-D theo phi
+            edges_u = np.sin(np.deg2rad(np.concatenate([point_x - exclusion_width, point_x + exclusion_width])))
+            edges_v = np.sin(np.deg2rad(np.concatenate([point_y - exclusion_width, point_y + exclusion_width])))
+            edges_u, edges_v = edges_u[np.abs(edges_u) <= 1], edges_v[np.abs(edges_v) <= 1]
+            rim = np.concatenate((np.linspace(-np.pi, np.pi, int(np.ceil(2 * np.pi / np.max(np.diff(scan_u)))),
+                                              endpoint=False),
+                                  np.arctan2(np.sqrt(1 - edges_u**2), edges_u),
+                                  np.arctan2(-np.sqrt(1 - edges_u**2), edges_u),
+                                  np.arctan2(edges_v, np.sqrt(1 - edges_v**2)),
+                                  np.arctan2(edges_v, -np.sqrt(1 - edges_v**2))))
+            self._rim_phi = np.unique(rim)
+            self._rim_valid = self._in_sidelobe(self._rim_points(self._rim_phi))
+            self._rim_cache = {}
+            self._rim_steps = sll_refine_steps(np.max(np.diff(self._rim_phi)), sll_tol, max(num_x, num_y), spacing)
+            self._rim_candidates = min(sll_candidates, len(self._rim_phi))
+            self.sll_points += len(self._rim_phi) + self._rim_candidates * 2 * len(self._rim_steps)
+
+    def _steering(self, dtype):
+        """(A_x, A_y) trên lưới quét và (A_x, A_y) tại User/Target với kiểu dữ liệu dtype"""
+        return (self.ura.axis_steering(self.scan_angles, self.scan_angles, dtype)
+                + self.ura.axis_steering(*self.point_angles, dtype))
+
+    def _conj_weights(self, positions):
+        """(k, 2N) -> conj(W) (k, Nx, Ny)"""
+        w_conj = positions[:, :self.N] - 1j * positions[:, self.N:]
+        return w_conj.reshape(-1, self.Nx, self.Ny)
+
+    def _grid_af(self, w_conj, axes=None):
+        """AF chưa chuẩn hóa trên lưới (k, Gx, Gy) = A_x^T conj(W) A_y"""
+        Ax, Ay = (axes or self._axes)[:2]
+        return np.matmul(Ax.T, np.matmul(w_conj, Ay))
+
+    def _point_af(self, w_conj, axes=None):
+        """AF chưa chuẩn hóa tại User, Target (k, 2)"""
+        Ax_points, Ay_points = (axes or self._axes)[2:]
+        return np.sum(Ax_points * np.matmul(w_conj, Ay_points), axis=1)
+
+    def _terms_db(self, positions, dtype=None, axes=None):
+        """[Gain_Comm, Gain_Sensing, max_SLL] (dB) cho (pop, 2N), tính theo từng khối chunk con sói"""
+        positions = np.atleast_2d(np.asarray(positions, dtype=self.dtype if dtype is None else dtype))
+        terms = np.empty((len(positions), 3))
+        for start in range(0, len(positions), self.chunk):
+            block = positions[start:start + self.chunk]
+            w_conj = self._conj_weights(block)
+            af = self._grid_af(w_conj, axes)
+            power = af.real**2 + af.imag**2
+            points = self._point_af(w_conj, axes)
+            rows = terms[start:start + len(block)]
+            rows[:, :2] = points.real**2 + points.imag**2
+            if self.sll_tol is None:
+                rows[:, 2] = np.max(power[:, self.sidelobe_mask], axis=1)
+            else:
+                rows[:, 2] = self._refine_sll(np.where(self.sidelobe_mask, power, -np.inf), w_conj, axes)
+            rows /= np.einsum('ij,ij->i', block, block)[:, np.newaxis]
+        self.sll_evaluations += len(positions) * self.sll_points
+        if self.ura.probe is not None:
+            self.ura.probe.count('sll_points', len(positions) * self.sll_points)
+        return 10 * np.log10(terms + 1e-12)
+
+    def _refine_sll(self, sll, w_conj, axes=None):
+        """
+        SLL lớn nhất (tuyến tính, chưa chuẩn hóa) (k,) từ lưới thô sll (k, G, G) (ngoài vùng SLL = -inf):
+        chọn sll_candidates đỉnh cục bộ 2-D lớn nhất rồi leo đồi theo (u, v) quanh từng đỉnh,
+        cộng thêm các đỉnh trên biên vùng nhìn thấy (leo đồi theo phi, refine_peaks).
+        """
+        k, G = len(sll), len(self.scan_angles)
+        is_peak = np.isfinite(sll)
+        is_peak[:, 1:, :] &= sll[:, 1:, :] >= sll[:, :-1, :]
+        is_peak[:, :-1, :] &= sll[:, :-1, :] >= sll[:, 1:, :]
+        is_peak[:, :, 1:] &= sll[:, :, 1:] >= sll[:, :, :-1]
+        is_peak[:, :, :-1] &= sll[:, :, :-1] >= sll[:, :, 1:]
+        K = self._sll_candidates
+        score = np.where(is_peak, sll, -np.inf).reshape(k, -1)
+        idx = np.argpartition(score, -K, axis=1)[:, -K:]
+        ix, iy = idx // G, idx % G
+        start = np.stack((self._scan_u[ix], self._scan_u[iy]), axis=-1)
+        power = np.take_along_axis(sll.reshape(k, -1), idx, axis=1)
+
+        # Như JCASObjective._refine_sll nhưng tách trục: b = conj(W) * a_x(u) a_y(v)^T (k, K, Nx, Ny),
+        # AF tại 3 x 3 điểm (u + mx*h, v + my*h) = E_x^T b E_y với E_x (Nx, 3), E_y (Ny, 3)
+        Ax, Ay = (axes or self._axes)[:2]
+        b = (w_conj[:, np.newaxis] * np.moveaxis(Ax[:, ix], 0, -1)[..., :, np.newaxis]
+             * np.moveaxis(Ay[:, iy], 0, -1)[..., np.newaxis, :])
+        moves = climb_moves(2)
+        offsets = np.array([-1.0, 0.0, 1.0])
+        for h in self._sll_steps:
+            trial = start[:, :, np.newaxis, :] + moves * h  # (k, K, 8, 2)
+            ex = np.exp(1j * np.outer(self._sll_phase[0], offsets * h)).astype(b.dtype)
+            ey = np.exp(1j * np.outer(self._sll_phase[1], offsets * h)).astype(b.dtype)
+            af = np.matmul(ex.T, np.matmul(b, ey)).reshape(k, K, 9)
+            af = np.delete(af, 4, axis=2)  # bỏ điểm gốc, cùng thứ tự với climb_moves(2)
+            value = af.real**2 + af.imag**2
+            value[~self._in_sidelobe(trial)] = -np.inf
+            start, power, best, better = climb_step(value, start, power, moves, h)
+            mx, my = (moves[best] + 1).astype(np.intp).transpose(2, 0, 1)
+            b = np.where(better[..., np.newaxis, np.newaxis],
+                         b * ex.T[mx][..., :, np.newaxis] * ey.T[my][..., np.newaxis, :], b)
+        peak = np.max(power, axis=1)
+
+        def power_fn(points):
+            # AF = a_x(u)^T conj(W) a_y(v) tại các điểm (k, P)
+            uv = points.astype(w_conj.real.dtype)
+            ax = np.exp(1j * (uv[..., :1] * self._sll_phase[0].astype(uv.dtype)))  # (k, P, Nx)
+            ay = np.exp(1j * (uv[..., 1:] * self._sll_phase[1].astype(uv.dtype)))  # (k, P, Ny)
+            return self._power_at(w_conj, ax, ay)
+
+        # Biên vùng nhìn thấy: đỉnh cục bộ (vòng tròn) trên các mẫu phi, leo đồi theo phi
+        rim_x, rim_y = self._rim_steering(w_conj.dtype)
+        rim = self._power_at(w_conj, rim_x, rim_y)
+        rim[:, ~self._rim_valid] = -np.inf
+        is_peak = (rim >= np.roll(rim, 1, axis=1)) & (rim >= np.roll(rim, -1, axis=1))
+        K = self._rim_candidates
+        idx = np.argpartition(np.where(is_peak, rim, -np.inf), -K, axis=1)[:, -K:]
+        rim_peak = refine_peaks(lambda phi: power_fn(self._rim_points(phi[..., 0])),
+                                lambda phi: self._in_sidelobe(self._rim_points(phi[..., 0])),
+                                self._rim_phi[idx][..., np.newaxis], np.take_along_axis(rim, idx, axis=1),
+                                self._rim_steps)
+        return np.maximum(peak, rim_peak)
+
+    @staticmethod
+    def _power_at(w_conj, ax, ay):
+        """|a_x^T conj(W) a_y|^2 tại từng điểm: ax (..., P, Nx), ay (..., P, Ny) -> (k, P)"""
+        af = np.sum(np.matmul(ax, w_conj) * ay, axis=-1)
+        return af.real**2 + af.imag**2
+
+    def _rim_steering(self, dtype):
+        """Vector lái theo trục (P, Nx), (P, Ny) tại các mẫu biên vùng nhìn thấy, dựng một lần cho mỗi kiểu dữ liệu"""
+        rim = self._rim_cache.get(dtype.str)
+        if rim is None:
+            points = self._rim_points(self._rim_phi)
+            rim = self._rim_cache[dtype.str] = (
+                np.exp(1j * np.outer(points[:, 0], self._sll_phase[0])).astype(dtype),
+                np.exp(1j * np.outer(points[:, 1], self._sll_phase[1])).astype(dtype))
+        return rim
+
+    @staticmethod
+    def _rim_points(phi):
+        """Góc phi (...) -> điểm (u, v) = (cos phi, sin phi) (..., 2) trên biên vùng nhìn thấy"""
+        return np.stack((np.cos(phi), np.sin(phi)), axis=-1)
+
+    def _in_sidelobe(self, points):
+        """Mặt nạ các điểm (..., 2) theo (u, v) nằm trong vùng SLL: nhìn thấy, ngoài các ô loại trừ quanh User/Target"""
+        u, v = points[..., 0], points[..., 1]
+        inside = u**2 + v**2 <= 1 + 1e-12
+        theta_x = np.rad2deg(np.arcsin(np.clip(u, -1, 1)))
+        theta_y = np.rad2deg(np.arcsin(np.clip(v, -1, 1)))
+        point_x, point_y = self.point_angles
+        width = self.exclusion_width - SLL_EDGE_SLACK
+        for k in range(2):
+            inside &= ~((np.abs(theta_x - point_x[k]) < width) & (np.abs(theta_y - point_y[k]) < width))
+        return inside
+
+    def batch(self, positions):
+        """Fitness cho cả quần thể (pop, 2N), trả về vector điểm (pop,)"""
+        return np.matmul(self._terms_db(positions), self._coeffs)
+
+    def __call__(self, wolf_position):
+        """Fitness cho một con sói (vector thực 2N: nửa đầu phần thực, nửa sau phần ảo)"""
+        return float(self.batch(wolf_position)[0])
+
+    def metrics(self, wolf_position):
+        """Các thành phần của hàm mục tiêu cho một con sói (luôn tính bằng float64): gain, SLL lớn nhất (dB), điểm"""
+        axes = None if self.dtype == np.float64 else self._steering(np.complex128)
+        gain_comm, gain_sense, max_sll = self._terms_db(wolf_position, np.float64, axes)[0]
+        return {'gain_comm_db': float(gain_comm), 'gain_sense_db': float(gain_sense),
+                'max_sll_db': float(max_sll),
+                'score': float(np.dot(self._coeffs, [gain_comm, gain_sense, max_sll])),
+                'sll_points': self.sll_points}
+
+    def surrogate_grad(self, positions, sharpness=SLL_SHARPNESS):
+        """
+        Như JCASObjective.surrogate_grad (max_SLL thay bằng log-sum-exp), gradient cũng tách trục:
+        với R_m = coef_m * conj(AF_m) / |AF_m|^2 trên lưới, sum_m R_m * dAF_m/dW = A_x R A_y^T (Nx, Ny).
+        Trả về (giá trị (k,), gradient (k, 2N)).
+        """
+        positions = np.atleast_2d(np.asarray(positions, dtype=float))
+        w_conj = self._conj_weights(positions)
+        norm_sq = np.einsum('ij,ij->i', positions, positions)
+        af = self._grid_af(w_conj)
+        points = self._point_af(w_conj)
+        power = af.real**2 + af.imag**2 + 1e-12 * norm_sq[:, np.newaxis, np.newaxis]
+        power_points = points.real**2 + points.imag**2 + 1e-12 * norm_sq[:, np.newaxis]
+        levels = 10 * np.log10(power / norm_sq[:, np.newaxis, np.newaxis])
+        levels_points = 10 * np.log10(power_points / norm_sq[:, np.newaxis])
+
+        # Softmax trên vùng SLL (ngoài vùng: trọng số 0)
+        sll = np.where(self.sidelobe_mask, levels, -np.inf)
+        peak = np.max(sll, axis=(1, 2))
+        soft = np.exp(sharpness * (sll - peak[:, np.newaxis, np.newaxis]))
+        total = np.sum(soft, axis=(1, 2))
+        coef = -self.lambda_int * soft / total[:, np.newaxis, np.newaxis]
+        coef_points = np.array([self.alpha_weight, 1 - self.alpha_weight])
+        lse = peak + np.log(total) / sharpness
+        value = np.matmul(levels_points, coef_points) - self.lambda_int * lse
+
+        # S = sum_m R_m * a_x,m a_y,m^T, dL/dRe(W) = 2 Re(S), dL/dIm(W) = 2 Im(S)
+        r = np.conj(af) * (coef / power)
+        s = np.matmul(self.Ax, np.matmul(r, self.Ay.T))
+        r_points = np.conj(points) * (coef_points / power_points)
+        s += np.matmul(self.Ax_points[np.newaxis] * r_points[:, np.newaxis, :], self.Ay_points.T)
+        s = s.reshape(len(positions), self.N)
+        grad = 2 * np.concatenate((s.real, s.imag), axis=1)
+        coef_sum = np.sum(coef, axis=(1, 2)) + np.sum(coef_points)
+        grad -= 2 * positions * (coef_sum / norm_sq)[:, np.newaxis]
+        return value, grad * (10 / np.log(10))
+
+
+class PhaseCodeObjective:
+    """
+    Hàm mục tiêu cho chế độ chỉ điều pha b-bit: mỗi cá thể là vector mã pha (N,) uint8,
+    w_n = exp(j*2*pi*c_n / 2^b) (biên độ bằng nhau, ||w||^2 = N).
+    * Bảng tra 2^b phasor conj(w) = exp(-j*2*pi*k / 2^b) dựng sẵn: giải mã là một phép gather (không tính sin/cos),
+      AF = phasor[codes] @ A dùng ma trận lái và bộ đệm của JCASObjective bọc bên trong.
+    * objective không có ma trận lái A (ví dụ URAObjective): đổi mã sang vị trí thực 2N rồi gọi objective.batch.
+    * metrics(codes) tính lại bằng objective.metrics (float64). Pickle được (dùng với ParallelEvaluator / Island:
+      fitness_factory=PhaseCodeObjective, factory_args=(objective, bits)).
+    """
+    def __init__(self, objective, bits=3):
+        self.objective = objective
+        self.bits = bits
+        self.levels = 2 ** bits
+        self.N = objective.N
+        dtype = getattr(objective, 'complex_dtype', np.complex128)
+        self.phasors = np.exp(-2j * np.pi * np.arange(self.levels) / self.levels).astype(dtype)
+
+    def to_position(self, codes):
+        """Mã pha (..., N) -> vị trí thực (..., 2N) = [Re w, Im w] với |w_n| = 1"""
+        phase = (2 * np.pi / self.levels) * np.asarray(codes, dtype=float)
+        return np.concatenate((np.cos(phase), np.sin(phase)), axis=-1)
+
+    def batch(self, codes):
+        """Fitness cho cả quần thể mã pha (pop, N), trả về vector điểm (pop,)"""
+        codes = np.atleast_2d(np.asarray(codes, dtype=np.intp))
+        objective = self.objective
+        if not hasattr(objective, 'A'):
+            return objective.batch(self.to_position(codes))
+        buf = objective._buffers(len(codes))
+        np.take(self.phasors, codes, out=buf['w'])
+        np.matmul(buf['w'], objective.A, out=buf['af'])
+        buf['norm_sq'].fill(self.N)
+        return np.matmul(objective._terms_db(buf['af'], buf['norm_sq'], buf, buf['w']), objective._coeffs)
+
+    def __call__(self, codes):
+        return float(self.batch(codes)[0])
+
+    def metrics(self, codes):
+        """Metrics (float64) của một vector mã pha, cùng khóa với JCASObjective.metrics"""
+        return self.objective.metrics(self.to_position(codes))
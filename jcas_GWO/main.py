@@ -1,138 +1,152 @@
+import sys
+import time
+import argparse
+import functools
 import numpy as np
-import matplotlib.pyplot as plt
-from jcas_model import JCAS_System
+from jcas_model import JCAS_System, JCASObjective, URAObjective, PhaseCodeObjective
 from gwo_optimizer import GWO_Optimizer
+from swarm_core import ParallelEvaluator
+from results_io import save_run, weights_from_position
 
 # ==========================================
 # 1. CẤU HÌNH THAM SỐ (Theo báo cáo của bạn)
 # ==========================================
-N = 64                  # Số phần tử ăng-ten
+N = 64                  # Số phần tử ăng-ten (mảng phẳng: số phần tử theo trục x)
+NY = 0                  # > 0: mảng phẳng URA N x NY, góc User/Target là (az, el)
 USER_ANGLE = -15.0      # Góc người dùng (độ)
 TARGET_ANGLE = 30.0     # Góc mục tiêu Radar (độ)
+USER_ELEVATION = 0.0    # Góc ngẩng người dùng (độ, chỉ dùng khi NY > 0)
+TARGET_ELEVATION = 0.0  # Góc ngẩng mục tiêu (độ, chỉ dùng khi NY > 0)
 POP_SIZE = 30           # Số lượng sói
 MAX_ITER = 100          # Số vòng lặp
 ALPHA_WEIGHT = 0.5      # Trọng số cân bằng (alpha trong công thức)
+LAMBDA_INT = 0.5        # Trọng số phạt nhiễu (lambda trong công thức)
+EXCLUSION_WIDTH = 5.0   # Nửa độ rộng vùng búp chính bỏ qua khi tính SLL (độ)
+NUM_WORKERS = 0         # > 0: đánh giá quần thể song song trên NUM_WORKERS process
+POLISH_EVERY = 0        # > 0: tinh chỉnh gradient (memetic) Alpha mỗi POLISH_EVERY vòng lặp
+DTYPE = 'float64'       # 'float32': quần thể / ma trận lái / AF ở độ chính xác đơn (metrics vẫn tính float64)
+PHASE_BITS = 0          # > 0: chỉ điều pha bằng bộ dịch pha PHASE_BITS bit (quần thể mã uint8, dim = N)
+SLL_TOL = None          # Sai số SLL cho phép (dB): quét SLL thích nghi thô -> mịn thay cho lưới cố định 1 độ
+OUTPUT = 'jcas_gwo'     # Tiền tố file kết quả (.npz, .json) và ảnh (_beampattern.png, _convergence.png)
 
-# Khởi tạo hệ thống
-jcas = JCAS_System(num_antennas=N)
 
-# ==========================================
-# 2. ĐỊNH NGHĨA HÀM MỤC TIÊU (FITNESS FUNCTION)
-# ==========================================
-def fitness_function(wolf_position):
+def run(n=N, user_angle=USER_ANGLE, target_angle=TARGET_ANGLE, pop_size=POP_SIZE, max_iter=MAX_ITER,
+        num_workers=NUM_WORKERS, seed=None, verbose=True, polish_every=POLISH_EVERY,
+        ny=NY, user_elevation=USER_ELEVATION, target_elevation=TARGET_ELEVATION, dtype=DTYPE,
+        phase_bits=PHASE_BITS, sll_tol=SLL_TOL):
     """
-    Ánh xạ vị trí sói (vector thực 2N) thành trọng số phức và tính điểm thích nghi.
-    Công thức: F = alpha * Gain_Comm + (1-alpha) * Gain_Sensing - lambda * Interference
+    Chạy GWO cho một cấu hình, không vẽ gì. Trả về (w (N,) đã chuẩn hóa, history, metrics).
+    ny > 0: mảng phẳng n x ny (URAObjective), User/Target tại (user_angle, user_elevation), (target_angle, target_elevation).
     """
-    # 1. Giải mã (Decode): Chuyển vector thực 2N thành vector phức N
-    # Nửa đầu là phần thực, nửa sau là phần ảo
-    w_real = wolf_position[0:N]
-    w_imag = wolf_position[N:]
-    w_complex = w_real + 1j * w_imag
-    w_complex = w_complex.reshape(-1, 1) # Vector cột (N, 1)
-    
-    # Chuẩn hóa công suất (Norm = 1 hoặc theo P_max)
-    w_complex = w_complex / np.linalg.norm(w_complex)
-    
-    # 2. Tính toán các thành phần Gain
-    # Gain tại hướng User (Communication)
-    gain_comm_arr = jcas.calculate_beampattern(w_complex, np.array([USER_ANGLE]))
-    gain_comm = 10 * np.log10(gain_comm_arr[0] + 1e-12) # Đổi sang dB
-    
-    # Gain tại hướng Target (Sensing)
-    gain_sense_arr = jcas.calculate_beampattern(w_complex, np.array([TARGET_ANGLE]))
-    gain_sense = 10 * np.log10(gain_sense_arr[0] + 1e-12) # Đổi sang dB
-    
-    # 3. Tính toán nhiễu (Sidelobe Level - SLL)
-    # Quét sơ bộ các góc để tìm búp sóng phụ (tránh vùng main lobes)
-    # Vùng loại trừ: xung quanh User (+-5 độ) và Target (+-5 độ)
-    scan_angles = np.linspace(-90, 90, 181)
-    mask = np.ones(len(scan_angles), dtype=bool)
-    mask[(scan_angles > USER_ANGLE-5) & (scan_angles < USER_ANGLE+5)] = False
-    mask[(scan_angles > TARGET_ANGLE-5) & (scan_angles < TARGET_ANGLE+5)] = False
-    
-    sidelobe_angles = scan_angles[mask]
-    sidelobe_gains = jcas.calculate_beampattern(w_complex, sidelobe_angles)
-    max_sll = 10 * np.log10(np.max(sidelobe_gains) + 1e-12)
-    
-    # 4. Tổng hợp hàm mục tiêu
-    # Chúng ta muốn Gain Comm và Sense cao, SLL thấp (max_sll càng nhỏ càng tốt)
-    # Hàm Fitness cần Maximize.
-    # Logic: Tăng Gain Comm/Sense, Phạt nếu SLL cao.
-    
-    # Trọng số lambda cho nhiễu
-    lambda_int = 0.5
-    
-    # Lưu ý: Các giá trị dB thường âm hoặc dương tùy chuẩn hóa. 
-    # Để GWO hoạt động tốt, nên giữ các giá trị này dương hoặc cùng tỷ lệ.
-    # Ở đây dùng trực tiếp dB để tối ưu.
-    
-    score = (ALPHA_WEIGHT * gain_comm) + \
-            ((1 - ALPHA_WEIGHT) * gain_sense) - \
-            (lambda_int * max_sll)
-            
-    return score
 
-# ==========================================
-# 3. CHẠY TỐI ƯU HÓA GWO
-# ==========================================
-print("Bắt đầu tối ưu hóa JCAS với thuật toán GWO...")
-print(f"Cấu hình: N={N}, User tại {USER_ANGLE} deg, Target tại {TARGET_ANGLE} deg")
+    # Hàm mục tiêu: F = alpha * Gain_Comm + (1-alpha) * Gain_Sensing - lambda * Interference (đều tính bằng dB)
+    # - Vị trí sói (vector thực 2N): nửa đầu là phần thực, nửa sau là phần ảo của w; w được chuẩn hóa công suất.
+    # - Interference = SLL lớn nhất trên lưới -90..90 độ (bước 1 độ), bỏ vùng +-5 độ quanh User và Target.
+    # JCASObjective dựng sẵn ma trận lái (User, Target, vùng SLL) và bộ đệm một lần;
+    # GWO_Optimizer dùng fitness_function.batch để đánh giá cả bầy bằng một phép nhân ma trận.
+    # Mảng phẳng: URAObjective cùng công thức, búp sóng tính tách trục A_x^T conj(W) A_y.
+    # sll_tol (dB): lưới SLL thô + tinh chỉnh quanh các đỉnh thay cho lưới 1 độ (metrics['sll_points'] điểm / lần).
+    if ny > 0:
+        factory = functools.partial(URAObjective, dtype=dtype, sll_tol=sll_tol)
+        objective_args = (n, ny, (user_angle, user_elevation), (target_angle, target_elevation),
+                          EXCLUSION_WIDTH, ALPHA_WEIGHT, LAMBDA_INT)
+        fitness_function = factory(*objective_args)
+    else:
+        factory = functools.partial(JCASObjective, dtype=dtype, sll_tol=sll_tol)
+        objective_args = (n, user_angle, target_angle, EXCLUSION_WIDTH, ALPHA_WEIGHT, LAMBDA_INT)
+        fitness_function = factory(*objective_args, jcas=JCAS_System(num_antennas=n))
 
-# Số chiều tìm kiếm = 2 * N (thực + ảo)
-optimizer = GWO_Optimizer(fitness_func=fitness_function, 
-                          dim=2*N, 
-                          pop_size=POP_SIZE, 
-                          max_iter=MAX_ITER,
-                          lower_bound=-1, 
-                          upper_bound=1)
+    # Chế độ pha b-bit: cá thể là vector mã pha (N,) uint8, PhaseCodeObjective bọc hàm mục tiêu ở trên
+    if phase_bits > 0:
+        factory, objective_args = PhaseCodeObjective, (fitness_function, phase_bits)
+        fitness_function = PhaseCodeObjective(*objective_args)
+    dim = fitness_function.N if phase_bits > 0 else 2 * fitness_function.N
 
-best_position, convergence_curve = optimizer.optimize()
+    # Đánh giá song song: mỗi worker tự dựng hàm mục tiêu một lần khi khởi động
+    executor = None
+    if num_workers > 0:
+        executor = ParallelEvaluator('process', num_workers, fitness_factory=factory,
+                                     factory_args=objective_args)
+
+    # Số chiều tìm kiếm = 2 * N (thực + ảo), hoặc N mã pha
+    optimizer = GWO_Optimizer(fitness_func=fitness_function,
+                              dim=dim,
+                              pop_size=pop_size,
+                              max_iter=max_iter,
+                              lower_bound=-1,
+                              upper_bound=1,
+                              executor=executor,
+                              verbose=verbose,
+                              seed=seed,
+                              polish_every=polish_every,
+                              dtype=np.dtype(dtype),
+                              phase_bits=phase_bits)
+    start = time.perf_counter()
+    try:
+        best_position, convergence_curve = optimizer.optimize()
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    metrics = fitness_function.metrics(best_position)
+    metrics.update(wall_time=time.perf_counter() - start, evaluations=optimizer.evaluations,
+                   stop_reason=optimizer.stop_reason)
+    if phase_bits > 0:
+        best_position = fitness_function.to_position(best_position)
+    return weights_from_position(best_position), convergence_curve, metrics
 
-# ==========================================
-# 4. HIỂN THỊ KẾT QUẢ VÀ VẼ ĐỒ THỊ
-# ==========================================
-# Lấy trọng số tối ưu cuối cùng
-w_real_opt = best_position[0:N]
-w_imag_opt = best_position[N:]
-w_opt = w_real_opt + 1j * w_imag_opt
-w_opt = w_opt.reshape(-1, 1)
-w_opt = w_opt / np.linalg.norm(w_opt) # Chuẩn hóa lại lần cuối
 
-# Tính toán Beampattern đầy đủ (-90 đến 90 độ)
-theta_plot = np.linspace(-90, 90, 720) # Độ phân giải cao để vẽ đẹp
-beampattern = jcas.calculate_beampattern(w_opt, theta_plot)
-beampattern_db = 10 * np.log10(beampattern + 1e-12)
-# Chuẩn hóa về 0dB đỉnh cao nhất để dễ nhìn (Normalized Beampattern)
-beampattern_db_norm = beampattern_db - np.max(beampattern_db)
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tối ưu beamforming JCAS bằng GWO, ghi kết quả ra file")
+    parser.add_argument('--n', type=int, default=N, help="Số phần tử ăng-ten")
+    parser.add_argument('--user', type=float, default=USER_ANGLE, help="Góc người dùng (độ)")
+    parser.add_argument('--target', type=float, default=TARGET_ANGLE, help="Góc mục tiêu (độ)")
+    parser.add_argument('--ny', type=int, default=NY, help="> 0: mảng phẳng N x NY")
+    parser.add_argument('--user-el', type=float, default=USER_ELEVATION, help="Góc ngẩng người dùng (độ)")
+    parser.add_argument('--target-el', type=float, default=TARGET_ELEVATION, help="Góc ngẩng mục tiêu (độ)")
+    parser.add_argument('--pop-size', type=int, default=POP_SIZE)
+    parser.add_argument('--max-iter', type=int, default=MAX_ITER)
+    parser.add_argument('--workers', type=int, default=NUM_WORKERS, help="> 0: đánh giá song song")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--polish-every', type=int, default=POLISH_EVERY, help="> 0: tinh chỉnh gradient memetic")
+    parser.add_argument('--dtype', choices=('float64', 'float32'), default=DTYPE, help="Độ chính xác khi tối ưu")
+    parser.add_argument('--phase-bits', type=int, default=PHASE_BITS, help="> 0: chỉ điều pha b-bit")
+    parser.add_argument('--sll-tol', type=float, default=SLL_TOL, help="Quét SLL thích nghi với sai số (dB)")
+    parser.add_argument('--out', default=OUTPUT, help="Tiền tố file kết quả")
+    parser.add_argument('--plot', action='store_true', help="Vẽ ảnh sau khi chạy (xem plotting.py)")
+    parser.add_argument('--show', action='store_true', help="Vẽ và hiển thị cửa sổ")
+    parser.add_argument('--quiet', action='store_true')
+    args = parser.parse_args(argv)
 
-# Vẽ hình
-plt.figure(figsize=(10, 6))
-plt.plot(theta_plot, beampattern_db_norm, linewidth=2, label='GWO Optimized Beam')
+    print("Bắt đầu tối ưu hóa JCAS với thuật toán GWO...")
+    if args.ny > 0:
+        print(f"Cấu hình: URA {args.n}x{args.ny}, User tại ({args.user}, {args.user_el}) deg, "
+              f"Target tại ({args.target}, {args.target_el}) deg")
+    else:
+        print(f"Cấu hình: N={args.n}, User tại {args.user} deg, Target tại {args.target} deg")
+    w_opt, convergence_curve, metrics = run(args.n, args.user, args.target, args.pop_size, args.max_iter,
+                                            args.workers, args.seed, verbose=not args.quiet,
+                                            polish_every=args.polish_every, ny=args.ny,
+                                            user_elevation=args.user_el, target_elevation=args.target_el,
+                                            dtype=args.dtype, phase_bits=args.phase_bits, sll_tol=args.sll_tol)
 
-# Đánh dấu vị trí User và Target
-plt.axvline(x=USER_ANGLE, color='g', linestyle='--', label='User Direction (Comm)')
-plt.axvline(x=TARGET_ANGLE, color='r', linestyle='--', label='Target Direction (Sensing)')
+    prefix = save_run(args.out, w_opt, convergence_curve, metrics, algorithm='GWO', user_angle=args.user,
+                      target_angle=args.target, pop_size=args.pop_size, max_iter=args.max_iter, seed=args.seed,
+                      polish_every=args.polish_every, num_y=args.ny, user_elevation=args.user_el,
+                      target_elevation=args.target_el, dtype=args.dtype,
+                      phase_bits=args.phase_bits, sll_tol=args.sll_tol, alpha_weight=ALPHA_WEIGHT, lambda_int=LAMBDA_INT, exclusion_width=EXCLUSION_WIDTH,
+                      history_label='Fitness Value')
+    print(f"Fitness = {metrics['score']:.4f}, SLL lớn nhất = {metrics['max_sll_db']:.2f} dB, "
+          f"{metrics['wall_time']:.2f} s")
+    print(f"Đã lưu kết quả: {prefix}.npz, {prefix}.json")
 
-# Trang trí đồ thị
-plt.title(f'JCAS Beampattern Optimized by GWO (N={N})')
-plt.xlabel('Angle (Degrees)')
-plt.ylabel('Normalized Magnitude (dB)')
-plt.ylim([-50, 0]) # Giới hạn trục Y để nhìn rõ búp sóng phụ
-plt.xlim([-90, 90])
-plt.legend()
-plt.grid(True, alpha=0.3)
+    if args.plot or args.show:
+        # Chỉ import matplotlib khi cần vẽ
+        from plotting import plot_run
+        for f in plot_run(prefix, show=args.show):
+            print(f"Đã lưu ảnh: {f}")
+    return 0
 
-# Lưu ảnh để bạn chèn vào báo cáo
-plt.savefig('jcas_gwo_result.png', dpi=300)
-print("Đã hoàn tất! Kết quả được lưu tại 'jcas_gwo_result.png'")
-plt.show()
 
-# Vẽ đồ thị hội tụ (Convergence)
-plt.figure(figsize=(8, 4))
-plt.plot(convergence_curve)
-plt.title('GWO Convergence Curve')
-plt.xlabel('Iteration')
-plt.ylabel('Fitness Value')
-plt.grid(True)
-plt.show()
\ No newline at end of file
+if __name__ == "__main__":
+    sys.exit(main())
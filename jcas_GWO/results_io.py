@@ -0,0 +1,57 @@
+import os
+import json
+import numpy as np
+
+# ==========================================
+# LƯU / ĐỌC KẾT QUẢ MỘT LẦN CHẠY TỐI ƯU
+# ==========================================
+# Mỗi lần chạy lưu thành 2 file cùng tiền tố:
+#   <prefix>.npz  : weights (N,) phức đã chuẩn hóa công suất, history (số vòng lặp,)
+#   <prefix>.json : cấu hình (thuật toán, N, góc, tham số mảng...) và metrics (gain, SLL, fitness, thời gian...)
+# Bước vẽ (plotting.py) chỉ cần đọc lại các file này, không phải chạy lại tối ưu.
+
+
+def weights_from_position(position):
+    """Vị trí sói [Re w, Im w] (2N,) -> vector trọng số phức (N,) đã chuẩn hóa công suất"""
+    position = np.asarray(position, dtype=float)
+    N = len(position) // 2
+    w = position[:N] + 1j * position[N:]
+    return w / np.linalg.norm(w)
+
+
+def _prefix(path):
+    root, ext = os.path.splitext(path)
+    return root if ext in ('.json', '.npz') else path
+
+
+def save_run(prefix, weights, history, metrics=None, **config):
+    """
+    Ghi kết quả ra <prefix>.npz và <prefix>.json, trả về prefix.
+    config: Thông tin cấu hình tùy ý (algorithm, user_angle, target_angle, frequency, spacing_ratio,
+            history_label...) - cần ít nhất user_angle / target_angle để vẽ.
+    """
+    prefix = _prefix(prefix)
+    directory = os.path.dirname(prefix)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    weights = np.ravel(weights)
+    weights = weights / np.linalg.norm(weights)
+    history = np.asarray(history, dtype=float)
+    np.savez(prefix + '.npz', weights=weights, history=history)
+    meta = {'num_antennas': len(weights), 'iterations': len(history),
+            'metrics': metrics or {}, 'config': config}
+    with open(prefix + '.json', 'w') as f:
+        json.dump(meta, f, indent=2, default=float)
+    return prefix
+
+
+def load_run(path):
+    """Đọc kết quả từ tiền tố hoặc từ file .json / .npz: dict meta + 'weights', 'history', 'prefix'"""
+    prefix = _prefix(path)
+    with open(prefix + '.json') as f:
+        run = json.load(f)
+    with np.load(prefix + '.npz') as data:
+        run['weights'] = data['weights']
+        run['history'] = data['history']
+    run['prefix'] = prefix
+    return run
@@ -0,0 +1,124 @@
+import time
+import numpy as np
+from jcas_model import JCAS_System, JCASObjective
+from gwo_optimizer import GWO_Optimizer
+from swarm_core import as_generator
+
+
+class GWO_Tracker:
+    """
+    Bám búp sóng (beam tracking) bằng GWO khi User/Target dịch chuyển vài độ mỗi khung (frame).
+    Khung đầu chạy GWO từ khởi tạo ngẫu nhiên. Các khung sau khởi tạo nóng:
+    nghiệm Alpha của khung trước được lái lại sang góc mới (JCAS_System.resteer_weights),
+    cùng warm_fraction * pop_size bản sao nhiễu quanh nó; GWO dừng sớm khi fitness hồi phục
+    về mức tham chiếu trừ tolerance (dB). Mức tham chiếu là fitness của lần chạy đủ max_iter gần nhất
+    (không lấy khung dừng sớm, để ngưỡng không bị trượt dần xuống qua các khung).
+
+    compare_cold=True: mỗi khung chạy thêm GWO khởi tạo lạnh đủ max_iter để báo chênh lệch fitness.
+    """
+    def __init__(self, num_antennas, pop_size=30, max_iter=100, alpha_weight=0.5, lambda_int=0.5,
+                 exclusion_width=5.0, tolerance=0.5, spread=0.05, warm_fraction=0.5,
+                 compare_cold=False, jcas=None, seed=None):
+        self.N = num_antennas
+        self.pop_size = pop_size
+        self.max_iter = max_iter
+        self.alpha_weight = alpha_weight
+        self.lambda_int = lambda_int
+        self.exclusion_width = exclusion_width
+        self.tolerance = tolerance
+        self.spread = spread # Độ lệch chuẩn nhiễu của các bản sao quanh nghiệm cũ
+        self.warm_fraction = warm_fraction
+        self.compare_cold = compare_cold
+        # Dùng chung một JCAS_System (và cache ma trận lái) cho mọi khung
+        self.jcas = jcas if jcas is not None else JCAS_System(num_antennas)
+        # Một Generator cho cả chuỗi khung (nhiễu khởi tạo nóng + các lần chạy GWO): cùng seed -> cùng chuỗi nghiệm
+        self.rng = as_generator(seed)
+        self.reset()
+
+    def reset(self):
+        """Quên nghiệm trước, khung tiếp theo sẽ chạy từ khởi tạo lạnh"""
+        self.weights = None
+        self.angles = None
+        self.score = None
+        self.reference = None
+        self.reports = []
+
+    def _objective(self, user_angle, target_angle):
+        return JCASObjective(self.N, user_angle, target_angle, exclusion_width=self.exclusion_width,
+                             alpha_weight=self.alpha_weight, lambda_int=self.lambda_int, jcas=self.jcas)
+
+    def _encode(self, w):
+        """Vector trọng số phức -> vị trí sói [Re, Im], co giãn vào biên [-1, 1] (fitness không đổi theo tỉ lệ)"""
+        pos = np.concatenate([np.real(w), np.imag(w)])
+        return pos / np.max(np.abs(pos))
+
+    def _warm_positions(self, user_angle, target_angle):
+        w = self.jcas.resteer_weights(self.weights, self.angles, (user_angle, target_angle))
+        center = self._encode(w)
+        k = max(1, int(self.warm_fraction * self.pop_size))
+        positions = center + self.spread * self.rng.standard_normal((k, 2 * self.N))
+        positions[0] = center
+        return np.clip(positions, -1, 1)
+
+    def _run(self, fitness_func, initial_positions=None, target_fitness=None):
+        optimizer = GWO_Optimizer(fitness_func, 2 * self.N, self.pop_size, self.max_iter, -1, 1, verbose=False,
+                                  seed=self.rng)
+        start = time.perf_counter()
+        best_pos, history = optimizer.optimize(initial_positions, target_fitness)
+        return best_pos, history, time.perf_counter() - start
+
+    def update(self, user_angle, target_angle):
+        """
+        Tối ưu lại cho cặp góc mới, trả về (w, report).
+        report: angles, warm (có khởi tạo nóng không), iterations, latency (s), fitness,
+                cold_fitness / cold_latency / gap (= fitness - cold_fitness) khi compare_cold=True
+        """
+        fitness_func = self._objective(user_angle, target_angle)
+        warm = self.weights is not None
+        if warm:
+            initial_positions = self._warm_positions(user_angle, target_angle)
+            target_fitness = self.reference - self.tolerance
+        else:
+            initial_positions, target_fitness = None, None
+        best_pos, history, latency = self._run(fitness_func, initial_positions, target_fitness)
+
+        self.weights = self.jcas.decode_population(best_pos)
+        self.angles = (user_angle, target_angle)
+        self.score = history[-1]
+        if len(history) == self.max_iter:
+            self.reference = self.score
+        report = {
+            'angles': self.angles, 'warm': warm, 'iterations': len(history),
+            'latency': latency, 'fitness': self.score,
+        }
+        if self.compare_cold:
+            _, cold_history, cold_latency = self._run(fitness_func)
+            report.update(cold_fitness=cold_history[-1], cold_latency=cold_latency,
+                          gap=self.score - cold_history[-1])
+        self.reports.append(report)
+        return self.weights, report
+
+    def track(self, angle_stream, verbose=True):
+        """
+        Chạy tracking trên dãy (user_angle, target_angle), trả về danh sách report của từng khung.
+        """
+        reports = []
+        for frame, (user_angle, target_angle) in enumerate(angle_stream):
+            _, report = self.update(user_angle, target_angle)
+            reports.append(report)
+            if verbose:
+                line = (f"Frame {frame}: User={user_angle:.1f}, Target={target_angle:.1f}, "
+                        f"{'warm' if report['warm'] else 'cold'}, {report['iterations']} iter, "
+                        f"{report['latency'] * 1e3:.1f} ms, Fitness = {report['fitness']:.4f}")
+                if self.compare_cold:
+                    line += (f" (cold: {report['cold_fitness']:.4f}, {report['cold_latency'] * 1e3:.1f} ms,"
+                             f" gap = {report['gap']:+.4f})")
+                print(line)
+        return reports
+
+
+if __name__ == "__main__":
+    # User và Target dịch chuyển 1 độ mỗi khung
+    frames = [(-15.0 + f, 30.0 - f) for f in range(10)]
+    tracker = GWO_Tracker(num_antennas=64, compare_cold=True)
+    tracker.track(frames)